@@ -1,12 +1,9 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from supabase import create_client
-from app.core.config import settings
+from app.core.clients import get_auth_client
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-supabase = create_client(settings.supabase_url, settings.supabase_service_role_key)
-
 
 class LoginRequest(BaseModel):
     email: str
@@ -20,7 +17,7 @@ async def login(login_data: LoginRequest):
     Returns JWT token
     """
     try:
-        response = supabase.auth.sign_in_with_password({
+        response = get_auth_client().auth.sign_in_with_password({
             "email": login_data.email,
             "password": login_data.password
         })
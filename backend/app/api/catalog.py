@@ -1,27 +1,255 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timedelta, timezone
 from prisma import Json
-from app.core.database import prisma
-from app.core.security import get_current_user
-from app.models.schemas import CatalogCreate, CatalogUpdate, CatalogResponse, CatalogWithItems, ItemCreate, ItemUpdate, ItemResponse, ReorderImagesRequest
+from app.core.config import settings
+from app.core.database import current_write_marker, prisma, read_client, recently_written
+from app.core.security import get_current_user, get_current_user_stream
+from app.models.schemas import SyncResponse, CatalogCreate, CatalogUpdate, CatalogResponse, CatalogWithItems, ItemCreate, ItemUpdate, ItemResponse, ReorderImagesRequest, CatalogAnalyticsResponse, ItemBatchRequest, ItemBatchResponse, CatalogCloneRequest, DashboardStatsResponse, VariantIndexResponse, VariantSelectionResponse
+from app.core.compression import choose_encoding
+from app.core.request_context import client_ip
+from app.core.negotiation import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, choose_media_type, pack_json
+from app.services.analytics import view_analytics, get_catalog_analytics
+from app.services.invalidation import after_owner_write, after_catalog_write, after_share_code_write, write_generation
+from app.services.catalog_purge import catalog_purger
+from app.services.sync import get_changes, tombstone
+from app.services.export import slugify, stream_catalog_zip
+from app.services.stats import get_owner_stats
+from app.services.events import EventStreamResponse, event_broker
+from app.services.owner_cache import owner_catalog_cache
+from app.services.view_cache import CachedView, view_cache
+from app.services.cache_warmer import cache_warmer
+from app.services.cdn import NO_STORE, catalog_key, code_key, public_cache_headers
 from app.utils.timezone import get_ph_time_utc
-from app.utils.storage import delete_images_from_storage
-from typing import List
+from app.utils.storage import delete_unreferenced_images_from_storage
+from app.utils.singleflight import SingleFlight
+from app.utils.catalog_tree import CatalogTree, build_catalog_trees, encode_json, encode_msgpack
+from app.utils.variants import build_variant_index, resolve_selection, selection_key, normalize_images
+from typing import List, Literal, Optional, Tuple
 import asyncio
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/catalog", tags=["catalog"])
 
+# Upper bound on operations accepted by the batch item endpoint
+MAX_BATCH_OPERATIONS = 500
+# Interactive transaction timeout for batch item operations
+BATCH_TX_TIMEOUT = timedelta(seconds=30)
+# Interactive transaction timeout for catalog cloning
+CLONE_TX_TIMEOUT = timedelta(seconds=60)
+
+# Copies a catalog's items ($1) and images into a new catalog ($2). Every item and image gets a
+# new ID; image IDs in the items' variant indexes are mapped to the copies.
+CLONE_ITEMS_SQL = '''
+WITH item_map AS MATERIALIZED (
+    SELECT "id" AS old_id, gen_random_uuid()::text AS new_id FROM "Item" WHERE "catalogId" = $1
+), image_map AS MATERIALIZED (
+    SELECT img."id" AS old_id, gen_random_uuid()::text AS new_id, m.new_id AS item_id,
+           img."url", img."order", img."variantOptions", img."createdAt"
+    FROM "ItemImage" img JOIN item_map m ON m.old_id = img."itemId"
+), new_items AS (
+    INSERT INTO "Item" ("id", "catalogId", "name", "description", "specifications", "variants", "variantIndex", "createdAt")
+    SELECT m.new_id, $2, i."name", i."description", i."specifications", i."variants",
+        CASE WHEN i."variantIndex" IS NULL THEN NULL ELSE jsonb_set(i."variantIndex", '{combinations}', COALESCE((
+            SELECT jsonb_object_agg(c.key, c.value || jsonb_build_object(
+                'images', (SELECT COALESCE(jsonb_agg(im.new_id ORDER BY e.position), '[]'::jsonb)
+                           FROM jsonb_array_elements_text(c.value->'images') WITH ORDINALITY AS e(id, position)
+                           JOIN image_map im ON im.old_id = e.id),
+                'related', (SELECT COALESCE(jsonb_agg(im.new_id ORDER BY e.position), '[]'::jsonb)
+                            FROM jsonb_array_elements_text(c.value->'related') WITH ORDINALITY AS e(id, position)
+                            JOIN image_map im ON im.old_id = e.id)
+            ))
+            FROM jsonb_each(i."variantIndex"->'combinations') c
+        ), '{}'::jsonb)) END,
+        i."createdAt"
+    FROM "Item" i JOIN item_map m ON m.old_id = i."id"
+)
+INSERT INTO "ItemImage" ("id", "itemId", "url", "order", "variantOptions", "createdAt")
+SELECT new_id, item_id, "url", "order", "variantOptions", "createdAt" FROM image_map
+'''
+
 
 async def verify_catalog_ownership(catalog_id: str, user_id: str) -> bool:
     """Verify catalog ownership"""
     catalog = await prisma.catalog.find_unique(where={"id": catalog_id})
-    if not catalog:
+    if not catalog or catalog.deletedAt is not None:
         raise HTTPException(status_code=404, detail="Catalog not found")
     if catalog.ownerId != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
     return True
 
 
+async def build_index(variants, images) -> Optional[dict]:
+    """Build an item's variant index in a worker thread so large option sets don't hold up the event loop"""
+    return await asyncio.to_thread(build_variant_index, variants, images)
+
+
+async def build_item_create_data(catalog_id: str, item: ItemCreate) -> dict:
+    """Build Prisma create data for an item, including nested image creates"""
+    # Prepare specifications as JSON if provided
+    specs_json = None
+    if item.specifications:
+        specs = [{"label": spec.label, "value": spec.value} for spec in item.specifications]
+        if specs:
+            specs_json = Json(specs)
+    
+    # Prepare variants as JSON if provided
+    variants_json = None
+    if item.variants:
+        vars_data = []
+        for var in item.variants:
+            options_data = []
+            for opt in var.options:
+                opt_dict = {"value": opt.value}
+                if opt.specifications:
+                    opt_dict["specifications"] = [{"label": s.label, "value": s.value} for s in opt.specifications]
+                options_data.append(opt_dict)
+            vars_data.append({"name": var.name, "options": options_data})
+        if vars_data:
+            variants_json = Json(vars_data)
+    
+    # Build create data - only include fields that have values
+    create_data = {
+        "catalogId": catalog_id,
+        "name": item.name,
+    }
+    
+    if item.description:
+        create_data["description"] = item.description
+    
+    if specs_json is not None:
+        create_data["specifications"] = specs_json
+    
+    if variants_json is not None:
+        create_data["variants"] = variants_json
+    
+    # Add images if provided
+    image_data = []
+    if item.images:
+        for idx, img_item in enumerate(item.images):
+            # Handle both old format (string) and new format (dict/object)
+            if isinstance(img_item, str):
+                # Backward compatibility: simple URL string
+                image_data.append({"id": str(uuid.uuid4()), "url": img_item, "order": idx})
+            else:
+                # New format: object with url, order, and variantOptions
+                img_dict = {
+                    "id": str(uuid.uuid4()),
+                    "url": img_item.get("url") if isinstance(img_item, dict) else img_item.url,
+                    "order": img_item.get("order", idx) if isinstance(img_item, dict) else (img_item.order if hasattr(img_item, 'order') and img_item.order is not None else idx)
+                }
+                variant_opts = img_item.get("variantOptions") if isinstance(img_item, dict) else (img_item.variantOptions if hasattr(img_item, 'variantOptions') else None)
+                if variant_opts:
+                    img_dict["variantOptions"] = Json(variant_opts)
+                image_data.append(img_dict)
+        create_data["images"] = {"create": image_data}
+    
+    # Image ids are assigned above so the variant index is written with the item in one insert
+    variant_index = await build_index(variants_json, image_data)
+    if variant_index:
+        create_data["variantIndex"] = Json(variant_index)
+    
+    return create_data
+
+
+async def build_item_update_data(item_update: ItemUpdate, existing_item=None) -> dict:
+    """Build Prisma update data for an item; provided images replace the existing ones
+    
+    When variants or images change, the variant index is rebuilt from the new values and
+    whatever `existing_item` (fetched with its images) keeps.
+    """
+    # Prepare update data
+    update_data = {}
+    if item_update.name is not None:
+        update_data["name"] = item_update.name
+    if item_update.description is not None:
+        update_data["description"] = item_update.description if item_update.description else None
+    if item_update.specifications is not None:
+        specs = [{"label": spec.label, "value": spec.value} for spec in item_update.specifications]
+        update_data["specifications"] = Json(specs) if specs else Json(None)
+    if item_update.variants is not None:
+        vars_data = []
+        for var in item_update.variants:
+            options_data = []
+            for opt in var.options:
+                opt_dict = {"value": opt.value}
+                if opt.specifications:
+                    opt_dict["specifications"] = [{"label": s.label, "value": s.value} for s in opt.specifications]
+                options_data.append(opt_dict)
+            vars_data.append({"name": var.name, "options": options_data})
+        update_data["variants"] = Json(vars_data) if vars_data else Json(None)
+    
+    # Handle images - use nested operations for efficiency
+    if item_update.images is not None:
+        image_data = []
+        for idx, img_item in enumerate(item_update.images):
+            # Handle both old format (string) and new format (dict/object)
+            if isinstance(img_item, str):
+                # Backward compatibility: simple URL string
+                image_data.append({"id": str(uuid.uuid4()), "url": img_item, "order": idx})
+            else:
+                # New format: object with url, order, and variantOptions
+                img_dict = {
+                    "id": str(uuid.uuid4()),
+                    "url": img_item.get("url") if isinstance(img_item, dict) else img_item.url,
+                    "order": img_item.get("order", idx) if isinstance(img_item, dict) else (img_item.order if hasattr(img_item, 'order') and img_item.order is not None else idx)
+                }
+                variant_opts = img_item.get("variantOptions") if isinstance(img_item, dict) else (img_item.variantOptions if hasattr(img_item, 'variantOptions') else None)
+                if variant_opts:
+                    img_dict["variantOptions"] = Json(variant_opts)
+                image_data.append(img_dict)
+        # Delete all existing and create new in one update operation
+        update_data["images"] = {
+            "deleteMany": {},  # Delete all existing images
+            "create": image_data  # Create new images
+        }
+    
+    if existing_item is not None and ("variants" in update_data or "images" in update_data):
+        variants = update_data["variants"] if "variants" in update_data else existing_item.variants
+        images = update_data["images"]["create"] if "images" in update_data else existing_item.images
+        variant_index = await build_index(variants, images)
+        update_data["variantIndex"] = Json(variant_index)
+    
+    return update_data
+
+
+async def touch_item(db, item):
+    """Bump an item's version and rebuild its variant index after its images changed
+    outside build_item_*_data (e.g. reorder), so delta sync and viewers pick the change up"""
+    if not item:
+        return item
+    data = {"updatedAt": datetime.now(timezone.utc)}
+    if item.variants:
+        data["variantIndex"] = Json(await build_index(item.variants, item.images))
+    return await db.item.update(
+        where={"id": item.id},
+        data=data,
+        include={"images": {"order_by": {"order": "asc"}}}
+    )
+
+
+def item_event_data(item) -> dict:
+    """Compact change event payload for an item"""
+    return {"item": ItemResponse.model_validate(item).model_dump(mode="json")}
+
+
+# Concurrent identical reads share one database load and serialization
+view_flight = SingleFlight(timeout=settings.singleflight_timeout_seconds)
+my_catalogs_flight = SingleFlight(timeout=settings.singleflight_timeout_seconds)
+
+
+def view_response(body: bytes, encoding: str = None, media_type: str = JSON_MEDIA_TYPE, cache_headers: dict = None) -> Response:
+    """Build a response for a serialized (and possibly precompressed) share view"""
+    headers = {"Vary": "Accept, Accept-Encoding", **(cache_headers or {})}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
 @router.post("", response_model=CatalogResponse)
 async def create_catalog(
     catalog: CatalogCreate,
@@ -40,43 +268,138 @@ async def create_catalog(
             create_data["coverPhoto"] = catalog.coverPhoto
         
         new_catalog = await prisma.catalog.create(data=create_data)
+        after_owner_write(current_user["id"])
         
         return new_catalog
     except Exception as e:
-        import traceback
-        print(f"Error creating catalog: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception(f"Error creating catalog: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Failed to create catalog: {str(e)}")
 
 
+async def load_my_catalogs(owner_id: str, generation: int) -> Tuple[CatalogTree, ...]:
+    """Load an owner's catalogs as compact trees and cache them (shared by coalesced requests)"""
+    loaded_at = time.time()
+    db = read_client(f"owner:{owner_id}")
+    catalogs = await db.catalog.find_many(
+        where={"ownerId": owner_id, "deletedAt": None},
+        include={
+            "items": {
+                "include": {"images": {"order_by": {"order": "asc"}}}
+            },
+            "shareCodes": True
+        },
+        order={"createdAt": "desc"}
+    )
+    # CatalogTree reads a missing coverPhoto (older rows) as None
+    trees = build_catalog_trees(catalogs)
+    owner_catalog_cache.put(owner_id, generation, trees, loaded_at)
+    return trees
+
+
 @router.get("/my", response_model=List[CatalogWithItems])
 async def get_my_catalogs(
+    request: Request,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get all catalogs owned by the current user"""
+    """Get all catalogs owned by the current user
+    
+    Send `Accept: application/msgpack` for the columnar MessagePack encoding.
+    Served from the owner catalog cache, which both formats are encoded from; concurrent misses
+    for the same owner and write generation share one load.
+    """
     try:
-        catalogs = await prisma.catalog.find_many(
-            where={"ownerId": current_user["id"]},
-            include={
-                "items": {
-                    "include": {"images": {"order_by": {"order": "asc"}}}
-                },
-                "shareCodes": True
-            },
-            order={"createdAt": "desc"}
-        )
-        # Ensure coverPhoto is always present (for backward compatibility)
-        for catalog in catalogs:
-            if not hasattr(catalog, 'coverPhoto'):
-                catalog.coverPhoto = None
-        return catalogs
+        owner_id = current_user["id"]
+        media_type = choose_media_type(request.headers.get("accept"))
+        generation = write_generation(f"owner:{owner_id}")
+        marker = current_write_marker.get()
+        trees = owner_catalog_cache.get(owner_id, generation, marker.client_write if marker else None)
+        if trees is None:
+            key = ("my", owner_id, generation)
+            trees = await my_catalogs_flight.do(key, lambda: load_my_catalogs(owner_id, generation))
+        body = encode_msgpack(trees) if media_type == MSGPACK_MEDIA_TYPE else encode_json(trees)
+        return Response(content=body, media_type=media_type, headers={"Vary": "Accept"})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Timed out fetching catalogs")
     except Exception as e:
-        import traceback
-        print(f"Error fetching catalogs: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception(f"Error fetching catalogs: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Failed to fetch catalogs: {str(e)}")
 
 
+@router.get("/{catalog_id}/analytics", response_model=CatalogAnalyticsResponse)
+async def get_catalog_view_analytics(
+    catalog_id: str,
+    days: int = Query(30, ge=1, le=365),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get share view counts and approximate unique viewers for a catalog (Owner only)"""
+    try:
+        await verify_catalog_ownership(catalog_id, current_user["id"])
+        return await get_catalog_analytics(catalog_id, days)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Error fetching analytics: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Failed to fetch analytics: {str(e)}")
+
+
+@router.get("/stats", response_model=DashboardStatsResponse)
+async def get_my_stats(
+    period: Literal["day", "week", "month"] = "month",
+    periods: int = Query(12, ge=1, le=120),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get dashboard aggregates (per-catalog and per-period counts) for the current user"""
+    try:
+        return await get_owner_stats(current_user["id"], period, periods)
+    except Exception as e:
+        logger.exception(f"Error fetching stats: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Failed to fetch stats: {str(e)}")
+
+
+@router.get("/sync", response_model=SyncResponse)
+async def sync_my_catalogs(
+    since: str = Query(None, description="Cursor returned by the previous sync; omit for a full snapshot"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Catalogs, items, images and share codes changed or deleted since a cursor (Owner only)"""
+    try:
+        return await get_changes(current_user["id"], since)
+    except Exception as e:
+        logger.exception(f"Error syncing catalogs: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Failed to sync catalogs: {str(e)}")
+
+
+@router.get("/{catalog_id}/events")
+async def catalog_events(
+    catalog_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user_stream)
+):
+    """Server-Sent Events feed of changes to a catalog (Owner only)"""
+    await verify_catalog_ownership(catalog_id, current_user["id"])
+    subscription = event_broker.subscribe(catalog_id)
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Event streams unavailable on this server", headers={"Retry-After": "30"})
+    return EventStreamResponse(request, subscription)
+
+
+@router.get("/{catalog_id}/export")
+async def export_catalog(
+    catalog_id: str,
+    manifest: Literal["csv", "json", "both"] = Query("both", description="Manifest format: csv, json or both"),
+    current_user: dict = Depends(get_current_user_stream)
+):
+    """Download the catalog's images and a manifest as a streamed ZIP archive (Owner only)"""
+    await verify_catalog_ownership(catalog_id, current_user["id"])
+    catalog = await prisma.catalog.find_unique(where={"id": catalog_id})
+    filename = f"{slugify(catalog.title, 'catalog')}-{get_ph_time_utc().strftime('%Y%m%d')}.zip"
+    return StreamingResponse(
+        stream_catalog_zip(catalog, manifest),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"}
+    )
+
+
 @router.put("/{catalog_id}", response_model=CatalogResponse)
 async def update_catalog(
     catalog_id: str,
@@ -106,14 +429,16 @@ async def update_catalog(
             where={"id": catalog_id},
             data=update_data
         )
+        after_catalog_write(catalog_id, current_user["id"])
+        event_broker.publish(catalog_id, "catalog.updated", {
+            "catalog": CatalogResponse.model_validate(updated_catalog).model_dump(mode="json")
+        })
         
         return updated_catalog
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        print(f"Error updating catalog: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception(f"Error updating catalog: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Failed to update catalog: {str(e)}")
 
 
@@ -122,39 +447,25 @@ async def delete_catalog(
     catalog_id: str,
     current_user: dict = Depends(get_current_user)
 ):
-    """Delete a catalog (Owner only)"""
+    """Delete a catalog (Owner only)
+    
+    The catalog is hidden and its share codes deactivated right away; its items, images
+    and storage objects are removed in chunks by the background purger.
+    """
     try:
         # Verify ownership with minimal query
         await verify_catalog_ownership(catalog_id, current_user["id"])
         
-        # Get all items with their images before deleting
-        catalog = await prisma.catalog.find_unique(
-            where={"id": catalog_id},
-            include={"items": {"include": {"images": True}}}
-        )
-        
-        # Collect all image URLs (including cover photo)
-        image_urls = []
-        if catalog:
-            # Add cover photo if it exists
-            if catalog.coverPhoto:
-                image_urls.append(catalog.coverPhoto)
-            # Add item images
-            if catalog.items:
-                for item in catalog.items:
-                    if item.images:
-                        image_urls.extend([img.url for img in item.images])
-        
-        # Delete catalog from database (cascade will delete items and share codes)
-        await prisma.catalog.delete(where={"id": catalog_id})
-        
-        # Delete images from Supabase storage (do this after DB delete succeeds)
-        if image_urls:
-            try:
-                await delete_images_from_storage(image_urls)
-            except Exception as e:
-                # Log error but don't fail the request - DB deletion already succeeded
-                print(f"Warning: Failed to delete some images from storage: {str(e)}")
+        async with prisma.tx() as tx:
+            await tx.catalog.update(where={"id": catalog_id}, data={"deletedAt": get_ph_time_utc()})
+            codes = await tx.sharecode.find_many(where={"catalogId": catalog_id, "isActive": True})
+            await tx.sharecode.update_many(where={"catalogId": catalog_id}, data={"isActive": False})
+            await tx.synctombstone.create(data=tombstone(current_user["id"], "catalog", catalog_id, catalog_id))
+        after_catalog_write(catalog_id, current_user["id"])
+        for code in codes:
+            after_share_code_write(code.code, catalog_id, current_user["id"])
+        event_broker.publish(catalog_id, "catalog.deleted", {})
+        catalog_purger.wake()
         
         return {"message": "Catalog deleted successfully"}
     except HTTPException:
@@ -163,6 +474,48 @@ async def delete_catalog(
         raise HTTPException(status_code=400, detail=f"Failed to delete catalog: {str(e)}")
 
 
+@router.post("/{catalog_id}/clone", response_model=CatalogResponse)
+async def clone_catalog(
+    catalog_id: str,
+    clone_request: CatalogCloneRequest = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Duplicate a catalog with all its items and images (Owner only)
+    
+    Rows are copied with set-based INSERT ... SELECT statements in one transaction.
+    Images keep pointing at the same storage objects; deletes only remove an object
+    once nothing references it.
+    """
+    try:
+        # Same checks as verify_catalog_ownership; the title is needed for the copy
+        catalog = await prisma.catalog.find_unique(where={"id": catalog_id})
+        if not catalog or catalog.deletedAt is not None:
+            raise HTTPException(status_code=404, detail="Catalog not found")
+        if catalog.ownerId != current_user["id"]:
+            raise HTTPException(status_code=403, detail="Not authorized")
+        
+        title = clone_request.title if clone_request and clone_request.title else f"{catalog.title} (Copy)"
+        new_catalog_id = str(uuid.uuid4())
+        
+        async with prisma.tx(timeout=CLONE_TX_TIMEOUT) as tx:
+            await tx.execute_raw(
+                'INSERT INTO "Catalog" ("id", "title", "description", "coverPhoto", "ownerId", "createdAt") '
+                'SELECT $1, $2, "description", "coverPhoto", "ownerId", now() FROM "Catalog" WHERE "id" = $3',
+                new_catalog_id, title, catalog_id
+            )
+            # Copy items and images in one statement
+            await tx.execute_raw(CLONE_ITEMS_SQL, catalog_id, new_catalog_id)
+            new_catalog = await tx.catalog.find_unique(where={"id": new_catalog_id})
+        after_catalog_write(new_catalog_id, current_user["id"])
+        
+        return new_catalog
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Error cloning catalog: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Failed to clone catalog: {str(e)}")
+
+
 @router.post("/{catalog_id}/items", response_model=ItemResponse)
 async def create_item(
     catalog_id: str,
@@ -174,78 +527,125 @@ async def create_item(
         # Verify ownership with minimal query
         await verify_catalog_ownership(catalog_id, current_user["id"])
         
-        # Prepare specifications as JSON if provided
-        specs_json = None
-        if item.specifications:
-            specs = [{"label": spec.label, "value": spec.value} for spec in item.specifications]
-            if specs:
-                specs_json = Json(specs)
-        
-        # Prepare variants as JSON if provided
-        variants_json = None
-        if item.variants:
-            vars_data = []
-            for var in item.variants:
-                options_data = []
-                for opt in var.options:
-                    opt_dict = {"value": opt.value}
-                    if opt.specifications:
-                        opt_dict["specifications"] = [{"label": s.label, "value": s.value} for s in opt.specifications]
-                    options_data.append(opt_dict)
-                vars_data.append({"name": var.name, "options": options_data})
-            if vars_data:
-                variants_json = Json(vars_data)
-        
-        # Build create data - only include fields that have values
-        create_data = {
-            "catalogId": catalog_id,
-            "name": item.name,
-        }
-        
-        if item.description:
-            create_data["description"] = item.description
-        
-        if specs_json is not None:
-            create_data["specifications"] = specs_json
-        
-        if variants_json is not None:
-            create_data["variants"] = variants_json
-        
-        # Add images if provided
-        if item.images:
-            image_data = []
-            for idx, img_item in enumerate(item.images):
-                # Handle both old format (string) and new format (dict/object)
-                if isinstance(img_item, str):
-                    # Backward compatibility: simple URL string
-                    image_data.append({"url": img_item, "order": idx})
-                else:
-                    # New format: object with url, order, and variantOptions
-                    img_dict = {
-                        "url": img_item.get("url") if isinstance(img_item, dict) else img_item.url,
-                        "order": img_item.get("order", idx) if isinstance(img_item, dict) else (img_item.order if hasattr(img_item, 'order') and img_item.order is not None else idx)
-                    }
-                    variant_opts = img_item.get("variantOptions") if isinstance(img_item, dict) else (img_item.variantOptions if hasattr(img_item, 'variantOptions') else None)
-                    if variant_opts:
-                        img_dict["variantOptions"] = Json(variant_opts)
-                    image_data.append(img_dict)
-            create_data["images"] = {"create": image_data}
+        create_data = await build_item_create_data(catalog_id, item)
         
         new_item = await prisma.item.create(
             data=create_data,
             include={"images": {"order_by": {"order": "asc"}}}
         )
+        after_catalog_write(catalog_id, current_user["id"])
+        event_broker.publish(catalog_id, "item.created", item_event_data(new_item))
         
         return new_item
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        print(f"Error creating item: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception(f"Error creating item: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Failed to create item: {str(e)}")
 
 
+@router.post("/{catalog_id}/items/batch", response_model=ItemBatchResponse)
+async def batch_items(
+    catalog_id: str,
+    batch: ItemBatchRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Apply create/update/delete/reorder item operations in one transaction (Owner only)
+    
+    Ownership is checked once and either every operation is applied or none is.
+    """
+    try:
+        # Verify ownership once for the whole batch
+        await verify_catalog_ownership(catalog_id, current_user["id"])
+        
+        operations = batch.operations
+        if not operations:
+            raise HTTPException(status_code=400, detail="No operations provided")
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_OPERATIONS} operations per batch")
+        
+        # Verify all referenced items belong to this catalog with a single query
+        item_ids = {op.itemId for op in operations if op.itemId}
+        existing_items = {}
+        if item_ids:
+            found = await prisma.item.find_many(
+                where={"id": {"in": list(item_ids)}, "catalogId": catalog_id},
+                include={"images": True}
+            )
+            existing_items = {item.id: item for item in found}
+            for index, op in enumerate(operations):
+                if op.itemId and op.itemId not in existing_items:
+                    raise HTTPException(status_code=404, detail=f"Operation {index}: Item not found")
+        
+        results = []
+        async with prisma.tx(timeout=BATCH_TX_TIMEOUT) as tx:
+            for index, op in enumerate(operations):
+                try:
+                    item = None
+                    if op.op == "create":
+                        item = await tx.item.create(
+                            data=await build_item_create_data(catalog_id, op.create),
+                            include={"images": {"order_by": {"order": "asc"}}}
+                        )
+                    elif op.op == "update":
+                        item = await tx.item.update(
+                            where={"id": op.itemId},
+                            data=await build_item_update_data(op.update, existing_items[op.itemId]),
+                            include={"images": {"order_by": {"order": "asc"}}}
+                        )
+                    elif op.op == "delete":
+                        await tx.item.delete(where={"id": op.itemId})
+                        await tx.synctombstone.create(data=tombstone(current_user["id"], "item", op.itemId, catalog_id))
+                    elif op.op == "reorder":
+                        for image_order in op.images:
+                            await tx.itemimage.update_many(
+                                where={"id": image_order.id, "itemId": op.itemId},
+                                data={"order": image_order.order}
+                            )
+                        item = await touch_item(tx, await tx.item.find_unique(
+                            where={"id": op.itemId},
+                            include={"images": {"order_by": {"order": "asc"}}}
+                        ))
+                    if item is not None and op.op != "create":
+                        # Later operations on the same item see its current images and variants
+                        existing_items[item.id] = item
+                except Exception as e:
+                    # Abort the transaction and report which operation failed
+                    raise HTTPException(status_code=400, detail=f"Operation {index} ({op.op}) failed: {str(e)}")
+                results.append({"index": index, "op": op.op, "itemId": item.id if item else op.itemId, "item": item})
+        after_catalog_write(catalog_id, current_user["id"])
+        for result in results:
+            if result["op"] == "delete":
+                event_broker.publish(catalog_id, "item.deleted", {"itemId": result["itemId"]})
+            elif result["op"] == "reorder":
+                event_broker.publish(catalog_id, "images.reordered", {
+                    "itemId": result["itemId"],
+                    "images": [{"id": img.id, "order": img.order} for img in result["item"].images or []]
+                })
+            else:
+                event_broker.publish(catalog_id, f"item.{result['op']}d", item_event_data(result["item"]))
+        
+        # Delete images of deleted items from Supabase storage (after the transaction commits)
+        image_urls = [
+            img.url
+            for op in operations if op.op == "delete"
+            for img in (existing_items[op.itemId].images or [])
+        ]
+        if image_urls:
+            try:
+                await delete_unreferenced_images_from_storage(image_urls)
+            except Exception as e:
+                # Log error but don't fail the request - DB changes already succeeded
+                logger.warning(f"Failed to delete some images from storage: {str(e)}")
+        
+        return {"results": results}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Error applying batch: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Failed to apply batch: {str(e)}")
+
+
 @router.put("/{catalog_id}/items/{item_id}", response_model=ItemResponse)
 async def update_item(
     catalog_id: str,
@@ -258,55 +658,12 @@ async def update_item(
         # Verify ownership
         await verify_catalog_ownership(catalog_id, current_user["id"])
         
-        # Verify item exists and belongs to catalog
-        item = await prisma.item.find_unique(where={"id": item_id})
+        # Verify item exists and belongs to catalog (images are needed to rebuild the variant index)
+        item = await prisma.item.find_unique(where={"id": item_id}, include={"images": True})
         if not item or item.catalogId != catalog_id:
             raise HTTPException(status_code=404, detail="Item not found")
         
-        # Prepare update data
-        update_data = {}
-        if item_update.name is not None:
-            update_data["name"] = item_update.name
-        if item_update.description is not None:
-            update_data["description"] = item_update.description if item_update.description else None
-        if item_update.specifications is not None:
-            specs = [{"label": spec.label, "value": spec.value} for spec in item_update.specifications]
-            update_data["specifications"] = Json(specs) if specs else Json(None)
-        if item_update.variants is not None:
-            vars_data = []
-            for var in item_update.variants:
-                options_data = []
-                for opt in var.options:
-                    opt_dict = {"value": opt.value}
-                    if opt.specifications:
-                        opt_dict["specifications"] = [{"label": s.label, "value": s.value} for s in opt.specifications]
-                    options_data.append(opt_dict)
-                vars_data.append({"name": var.name, "options": options_data})
-            update_data["variants"] = Json(vars_data) if vars_data else Json(None)
-        
-        # Handle images - use nested operations for efficiency
-        if item_update.images is not None:
-            image_data = []
-            for idx, img_item in enumerate(item_update.images):
-                # Handle both old format (string) and new format (dict/object)
-                if isinstance(img_item, str):
-                    # Backward compatibility: simple URL string
-                    image_data.append({"url": img_item, "order": idx})
-                else:
-                    # New format: object with url, order, and variantOptions
-                    img_dict = {
-                        "url": img_item.get("url") if isinstance(img_item, dict) else img_item.url,
-                        "order": img_item.get("order", idx) if isinstance(img_item, dict) else (img_item.order if hasattr(img_item, 'order') and img_item.order is not None else idx)
-                    }
-                    variant_opts = img_item.get("variantOptions") if isinstance(img_item, dict) else (img_item.variantOptions if hasattr(img_item, 'variantOptions') else None)
-                    if variant_opts:
-                        img_dict["variantOptions"] = Json(variant_opts)
-                    image_data.append(img_dict)
-            # Delete all existing and create new in one update operation
-            update_data["images"] = {
-                "deleteMany": {},  # Delete all existing images
-                "create": image_data  # Create new images
-            }
+        update_data = await build_item_update_data(item_update, item)
         
         # Single update operation with all changes
         updated_item = await prisma.item.update(
@@ -314,14 +671,14 @@ async def update_item(
             data=update_data,
             include={"images": {"order_by": {"order": "asc"}}}
         )
+        after_catalog_write(catalog_id, current_user["id"])
+        event_broker.publish(catalog_id, "item.updated", item_event_data(updated_item))
         
         return updated_item
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        print(f"Error updating item: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception(f"Error updating item: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Failed to update item: {str(e)}")
 
 
@@ -347,16 +704,20 @@ async def delete_item(
         # Get image URLs before deleting from database
         image_urls = [img.url for img in item.images] if item.images else []
         
-        # Delete item from database (cascade will delete image records)
-        await prisma.item.delete(where={"id": item_id})
+        # Delete item from database (cascade will delete image records) and leave a tombstone for delta sync
+        async with prisma.tx() as tx:
+            await tx.item.delete(where={"id": item_id})
+            await tx.synctombstone.create(data=tombstone(current_user["id"], "item", item_id, catalog_id))
+        after_catalog_write(catalog_id, current_user["id"])
+        event_broker.publish(catalog_id, "item.deleted", {"itemId": item_id})
         
         # Delete images from Supabase storage (do this after DB delete succeeds)
         if image_urls:
             try:
-                await delete_images_from_storage(image_urls)
+                await delete_unreferenced_images_from_storage(image_urls)
             except Exception as e:
                 # Log error but don't fail the request - DB deletion already succeeded
-                print(f"Warning: Failed to delete some images from storage: {str(e)}")
+                logger.warning(f"Failed to delete some images from storage: {str(e)}")
         
         return {"message": "Item deleted successfully"}
     except HTTPException:
@@ -392,87 +753,228 @@ async def reorder_item_images(
         ]
         await asyncio.gather(*update_tasks)
         
-        # Fetch updated item with images
-        updated_item = await prisma.item.find_unique(
+        # Fetch updated item with images and rebuild its variant index for the new order
+        updated_item = await touch_item(prisma, await prisma.item.find_unique(
             where={"id": item_id},
             include={"images": {"order_by": {"order": "asc"}}}
-        )
+        ))
+        after_catalog_write(catalog_id, current_user["id"])
+        event_broker.publish(catalog_id, "images.reordered", {
+            "itemId": item_id,
+            "images": [{"id": image_order.id, "order": image_order.order} for image_order in reorder_request.images]
+        })
         
         return updated_item
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        print(f"Error reordering images: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception(f"Error reordering images: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Failed to reorder images: {str(e)}")
 
 
-@router.get("/view/{code}", response_model=CatalogWithItems)
-async def view_catalog_by_code(code: str, request: Request):
-    """View a catalog using a share code (Public endpoint)"""
-    try:
-        # Get client IP address
-        client_ip = request.client.host if request.client else None
-        # Try to get real IP from headers (for proxies/load balancers)
-        if not client_ip:
-            forwarded_for = request.headers.get("X-Forwarded-For")
-            if forwarded_for:
-                client_ip = forwarded_for.split(",")[0].strip()
-            else:
-                client_ip = request.headers.get("X-Real-IP", "unknown")
-        
-        # Find share code
-        share_code = await prisma.sharecode.find_unique(
-            where={"code": code},
-            include={
-                "catalog": {
-                    "include": {
-                        "items": {
-                            "include": {"images": {"order_by": {"order": "asc"}}}
-                        }
-                    }
+async def load_share_view(code: str, cache_ttl_seconds: Optional[float] = None) -> Tuple[str, bytes, Optional[datetime], Optional[CachedView]]:
+    """Load, check and serialize a share view (shared by coalesced requests)
+    
+    Returns the catalog id, JSON body, share code expiry and the view cache entry (if cached).
+    The entry lives for `cache_ttl_seconds` (default VIEW_CACHE_TTL_SECONDS).
+    """
+    # Latest write generation of any view; the catalog is only known once loaded
+    generation = write_generation("views")
+    
+    # Find share code (replica first, primary if the catalog was just modified)
+    view_include = {
+        "catalog": {
+            "include": {
+                "items": {
+                    "include": {"images": {"order_by": {"order": "asc"}}}
                 }
             }
-        )
-        
-        if not share_code or not share_code.isActive:
-            raise HTTPException(status_code=403, detail="Invalid or inactive code")
-        
-        # Check expiration (using Philippines time)
-        if share_code.expiresAt:
-            # Ensure both datetimes are naive for comparison
-            expires_at = share_code.expiresAt
-            if expires_at.tzinfo is not None:
-                expires_at = expires_at.replace(tzinfo=None)
-            current_time = get_ph_time_utc()
-            if expires_at < current_time:
-                # Deactivate the code as a safety measure
-                try:
-                    await prisma.sharecode.update(
-                        where={"id": share_code.id},
-                        data={"isActive": False}
-                    )
-                except Exception:
-                    pass  # Continue even if deactivation fails
-                raise HTTPException(status_code=403, detail="Code has expired")
-        
-        catalog = share_code.catalog
-        
-        # Ensure coverPhoto is always present
-        cover_photo = getattr(catalog, 'coverPhoto', None)
-        
-        return {
-            "id": catalog.id,
-            "title": catalog.title,
-            "description": catalog.description,
-            "coverPhoto": cover_photo,
-            "ownerId": catalog.ownerId,
-            "createdAt": catalog.createdAt,
-            "items": catalog.items,
-            "shareCodes": []  # Don't expose share codes to viewers
         }
+    }
+    db = read_client(f"code:{code}")
+    share_code = await db.sharecode.find_unique(where={"code": code}, include=view_include)
+    if db is not prisma and (not share_code or recently_written(f"catalog:{share_code.catalogId}")):
+        share_code = await prisma.sharecode.find_unique(where={"code": code}, include=view_include)
+    
+    if not share_code or not share_code.isActive or share_code.catalog.deletedAt is not None:
+        raise HTTPException(status_code=403, detail="Invalid or inactive code", headers=NO_STORE)
+    
+    # Check expiration (using Philippines time)
+    if share_code.expiresAt:
+        # Ensure both datetimes are naive for comparison
+        expires_at = share_code.expiresAt
+        if expires_at.tzinfo is not None:
+            expires_at = expires_at.replace(tzinfo=None)
+        current_time = get_ph_time_utc()
+        if expires_at < current_time:
+            # Deactivate the code as a safety measure
+            try:
+                await prisma.sharecode.update(
+                    where={"id": share_code.id},
+                    data={"isActive": False}
+                )
+            except Exception:
+                pass  # Continue even if deactivation fails
+            raise HTTPException(status_code=403, detail="Code has expired", headers=NO_STORE)
+    
+    catalog = share_code.catalog
+    
+    # Ensure coverPhoto is always present
+    cover_photo = getattr(catalog, 'coverPhoto', None)
+    
+    view = CatalogWithItems.model_validate({
+        "id": catalog.id,
+        "title": catalog.title,
+        "description": catalog.description,
+        "coverPhoto": cover_photo,
+        "ownerId": catalog.ownerId,
+        "createdAt": catalog.createdAt,
+        "items": catalog.items,
+        "shareCodes": []  # Don't expose share codes to viewers
+    })
+    body = view.model_dump_json().encode()
+    
+    # A write to this catalog or code during the load may already have invalidated this view;
+    # don't cache what it replaced (writes to other catalogs don't matter)
+    cached = None
+    if write_generation(f"catalog:{catalog.id}") <= generation and write_generation(f"code:{code}") <= generation:
+        cached = view_cache.put(code, catalog.id, body, share_code.expiresAt, cache_ttl_seconds)
+    return catalog.id, body, share_code.expiresAt, cached
+
+
+async def warm_share_view(code: str) -> Optional[CachedView]:
+    """Load a share view into the view cache ahead of traffic (startup warm-up)"""
+    cached = view_cache.get(code)
+    if cached is None:
+        _, _, _, cached = await view_flight.do(
+            ("view", code, write_generation("views")), lambda: load_share_view(code, cache_warmer.ttl_seconds)
+        )
+    return cached
+
+
+@router.get("/view/{code}", response_model=CatalogWithItems)
+async def view_catalog_by_code(code: str, request: Request):
+    """View a catalog using a share code (Public endpoint)
+    
+    Send `Accept: application/msgpack` for the columnar MessagePack encoding.
+    Concurrent requests for the same code share one load and serialization.
+    """
+    try:
+        # Viewer address for unique counts (from the proxy headers when behind a load balancer)
+        viewer_ip = client_ip(request)
+        
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+        media_type = choose_media_type(request.headers.get("accept"))
+        
+        # Serve the serialized view (and its compressed variant) from cache when possible
+        cached = view_cache.get(code)
+        cache_warmer.record_view(code, cached)
+        if cached:
+            view_analytics.record_view(code, cached.catalog_id, viewer_ip)
+            cache_headers = public_cache_headers([catalog_key(cached.catalog_id), code_key(code)], cached.share_expires_at)
+            return view_response(await cached.get_body(encoding, media_type), encoding, media_type, cache_headers)
+        
+        try:
+            catalog_id, body, share_expires_at, cached = await view_flight.do(
+                ("view", code, write_generation("views")), lambda: load_share_view(code)
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Timed out fetching catalog", headers=NO_STORE)
+        view_analytics.record_view(code, catalog_id, viewer_ip)
+        
+        cache_headers = public_cache_headers([catalog_key(catalog_id), code_key(code)], share_expires_at)
+        if cached:
+            return view_response(await cached.get_body(encoding, media_type), encoding, media_type, cache_headers)
+        if media_type == MSGPACK_MEDIA_TYPE:
+            return view_response(pack_json(body), media_type=media_type, cache_headers=cache_headers)
+        return view_response(body, cache_headers=cache_headers)
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to fetch catalog: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Failed to fetch catalog: {str(e)}", headers=NO_STORE)
+
+
+async def find_shared_item(code: str, item_id: str):
+    """An item of the catalog a valid share code points to, and the client it was read with"""
+    db = read_client(f"code:{code}")
+    share_code = await db.sharecode.find_unique(where={"code": code})
+    if not share_code or not share_code.isActive:
+        raise HTTPException(status_code=403, detail="Invalid or inactive code")
+    if share_code.expiresAt:
+        expires_at = share_code.expiresAt
+        if expires_at.tzinfo is not None:
+            expires_at = expires_at.replace(tzinfo=None)
+        if expires_at < get_ph_time_utc():
+            raise HTTPException(status_code=403, detail="Code has expired")
+    
+    if recently_written(f"catalog:{share_code.catalogId}"):
+        db = prisma
+    item = await db.item.find_first(where={"id": item_id, "catalogId": share_code.catalogId})
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return db, item
+
+
+@router.get("/view/{code}/items/{item_id}/variant-index", response_model=VariantIndexResponse)
+async def view_item_variant_index(code: str, item_id: str):
+    """The item's precomputed selection index, so clients can resolve selections locally (Public endpoint)
+    
+    Items saved before indexes existed get one built on demand. When `truncated` is set, selections
+    missing from `combinations` must be resolved through the variants endpoint.
+    """
+    db, item = await find_shared_item(code, item_id)
+    index = item.variantIndex
+    if index is None and item.variants:
+        images = await db.itemimage.find_many(where={"itemId": item_id})
+        index = await build_index(item.variants, images)
+    index = index or {"variants": [], "truncated": False, "combinations": {}}
+    return {
+        "itemId": item_id,
+        "variants": index["variants"],
+        "truncated": index["truncated"],
+        "combinations": index["combinations"],
+    }
+
+
+@router.get("/view/{code}/items/{item_id}/variants", response_model=VariantSelectionResponse)
+async def view_item_variant(code: str, item_id: str, request: Request):
+    """Resolve a variant selection (query parameters, e.g. ?Color=Red&Size=M) to images and specs (Public endpoint)
+    
+    Served from the item's precomputed index; selections the index does not hold are resolved on demand.
+    """
+    db, item = await find_shared_item(code, item_id)
+    variants = item.variants or []
+    known = {variant["name"] for variant in variants}
+    selection = {name: value for name, value in request.query_params.items() if name in known}
+    key = selection_key(variants, selection)
+    
+    entry = (item.variantIndex or {}).get("combinations", {}).get(key)
+    if entry is None:
+        images = await db.itemimage.find_many(where={"itemId": item_id})
+        entry = resolve_selection(variants, normalize_images(images), selection)
+    return {"itemId": item_id, "key": key, **entry}
+
+
+@router.get("/view/{code}/events")
+async def view_catalog_events(code: str, request: Request):
+    """Server-Sent Events feed of changes to a shared catalog (Public endpoint)
+    
+    The stream ends when the share code expires or is deleted.
+    """
+    share_code = await read_client(f"code:{code}").sharecode.find_unique(where={"code": code})
+    if not share_code or not share_code.isActive:
+        raise HTTPException(status_code=403, detail="Invalid or inactive code")
+    
+    max_seconds = None
+    if share_code.expiresAt:
+        expires_at = share_code.expiresAt
+        if expires_at.tzinfo is not None:
+            expires_at = expires_at.replace(tzinfo=None)
+        max_seconds = (expires_at - get_ph_time_utc()).total_seconds()
+        if max_seconds <= 0:
+            raise HTTPException(status_code=403, detail="Code has expired")
+    
+    subscription = event_broker.subscribe(share_code.catalogId, code)
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Event streams unavailable on this server", headers={"Retry-After": "30"})
+    return EventStreamResponse(request, subscription, max_seconds)
@@ -1,13 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from datetime import datetime, timedelta
-from app.core.database import prisma
+from prisma.errors import UniqueViolationError
+from app.core.database import prisma, read_client
 from app.core.security import get_current_user
-from app.models.schemas import ShareCodeCreate, ShareCodeResponse
+from app.models.schemas import ShareCodeBulkCreate, ShareCodeCreate, ShareCodeResponse
+from app.services.code_pool import share_code_pool
+from app.services.invalidation import after_share_code_write
+from app.services.expiry import expiry_scheduler
+from app.services.sync import tombstone
+from app.services.cdn import NO_STORE, catalog_key, code_key, public_cache_headers
 from app.utils.share_code import generate_share_code
 from app.utils.timezone import get_ph_time_utc
+from typing import List
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/share", tags=["share"])
 
+# Share codes are valid for exactly 24 hours
+SHARE_CODE_TTL = timedelta(hours=24)
+# Attempts with fresh codes when an insert hits the unique constraint on ShareCode.code
+MAX_CODE_ATTEMPTS = 5
+# Upper bound on catalogs accepted by the bulk endpoint
+MAX_BULK_CATALOGS = 200
+
 
 @router.post("/catalog/{catalog_id}", response_model=ShareCodeResponse)
 async def create_share_code(
@@ -19,28 +37,32 @@ async def create_share_code(
     try:
         # Verify ownership
         catalog = await prisma.catalog.find_unique(where={"id": catalog_id})
-        if not catalog:
+        if not catalog or catalog.deletedAt is not None:
             raise HTTPException(status_code=404, detail="Catalog not found")
         
         if catalog.ownerId != current_user["id"]:
             raise HTTPException(status_code=403, detail="Not authorized to create share code for this catalog")
         
-        # Generate unique code
-        code = generate_share_code()
-        # Ensure uniqueness - use count instead of find_unique for efficiency
-        while await prisma.sharecode.count(where={"code": code}) > 0:
-            code = generate_share_code()
-        
         # Always set expiration to exactly 24 hours from now (Philippines time)
-        expires_at = get_ph_time_utc() + timedelta(hours=24)
+        expires_at = get_ph_time_utc() + SHARE_CODE_TTL
         
-        # Create share code
-        share_code = await prisma.sharecode.create(data={
-            "code": code,
-            "catalogId": catalog_id,
-            "expiresAt": expires_at,
-            "isActive": True
-        })
+        # Take a pooled code and insert it; the unique constraint catches the rare collision
+        for attempt in range(MAX_CODE_ATTEMPTS):
+            code = share_code_pool.take() if attempt == 0 else generate_share_code()
+            try:
+                share_code = await prisma.sharecode.create(data={
+                    "code": code,
+                    "catalogId": catalog_id,
+                    "expiresAt": expires_at,
+                    "isActive": True
+                })
+                break
+            except UniqueViolationError:
+                logger.info(f"Share code collision on attempt {attempt + 1}, retrying")
+        else:
+            raise HTTPException(status_code=503, detail="Could not allocate a unique share code, please retry")
+        after_share_code_write(code, catalog_id, current_user["id"])
+        expiry_scheduler.schedule(share_code.id, code, catalog_id, current_user["id"], share_code.expiresAt)
         
         return share_code
     except HTTPException:
@@ -49,6 +71,67 @@ async def create_share_code(
         raise HTTPException(status_code=400, detail=f"Failed to create share code: {str(e)}")
 
 
+@router.post("/bulk", response_model=List[ShareCodeResponse])
+async def create_share_codes_bulk(
+    request: ShareCodeBulkCreate,
+    current_user: dict = Depends(get_current_user)
+):
+    """Generate one share code for each of many catalogs in a single transaction (Owner only)"""
+    try:
+        catalog_ids = list(dict.fromkeys(request.catalogIds))
+        if not catalog_ids:
+            return []
+        if len(catalog_ids) > MAX_BULK_CATALOGS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_CATALOGS} catalogs per request")
+        
+        # Verify ownership of every catalog with a single query
+        owned = await prisma.catalog.find_many(
+            where={"id": {"in": catalog_ids}, "ownerId": current_user["id"], "deletedAt": None}
+        )
+        missing = set(catalog_ids) - {catalog.id for catalog in owned}
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Catalogs not found: {', '.join(sorted(missing))}")
+        
+        expires_at = get_ph_time_utc() + SHARE_CODE_TTL
+        for attempt in range(MAX_CODE_ATTEMPTS):
+            codes = share_code_pool.take_many(len(catalog_ids)) if attempt == 0 else [
+                generate_share_code() for _ in catalog_ids
+            ]
+            rows = [
+                {
+                    "id": str(uuid.uuid4()),
+                    "code": code,
+                    "catalogId": catalog_id,
+                    "expiresAt": expires_at,
+                    "isActive": True,
+                }
+                for catalog_id, code in zip(catalog_ids, codes)
+            ]
+            try:
+                # A collision rolls the whole batch back; it is retried with fresh codes
+                async with prisma.tx() as tx:
+                    await tx.sharecode.create_many(data=rows)
+                    share_codes = await tx.sharecode.find_many(where={"id": {"in": [row["id"] for row in rows]}})
+                break
+            except UniqueViolationError:
+                logger.info(f"Share code collision in bulk issue on attempt {attempt + 1}, retrying")
+        else:
+            raise HTTPException(status_code=503, detail="Could not allocate unique share codes, please retry")
+        
+        for share_code in share_codes:
+            after_share_code_write(share_code.code, share_code.catalogId, current_user["id"])
+            expiry_scheduler.schedule(
+                share_code.id, share_code.code, share_code.catalogId, current_user["id"], share_code.expiresAt
+            )
+        order = {catalog_id: index for index, catalog_id in enumerate(catalog_ids)}
+        return sorted(share_codes, key=lambda share_code: order[share_code.catalogId])
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Error creating share codes: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Failed to create share codes: {str(e)}")
+
+
 @router.delete("/{code_id}")
 async def delete_share_code(
     code_id: str,
@@ -62,15 +145,21 @@ async def delete_share_code(
             include={"catalog": True}
         )
         
-        if not share_code:
+        if not share_code or share_code.catalog.deletedAt is not None:
             raise HTTPException(status_code=404, detail="Share code not found")
         
         # Verify ownership
         if share_code.catalog.ownerId != current_user["id"]:
             raise HTTPException(status_code=403, detail="Not authorized to delete this share code")
         
-        # Delete share code
-        await prisma.sharecode.delete(where={"id": code_id})
+        # Delete share code and leave a tombstone for delta sync
+        async with prisma.tx() as tx:
+            await tx.sharecode.delete(where={"id": code_id})
+            await tx.synctombstone.create(
+                data=tombstone(current_user["id"], "shareCode", code_id, share_code.catalogId)
+            )
+        after_share_code_write(share_code.code, share_code.catalogId, current_user["id"])
+        expiry_scheduler.unschedule(code_id)
         
         return {"message": "Share code deleted successfully"}
     except HTTPException:
@@ -80,10 +169,14 @@ async def delete_share_code(
 
 
 @router.get("/validate/{code}")
-async def validate_share_code(code: str):
-    """Validate if a share code is active, not expired, and not used"""
+async def validate_share_code(code: str, response: Response):
+    """Validate if a share code is active, not expired, and not used
+    
+    Valid results are cacheable by a CDN until the code expires; invalid ones are never stored.
+    """
+    response.headers.update(NO_STORE)
     try:
-        share_code = await prisma.sharecode.find_unique(where={"code": code})
+        share_code = await read_client(f"code:{code}").sharecode.find_unique(where={"code": code})
         
         if not share_code or not share_code.isActive:
             return {"valid": False, "message": "Invalid or inactive code"}
@@ -97,6 +190,9 @@ async def validate_share_code(code: str):
             if expires_at < current_time:
                 return {"valid": False, "message": "Code has expired"}
         
+        response.headers.update(public_cache_headers(
+            [catalog_key(share_code.catalogId), code_key(code)], share_code.expiresAt
+        ))
         return {"valid": True, "catalogId": share_code.catalogId}
     except Exception as e:
         return {"valid": False, "message": f"Error validating code: {str(e)}"}
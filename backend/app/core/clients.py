@@ -0,0 +1,45 @@
+from typing import TYPE_CHECKING, Optional
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+# Service-role client for token verification and storage
+_admin_client: Optional["Client"] = None
+# Separate client for password sign-in, which stores the user session on the client
+_auth_client: Optional["Client"] = None
+
+
+def _create_client() -> "Client":
+    # The Supabase SDK is heavy to import, so it is only loaded when a client is first needed
+    from supabase import create_client
+    return create_client(settings.supabase_url, settings.supabase_service_role_key)
+
+
+def get_supabase() -> "Client":
+    """Get the shared service-role Supabase client, creating it on first use"""
+    global _admin_client
+    if _admin_client is None:
+        _admin_client = _create_client()
+    return _admin_client
+
+
+def get_auth_client() -> "Client":
+    """Get the Supabase client used for password sign-in, creating it on first use"""
+    global _auth_client
+    if _auth_client is None:
+        _auth_client = _create_client()
+    return _auth_client
+
+
+def init_clients() -> None:
+    """Build the Supabase clients ahead of the first request (called from the app lifespan)"""
+    get_supabase()
+    get_auth_client()
+
+
+def close_clients() -> None:
+    """Drop the Supabase clients on shutdown"""
+    global _admin_client, _auth_client
+    _admin_client = None
+    _auth_client = None
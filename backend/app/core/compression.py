@@ -0,0 +1,144 @@
+import asyncio
+import gzip
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, fall back to gzip only
+    brotli = None
+
+# Preferred encodings, best first
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Responses that are already compressed or streamed should be passed through untouched
+EXCLUDED_CONTENT_TYPES = ("text/event-stream", "application/zip", "image/")
+
+# Per-request compression favours speed; cached bodies are compressed once so they can afford more
+GZIP_LEVEL = 6
+GZIP_LEVEL_CACHED = 9
+BROTLI_QUALITY = 5
+BROTLI_QUALITY_CACHED = 9
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best supported encoding from an Accept-Encoding header
+
+    Honours q-values (q=0 disables an encoding) and the "*" wildcard.
+    Returns None when the client accepts none of our encodings.
+    """
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[token] = quality
+
+    best = None
+    best_quality = 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    """Compress a body with the given encoding ("br" or "gzip")"""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY_CACHED if cached else BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL_CACHED if cached else GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+async def compress_async(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    """Compress a body, moving the work to a thread for large bodies so the event loop stays free"""
+    if len(body) >= settings.compression_offload_size:
+        return await asyncio.to_thread(compress, body, encoding, cached)
+    return compress(body, encoding, cached)
+
+
+class CompressionMiddleware:
+    """ASGI middleware that negotiates brotli/gzip for single-chunk responses
+
+    Bodies below `minimum_size`, responses that already carry a Content-Encoding
+    (e.g. precompressed cached views) and streaming responses are passed through.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder)
+
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoding: str, minimum_size: int) -> None:
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            if "content-encoding" in headers or content_type.startswith(EXCLUDED_CONTENT_TYPES):
+                self.passthrough = True
+                await self.send(message)
+            else:
+                # Hold the start message until we know whether the body is worth compressing
+                self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        start_message = self.start_message
+        self.start_message = None
+        body = message.get("body", b"")
+
+        if message.get("more_body", False):
+            # Streaming response - send as-is rather than buffering it
+            self.passthrough = True
+            await self.send(start_message)
+            await self.send(message)
+            return
+
+        headers = MutableHeaders(raw=start_message["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        if len(body) >= self.minimum_size:
+            body = await compress_async(body, self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            headers["Content-Length"] = str(len(body))
+            message = {"type": "http.response.body", "body": body, "more_body": False}
+
+        await self.send(start_message)
+        await self.send(message)
@@ -0,0 +1,282 @@
+"""Adaptive concurrency limits and load shedding per route class
+
+Requests are sorted into classes, highest priority first:
+
+    owner_write   owner mutations (POST/PUT/PATCH/DELETE)
+    owner_read    owner dashboards and lists (other GETs)
+    public        anonymous share traffic (/catalog/view/..., /share/validate/...)
+
+`/`, `/health*` and the long-lived streams (`.../events`, `.../export`) are never
+limited: health checks must answer under load, and streams would hold a slot for
+their whole lifetime.
+
+Each class has a concurrency limit that adapts to its latency, in the style of
+Netflix's Gradient limiter: while the recent latency stays within
+CONCURRENCY_TOLERANCE times the class's unloaded (minimum) latency the limit grows by
+about sqrt(limit) per sample, and beyond that it shrinks in proportion.
+Server errors cut it multiplicatively (AIMD). Requests over the limit wait in a
+bounded FIFO queue; a class does not admit new work while a higher-priority class
+has requests waiting, so owner writes get the shared database connections first.
+When a queue is full, or a request waits longer than CONCURRENCY_QUEUE_TIMEOUT_MS,
+it is shed with 503 and `Retry-After`.
+"""
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+MUTATING_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+PUBLIC_PREFIXES = ("/catalog/view/", "/share/validate/")
+STREAM_SUFFIXES = ("/events", "/export")
+# Limit multiplier applied when a request fails with a server error
+ERROR_BACKOFF = 0.9
+# Seconds per window of the minimum-latency baseline
+BASELINE_WINDOW = 30.0
+# Shedding is logged at most once per class per this many seconds
+SHED_LOG_INTERVAL = 10.0
+
+
+def route_class(scope: Scope) -> Optional[str]:
+    """Class a request is limited under, or None for requests that are never limited"""
+    path = scope["path"]
+    if path == "/" or path.startswith("/health") or path.endswith(STREAM_SUFFIXES):
+        return None
+    if scope["method"] == "OPTIONS":
+        return None
+    if path.startswith(PUBLIC_PREFIXES):
+        return "public"
+    if scope["method"] in MUTATING_METHODS:
+        return "owner_write"
+    return "owner_read"
+
+
+class GradientLimit:
+    """A concurrency limit adjusted from observed latency
+
+    The baseline is the lowest latency seen over the last two BASELINE_WINDOW
+    periods, so it follows real changes (a slower replica, a bigger catalog) without
+    drifting up with the load it is meant to detect.
+    """
+
+    def __init__(self, initial: int, min_limit: int, max_limit: int, tolerance: float, smoothing: float = 0.2):
+        self.value = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.short_rtt: Optional[float] = None
+        self._window_min: Optional[float] = None
+        self._previous_min: Optional[float] = None
+        self._window_started = time.monotonic()
+
+    @property
+    def baseline(self) -> Optional[float]:
+        candidates = [rtt for rtt in (self._window_min, self._previous_min) if rtt is not None]
+        return min(candidates) if candidates else None
+
+    def _clamp(self, value: float) -> float:
+        return max(float(self.min_limit), min(float(self.max_limit), value))
+
+    def on_sample(self, rtt: float, in_flight: int, failed: bool) -> None:
+        if failed:
+            self.value = self._clamp(self.value * ERROR_BACKOFF)
+            return
+        now = time.monotonic()
+        if now - self._window_started >= BASELINE_WINDOW:
+            self._previous_min, self._window_min = self._window_min, None
+            self._window_started = now
+        if self._window_min is None or rtt < self._window_min:
+            self._window_min = rtt
+        self.short_rtt = rtt if self.short_rtt is None else self.short_rtt + (rtt - self.short_rtt) * 0.2
+
+        if in_flight < self.value / 2:
+            # Mostly idle: latency says nothing about what a higher limit would do
+            return
+        gradient = max(0.5, min(1.0, self.tolerance * self.baseline / max(self.short_rtt, 1e-6)))
+        target = self.value * gradient + math.sqrt(self.value)
+        self.value = self._clamp(self.value * (1 - self.smoothing) + target * self.smoothing)
+
+
+class RouteClass:
+    def __init__(self, name: str, priority: int, queue_size: int):
+        self.name = name
+        self.priority = priority
+        self.queue_size = queue_size
+        self.limit = GradientLimit(
+            settings.concurrency_initial_limit,
+            settings.concurrency_min_limit,
+            settings.concurrency_max_limit,
+            settings.concurrency_tolerance,
+        )
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.shed = 0
+        self._shed_logged_at = 0.0
+        self._shed_logged_count = 0
+
+    def log_shed(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._shed_logged_at < SHED_LOG_INTERVAL:
+            return
+        logger.warning(
+            f"Shedding {self.name} requests: {reason}",
+            extra={"route_class": self.name, "shed": self.shed - self._shed_logged_count, **self.report()},
+        )
+        self._shed_logged_at = now
+        self._shed_logged_count = self.shed
+
+    def has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit.value)
+
+    def report(self) -> dict:
+        return {
+            "limit": int(self.limit.value),
+            "inFlight": self.in_flight,
+            "queued": len(self.waiters),
+            "queueSize": self.queue_size,
+            "latencyMs": round(self.limit.short_rtt * 1000, 1) if self.limit.short_rtt is not None else None,
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
+
+
+class Shed(Exception):
+    """Raised when a request is refused instead of queued or admitted"""
+
+
+class ConcurrencyLimiter:
+    """Admits requests per route class, queueing over-limit requests and shedding the rest"""
+
+    def __init__(self):
+        self.classes: Dict[str, RouteClass] = {
+            "owner_write": RouteClass("owner_write", 0, settings.concurrency_queue_size),
+            "owner_read": RouteClass("owner_read", 1, settings.concurrency_queue_size),
+            "public": RouteClass("public", 2, settings.concurrency_public_queue_size),
+        }
+        self._by_priority: List[RouteClass] = sorted(self.classes.values(), key=lambda route: route.priority)
+
+    def _higher_waiting(self, route: RouteClass) -> bool:
+        return any(other.waiters for other in self._by_priority if other.priority < route.priority)
+
+    async def acquire(self, route: RouteClass) -> None:
+        if route.has_capacity() and not route.waiters and not self._higher_waiting(route):
+            route.in_flight += 1
+            route.admitted += 1
+            return
+        if len(route.waiters) >= route.queue_size:
+            route.shed += 1
+            raise Shed(f"{route.name} queue full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        route.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), settings.concurrency_queue_timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                self._abandon(route, waiter)
+                route.shed += 1
+                raise Shed(f"{route.name} queue timeout")
+            # Granted a slot just as the wait timed out; take it
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted a slot just as the client went away; hand it on
+                self.release(route)
+            else:
+                self._abandon(route, waiter)
+            raise
+        route.admitted += 1
+
+    def _abandon(self, route: RouteClass, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        route.waiters.remove(waiter)
+        # Lower-priority classes may have been held back only by this waiter
+        self._dispatch()
+
+    def release(self, route: RouteClass, rtt: Optional[float] = None, failed: bool = False) -> None:
+        """Free a slot, feeding the request's latency to the class limit, and admit waiters"""
+        if rtt is not None:
+            route.limit.on_sample(rtt, route.in_flight, failed)
+        route.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters, highest-priority class first"""
+        for route in self._by_priority:
+            while route.waiters and route.has_capacity():
+                waiter = route.waiters.popleft()
+                route.in_flight += 1
+                waiter.set_result(None)
+            if route.waiters:
+                # Lower-priority classes wait until this queue drains
+                return
+
+    def retry_after(self, route: RouteClass) -> int:
+        """Seconds a shed client should wait: roughly the time to drain the queue, at least the configured value"""
+        rtt = route.limit.short_rtt or 0.0
+        drain = rtt * (len(route.waiters) + route.in_flight) / max(route.limit.value, 1.0)
+        return max(settings.concurrency_retry_after, math.ceil(drain))
+
+    def report(self) -> Dict[str, dict]:
+        return {name: route.report() for name, route in self.classes.items()}
+
+
+concurrency_limiter = ConcurrencyLimiter()
+
+
+class ConcurrencyLimitMiddleware:
+    """ASGI middleware applying the concurrency limiter to HTTP requests"""
+
+    def __init__(self, app: ASGIApp, limiter: ConcurrencyLimiter = concurrency_limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        name = route_class(scope) if scope["type"] == "http" and settings.concurrency_limit_enabled else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        route = self.limiter.classes[name]
+        try:
+            await self.limiter.acquire(route)
+        except Shed as e:
+            route.log_shed(str(e))
+            await self._reject(send, self.limiter.retry_after(route))
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.limiter.release(route, time.perf_counter() - started, failed=status >= 500)
+
+    @staticmethod
+    async def _reject(send: Send, retry_after: int) -> None:
+        body = json.dumps({"detail": "Server is busy, please retry shortly"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+                (b"cache-control", b"no-store"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
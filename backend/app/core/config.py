@@ -15,14 +15,127 @@ class Settings(BaseSettings):
     # Database
     database_url: str = os.getenv("DATABASE_URL", "")
     direct_url: Optional[str] = os.getenv("DIRECT_URL")
+    database_replica_url: Optional[str] = os.getenv("DATABASE_REPLICA_URL")
+    
+    # Database pool (applied as Prisma connection string parameters unless already set in the URL)
+    db_connection_limit: Optional[int] = int(os.getenv("DB_CONNECTION_LIMIT")) if os.getenv("DB_CONNECTION_LIMIT") else None
+    db_replica_connection_limit: Optional[int] = int(os.getenv("DB_REPLICA_CONNECTION_LIMIT")) if os.getenv("DB_REPLICA_CONNECTION_LIMIT") else None
+    db_pool_timeout: Optional[int] = int(os.getenv("DB_POOL_TIMEOUT")) if os.getenv("DB_POOL_TIMEOUT") else None
+    db_pgbouncer: bool = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+    db_engine_timeout: int = int(os.getenv("DB_ENGINE_TIMEOUT", "30"))
+    # Seconds after a write during which reads for the same owner/catalog/code stay on the primary
+    db_sticky_seconds: float = float(os.getenv("DB_STICKY_SECONDS", "5"))
     
     # App
     app_name: str = "Catalog API"
     debug: bool = False
     
+    # Production server (serve.py)
+    port: int = int(os.getenv("PORT", "8000"))
+    web_concurrency: Optional[int] = int(os.getenv("WEB_CONCURRENCY")) if os.getenv("WEB_CONCURRENCY") else None
+    # Total Prisma connections across all workers; split evenly unless DB_CONNECTION_LIMIT is set
+    db_total_connections: Optional[int] = int(os.getenv("DB_TOTAL_CONNECTIONS")) if os.getenv("DB_TOTAL_CONNECTIONS") else None
+    # Recycle a worker after this many requests (plus random jitter) to cap memory growth; 0 disables
+    worker_max_requests: int = int(os.getenv("WORKER_MAX_REQUESTS", "10000"))
+    worker_max_requests_jitter: int = int(os.getenv("WORKER_MAX_REQUESTS_JITTER", "1000"))
+    # After SIGTERM, keep serving (with /health answering 503) this long so the load balancer stops routing here
+    drain_seconds: int = int(os.getenv("DRAIN_SECONDS", "5"))
+    graceful_shutdown_timeout: int = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
+    
     # CORS
     cors_origins: str = os.getenv("CORS_ORIGINS", "http://localhost:3000")
     
+    # Compression
+    compression_min_size: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    compression_offload_size: int = int(os.getenv("COMPRESSION_OFFLOAD_SIZE", "65536"))
+    
+    # Share view cache
+    view_cache_ttl_seconds: int = int(os.getenv("VIEW_CACHE_TTL_SECONDS", "30"))
+    view_cache_max_entries: int = int(os.getenv("VIEW_CACHE_MAX_ENTRIES", "256"))
+    
+    # Shared cache (CDN) policy for public share responses
+    cdn_s_maxage: int = int(os.getenv("CDN_S_MAXAGE", "60"))
+    cdn_stale_while_revalidate: int = int(os.getenv("CDN_STALE_WHILE_REVALIDATE", "300"))
+    cdn_browser_max_age: int = int(os.getenv("CDN_BROWSER_MAX_AGE", "0"))
+    cdn_purge_url: Optional[str] = os.getenv("CDN_PURGE_URL")  # Surrogate-key purge endpoint (unset: no purging)
+    cdn_purge_token: Optional[str] = os.getenv("CDN_PURGE_TOKEN")
+    cdn_purge_delay_ms: int = int(os.getenv("CDN_PURGE_DELAY_MS", "200"))  # Coalescing window for purges
+    
+    # Coalesced reads (share views, owner catalog lists): waiters and the shared load give up after this
+    singleflight_timeout_seconds: float = float(os.getenv("SINGLEFLIGHT_TIMEOUT_SECONDS", "15"))
+    
+    # Adaptive concurrency limits per route class (owner writes, owner reads, public views)
+    concurrency_limit_enabled: bool = os.getenv("CONCURRENCY_LIMIT_ENABLED", "true").lower() == "true"
+    concurrency_initial_limit: int = int(os.getenv("CONCURRENCY_INITIAL_LIMIT", "20"))
+    concurrency_min_limit: int = int(os.getenv("CONCURRENCY_MIN_LIMIT", "4"))
+    concurrency_max_limit: int = int(os.getenv("CONCURRENCY_MAX_LIMIT", "200"))
+    concurrency_tolerance: float = float(os.getenv("CONCURRENCY_TOLERANCE", "2.0"))  # Latency over the unloaded minimum tolerated before the limit shrinks
+    concurrency_queue_size: int = int(os.getenv("CONCURRENCY_QUEUE_SIZE", "100"))  # Waiting owner requests per class
+    concurrency_public_queue_size: int = int(os.getenv("CONCURRENCY_PUBLIC_QUEUE_SIZE", "50"))
+    concurrency_queue_timeout_ms: int = int(os.getenv("CONCURRENCY_QUEUE_TIMEOUT_MS", "2000"))
+    concurrency_retry_after: int = int(os.getenv("CONCURRENCY_RETRY_AFTER", "2"))  # Minimum Retry-After seconds on 503
+    
+    # Share view cache warm-up after startup (hottest active codes first; 0 codes disables)
+    warmup_max_codes: int = int(os.getenv("WARMUP_MAX_CODES", "100"))
+    warmup_max_mb: int = int(os.getenv("WARMUP_MAX_MB", "64"))  # Warmed views held, all formats and encodings
+    warmup_max_seconds: float = float(os.getenv("WARMUP_MAX_SECONDS", "30"))
+    warmup_concurrency: int = int(os.getenv("WARMUP_CONCURRENCY", "4"))
+    warmup_lookback_days: int = int(os.getenv("WARMUP_LOOKBACK_DAYS", "7"))  # Views counted when ranking codes
+    
+    # Pre-generated share codes kept ready for issuing (0 disables the pool)
+    share_code_pool_size: int = int(os.getenv("SHARE_CODE_POOL_SIZE", "100"))
+    
+    # Share code expiry scheduler
+    expiry_horizon_seconds: int = int(os.getenv("EXPIRY_HORIZON_SECONDS", "3600"))  # Codes expiring this far ahead are held in memory
+    expiry_max_scheduled: int = int(os.getenv("EXPIRY_MAX_SCHEDULED", "100000"))
+    expiry_page_size: int = int(os.getenv("EXPIRY_PAGE_SIZE", "1000"))  # Codes loaded per query
+    expiry_batch_size: int = int(os.getenv("EXPIRY_BATCH_SIZE", "500"))  # Codes deactivated per update
+    
+    # Catalog ZIP export
+    export_download_concurrency: int = int(os.getenv("EXPORT_DOWNLOAD_CONCURRENCY", "8"))  # Images downloaded at once per export
+    export_page_size: int = int(os.getenv("EXPORT_PAGE_SIZE", "100"))  # Items read per manifest query
+    
+    # Dashboard stats cache (per owner, also invalidated on writes)
+    stats_cache_ttl_seconds: int = int(os.getenv("STATS_CACHE_TTL_SECONDS", "60"))
+    stats_cache_max_owners: int = int(os.getenv("STATS_CACHE_MAX_OWNERS", "1024"))
+    
+    # Owner catalog cache for GET /catalog/my (compact catalog trees, also invalidated on writes)
+    owner_cache_ttl_seconds: int = int(os.getenv("OWNER_CACHE_TTL_SECONDS", "30"))
+    owner_cache_max_owners: int = int(os.getenv("OWNER_CACHE_MAX_OWNERS", "256"))
+    
+    # Live change feed (SSE)
+    events_backend: str = os.getenv("EVENTS_BACKEND", "local")  # "local" or "redis"
+    events_redis_url: str = os.getenv("EVENTS_REDIS_URL", "redis://localhost:6379/0")
+    sse_queue_size: int = int(os.getenv("SSE_QUEUE_SIZE", "100"))  # Events buffered per connection
+    sse_max_connections: int = int(os.getenv("SSE_MAX_CONNECTIONS", "1000"))  # Per worker
+    sse_heartbeat_seconds: int = int(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+    sse_max_stream_seconds: int = int(os.getenv("SSE_MAX_STREAM_SECONDS", "900"))  # Clients reconnect after this
+    sse_retry_ms: int = int(os.getenv("SSE_RETRY_MS", "3000"))
+    
+    # Share view analytics
+    analytics_flush_seconds: int = int(os.getenv("ANALYTICS_FLUSH_SECONDS", "60"))
+    # Reverse proxies in front of the app that append to X-Forwarded-For (0: use the socket peer address)
+    trusted_proxy_hops: int = int(os.getenv("TRUSTED_PROXY_HOPS", "1"))
+    
+    # Background purge of soft-deleted catalogs
+    purge_interval_seconds: int = int(os.getenv("PURGE_INTERVAL_SECONDS", "60"))
+    purge_chunk_size: int = int(os.getenv("PURGE_CHUNK_SIZE", "500"))  # Rows deleted per statement
+    purge_chunk_pause_ms: int = int(os.getenv("PURGE_CHUNK_PAUSE_MS", "50"))  # Pause between chunks
+    
+    # Delta sync
+    sync_lookback_seconds: int = int(os.getenv("SYNC_LOOKBACK_SECONDS", "5"))  # Overlap for writes still committing
+    sync_tombstone_days: int = int(os.getenv("SYNC_TOMBSTONE_DAYS", "30"))  # Older cursors get a full resync
+    
+    # Logging and request profiling
+    log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    log_format: str = os.getenv("LOG_FORMAT", "text")  # "text" or "json"
+    profile_token: Optional[str] = os.getenv("PROFILE_TOKEN")  # Requests sending X-Profile: <token> are profiled
+    profile_sample_rate: float = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # Fraction of requests profiled
+    profile_interval_ms: float = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    profile_max_seconds: float = float(os.getenv("PROFILE_MAX_SECONDS", "30"))
+    slow_request_ms: int = int(os.getenv("SLOW_REQUEST_MS", "1000"))
+    slow_request_queries: int = int(os.getenv("SLOW_REQUEST_QUERIES", "25"))
+    
     model_config = SettingsConfigDict(
         env_file=None,  # Don't auto-load .env, we're using dotenv manually
         case_sensitive=False,
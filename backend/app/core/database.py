@@ -1,13 +1,206 @@
+from contextvars import ContextVar
 from prisma import Prisma
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.core.config import settings
+from app.core.profiling import record_query
+from typing import Dict, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import time
+
+
+def build_datasource_url(url: str, connection_limit: Optional[int] = None) -> str:
+    """Add Prisma pool parameters to a connection string
+
+    Parameters already present in the URL win, so a hand-tuned DATABASE_URL is never overridden.
+    """
+    parts = urlsplit(url)
+    params = dict(parse_qsl(parts.query))
+    if connection_limit is not None:
+        params.setdefault("connection_limit", str(connection_limit))
+    if settings.db_pool_timeout is not None:
+        params.setdefault("pool_timeout", str(settings.db_pool_timeout))
+    if settings.db_pgbouncer:
+        # PgBouncer in transaction mode cannot use prepared statements
+        params.setdefault("pgbouncer", "true")
+    return urlunsplit(parts._replace(query=urlencode(params)))
+
+
+class ProfiledPrisma(Prisma):
+    """Prisma client that reports every query (with duration and row count) to the request profile"""
+
+    # The generated client uses __slots__; adding none keeps the layout identical, so a
+    # transaction copy (built as a plain Prisma) can be switched over to this class
+    __slots__ = ()
+
+    async def _execute(self, method, arguments, model=None, root_selection=None):
+        if method in ("query_raw", "query_first", "execute_raw"):
+            query = arguments["query"]
+        else:
+            query = f"{model.__name__ if model else '?'}.{method}"
+        started = time.perf_counter()
+        try:
+            response = await super()._execute(method, arguments, model, root_selection)
+        except Exception as e:
+            record_query(query, (time.perf_counter() - started) * 1000, error=type(e).__name__)
+            raise
+        record_query(query, (time.perf_counter() - started) * 1000, _row_count(response))
+        return response
+
+    def _copy(self) -> "ProfiledPrisma":
+        # Transactions run on a copy of the client; keep the copy profiled as well
+        copy = super()._copy()
+        copy.__class__ = ProfiledPrisma
+        return copy
+
+
+def _row_count(response) -> Optional[int]:
+    result = response.get("data", {}).get("result") if isinstance(response, dict) else None
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        return result["count"] if isinstance(result.get("count"), int) else 1
+    if isinstance(result, int):
+        return result
+    return 0 if result is None else 1
+
+
+def create_client(url: Optional[str], connection_limit: Optional[int] = None) -> Prisma:
+    """Create a Prisma client with the configured pool and engine timeout"""
+    if not url:
+        return ProfiledPrisma(http={"timeout": settings.db_engine_timeout})
+    return ProfiledPrisma(
+        datasource={"url": build_datasource_url(url, connection_limit)},
+        http={"timeout": settings.db_engine_timeout},
+    )
+
+
+# Primary handles all writes; the optional replica serves public and dashboard reads
+prisma = create_client(settings.database_url, settings.db_connection_limit)
+prisma_replica: Optional[Prisma] = (
+    create_client(settings.database_replica_url, settings.db_replica_connection_limit or settings.db_connection_limit)
+    if settings.database_replica_url
+    else None
+)
+
+# Keys (e.g. "owner:<id>", "catalog:<id>", "code:<code>") written recently, with their stickiness deadline
+_recent_writes: Dict[str, float] = {}
+
+# Response header telling the client when it last wrote (epoch milliseconds); the client sends
+# it back so its reads stay on the primary whichever worker handles them
+LAST_WRITE_HEADER = "X-Last-Write"
+
+
+class WriteMarker:
+    """Read-your-writes state of the current request"""
+
+    __slots__ = ("client_write", "wrote")
+
+    def __init__(self, client_write: Optional[float]):
+        # Epoch seconds of the client's last write (from its X-Last-Write header), if recent
+        self.client_write = client_write
+        # Epoch seconds of a write made by this request
+        self.wrote: Optional[float] = None
+
+    def sticky(self) -> bool:
+        return self.client_write is not None and time.time() - self.client_write < settings.db_sticky_seconds
+
+
+current_write_marker: ContextVar[Optional[WriteMarker]] = ContextVar("current_write_marker", default=None)
+
+
+def mark_write(*keys: str) -> None:
+    """Record a write so reads for these keys (and the writing client's reads, on any worker)
+    go to the primary until the replica catches up"""
+    marker = current_write_marker.get()
+    if marker is not None:
+        marker.wrote = time.time()
+    if prisma_replica is None:
+        return
+    now = time.monotonic()
+    deadline = now + settings.db_sticky_seconds
+    for key in keys:
+        _recent_writes[key] = deadline
+    if len(_recent_writes) > 10000:
+        for key, expires in list(_recent_writes.items()):
+            if expires <= now:
+                del _recent_writes[key]
+
+
+def recently_written(*keys: str) -> bool:
+    """Whether any of the keys was written on this worker, or the client wrote anywhere, within the stickiness window"""
+    marker = current_write_marker.get()
+    if marker is not None and marker.sticky():
+        return True
+    now = time.monotonic()
+    return any(_recent_writes.get(key, 0) > now for key in keys)
+
+
+def read_client(*keys: str) -> Prisma:
+    """Pick the client for a read: the replica, unless one of the keys was just written"""
+    if prisma_replica is None or recently_written(*keys):
+        return prisma
+    return prisma_replica
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware carrying the client's last write time between requests (X-Last-Write)
+
+    serve.py runs several workers, so the in-process `_recent_writes` alone would send a
+    follow-up read handled by another worker to the lagging replica. The header is carried
+    even without a replica: per-worker caches (the owner catalog cache) use it to skip
+    entries loaded before the client's last write.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        marker = WriteMarker(_parse_last_write(Headers(scope=scope).get(LAST_WRITE_HEADER)))
+        token = current_write_marker.set(marker)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and marker.wrote is not None:
+                MutableHeaders(scope=message)[LAST_WRITE_HEADER] = str(int(marker.wrote * 1000))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_write_marker.reset(token)
+
+
+def _parse_last_write(value: Optional[str]) -> Optional[float]:
+    """Epoch seconds from an X-Last-Write value; malformed or future values are ignored"""
+    try:
+        written = int(value) / 1000 if value else None
+    except ValueError:
+        return None
+    if written is None or written > time.time() + 1:
+        return None
+    return written
 
-prisma = Prisma()
 
 async def connect_db():
     """Connect to the database"""
     await prisma.connect()
+    if prisma_replica is not None:
+        await prisma_replica.connect()
+
+async def warm_up_db():
+    """Run trivial queries so the query engine and connections are ready before the first request"""
+    await prisma.query_raw("SELECT 1")
+    await prisma.catalog.find_first(where={"id": ""})
+    if prisma_replica is not None:
+        await prisma_replica.query_raw("SELECT 1")
+        await prisma_replica.catalog.find_first(where={"id": ""})
 
 async def disconnect_db():
     """Disconnect from the database"""
+    if prisma_replica is not None and prisma_replica.is_connected():
+        await prisma_replica.disconnect()
     await prisma.disconnect()
-
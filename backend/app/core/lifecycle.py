@@ -0,0 +1,114 @@
+import asyncio
+import random
+import time
+import uvicorn
+from typing import Callable, List
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTracker:
+    """Tracks in-flight requests and whether this worker is draining"""
+
+    def __init__(self):
+        self.in_flight = 0
+        # Set when the shutdown signal arrives: /health answers 503 and event streams end
+        self.draining = False
+        self._drain_callbacks: List[Callable[[], None]] = []
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def on_drain(self, callback: Callable[[], None]) -> None:
+        """Run `callback` (on the event loop) when draining starts, e.g. to end long-lived streams"""
+        self._drain_callbacks.append(callback)
+
+    def start_draining(self) -> None:
+        if self.draining:
+            return
+        self.draining = True
+        for callback in self._drain_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Drain callback failed: {str(e)}")
+
+    def started(self) -> None:
+        self.in_flight += 1
+        self._idle.clear()
+
+    def finished(self) -> None:
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self._idle.set()
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """Wait until no requests are in flight; returns False if the timeout was hit"""
+        self.start_draining()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"Shutdown timeout with {self.in_flight} requests still in flight")
+            return False
+
+
+request_tracker = RequestTracker()
+
+
+class RequestTrackingMiddleware:
+    """ASGI middleware counting in-flight HTTP requests for graceful drain"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_tracker.started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_tracker.finished()
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that drains before it stops serving
+
+    On the first SIGTERM/SIGINT the worker starts draining (/health answers 503, open
+    event streams are ended and new ones refused) but keeps accepting requests for DRAIN_SECONDS, so the load balancer
+    sees the failing health check and moves traffic away first. Then uvicorn's normal
+    graceful shutdown runs. A second signal shuts down right away.
+
+    Each worker process adds its own random WORKER_MAX_REQUESTS_JITTER to uvicorn's
+    `limit_max_requests`, so workers started together do not recycle at the same moment.
+    """
+
+    def __init__(self, config: uvicorn.Config) -> None:
+        super().__init__(config)
+        self.drain_deadline = None
+
+    def run(self, sockets=None) -> None:
+        # Runs in the worker process, so every worker (and every replacement) draws its own jitter
+        if self.config.limit_max_requests:
+            self.config.limit_max_requests += random.randint(0, settings.worker_max_requests_jitter)
+        super().run(sockets=sockets)
+
+    def handle_exit(self, sig, frame) -> None:
+        if self.drain_deadline is None and settings.drain_seconds > 0 and not self.should_exit:
+            # Called from the signal handler: only set the deadline, the main loop (on_tick) acts on it
+            self.drain_deadline = time.monotonic() + settings.drain_seconds
+            return
+        super().handle_exit(sig, frame)
+
+    async def on_tick(self, counter: int) -> bool:
+        if self.drain_deadline is not None and not request_tracker.draining:
+            logger.info(f"Draining for {settings.drain_seconds}s before shutting down")
+            request_tracker.start_draining()
+        if self.drain_deadline is not None and not self.should_exit and time.monotonic() >= self.drain_deadline:
+            self.should_exit = True
+        return await super().on_tick(counter)
@@ -0,0 +1,96 @@
+"""Response format negotiation: JSON (default) or MessagePack
+
+The MessagePack encoding keeps the JSON document's shape except for item and image
+arrays, which become tables: {"fields": [...], "rows": [[...], ...]}. Every key is
+sent once per table instead of once per object, and keys implied by nesting
+(`catalogId` on items, `itemId` on images) are dropped. Values are the JSON values,
+so datetimes stay ISO 8601 strings.
+"""
+import json
+from typing import Any, Dict, List, Optional
+from app.models.schemas import ItemImageResponse, ItemResponse
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, JSON is always available
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Accept header names clients use for MessagePack
+MSGPACK_ALIASES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+# Table columns follow the response models, minus the parent ids implied by nesting
+ITEM_FIELDS = tuple(name for name in ItemResponse.model_fields if name != "catalogId")
+IMAGE_FIELDS = tuple(name for name in ItemImageResponse.model_fields if name != "itemId")
+
+
+def choose_media_type(accept: Optional[str]) -> str:
+    """Pick JSON or MessagePack from an Accept header
+
+    MessagePack is only chosen when the client names it with a higher q-value than
+    JSON (or the same q-value, listed first). Anything else, including no header or
+    a wildcard, gets JSON.
+    """
+    if not accept or msgpack is None:
+        return JSON_MEDIA_TYPE
+
+    msgpack_rank = json_rank = None
+    for position, part in enumerate(accept.split(",")):
+        media_range, _, params = part.strip().partition(";")
+        media_range = media_range.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        rank = (quality, -position)
+        if media_range in MSGPACK_ALIASES:
+            msgpack_rank = max(msgpack_rank or rank, rank)
+        elif media_range in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+            json_rank = max(json_rank or rank, rank)
+
+    if msgpack_rank and msgpack_rank[0] > 0 and (json_rank is None or msgpack_rank > json_rank):
+        return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def _table(records: Optional[List[Dict[str, Any]]], fields: tuple, nested: Optional[Dict[str, tuple]] = None) -> dict:
+    rows = []
+    for record in records or []:
+        row = []
+        for field in fields:
+            value = record.get(field)
+            if nested and field in nested and value is not None:
+                value = _table(value, nested[field])
+            row.append(value)
+        rows.append(row)
+    return {"fields": list(fields), "rows": rows}
+
+
+def columnar_catalog(catalog: Dict[str, Any]) -> Dict[str, Any]:
+    """Rewrite a catalog's item and image arrays (JSON-mode dict) as tables"""
+    if "items" not in catalog:
+        return catalog
+    return {
+        **catalog,
+        "items": _table(catalog["items"], ITEM_FIELDS, {"images": IMAGE_FIELDS}),
+    }
+
+
+def pack(document: Any) -> bytes:
+    """Encode a JSON-mode document (one catalog or a list of them) as columnar MessagePack"""
+    if isinstance(document, list):
+        document = [columnar_catalog(catalog) for catalog in document]
+    else:
+        document = columnar_catalog(document)
+    return msgpack.packb(document, use_bin_type=True)
+
+
+def pack_json(body: bytes) -> bytes:
+    """Re-encode a serialized JSON catalog body as columnar MessagePack"""
+    return pack(json.loads(body))
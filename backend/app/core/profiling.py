@@ -0,0 +1,197 @@
+"""Per-request query capture and opt-in sampling profiler
+
+Every request gets an id and a RequestProfile collecting its Prisma queries (see
+ProfiledPrisma in app.core.database). When a request finishes, one log line reports
+its status, latency and query totals; requests over SLOW_REQUEST_MS or
+SLOW_REQUEST_QUERIES are logged as warnings with their query list.
+
+A request is also stack-sampled when it sends `X-Profile: <PROFILE_TOKEN>` or is
+picked by PROFILE_SAMPLE_RATE. A thread samples the event loop thread's stack every
+PROFILE_INTERVAL_MS and the collapsed stacks (flame graph input) are attached to the
+request log. Only one request per process is sampled at a time; the loop thread is
+shared, so samples can include other requests running at the same instant.
+"""
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.core.request_context import new_request_id, request_id_var
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Queries kept per request for the log (all are counted)
+MAX_RECORDED_QUERIES = 50
+# Frames kept per sampled stack (innermost) and stacks reported in the flame summary
+MAX_STACK_DEPTH = 12
+FLAME_SUMMARY_SIZE = 15
+# SQL text is truncated in the log
+MAX_SQL_LENGTH = 300
+
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+
+class QueryEvent:
+    __slots__ = ("query", "duration_ms", "rows", "error")
+
+    def __init__(self, query: str, duration_ms: float, rows: Optional[int], error: Optional[str]):
+        self.query = query
+        self.duration_ms = duration_ms
+        self.rows = rows
+        self.error = error
+
+    def to_dict(self) -> dict:
+        entry = {"query": self.query, "ms": round(self.duration_ms, 2), "rows": self.rows}
+        if self.error:
+            entry["error"] = self.error
+        return entry
+
+
+class RequestProfile:
+    """Queries issued while handling one request"""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.query_count = 0
+        self.query_ms = 0.0
+        self.queries: List[QueryEvent] = []
+
+    def add_query(self, event: QueryEvent) -> None:
+        self.query_count += 1
+        self.query_ms += event.duration_ms
+        if len(self.queries) < MAX_RECORDED_QUERIES:
+            self.queries.append(event)
+
+
+def record_query(query: str, duration_ms: float, rows: Optional[int] = None, error: Optional[str] = None) -> None:
+    """Attach a query to the current request's profile (no-op outside requests)"""
+    profile = current_profile.get()
+    if profile is not None:
+        if len(query) > MAX_SQL_LENGTH:
+            query = query[:MAX_SQL_LENGTH] + "..."
+        profile.add_query(QueryEvent(query, duration_ms, rows, error))
+
+
+class StackSampler:
+    """Samples one thread's Python stack on an interval from a helper thread"""
+
+    # Held while a request is being sampled; other requests skip sampling instead of waiting
+    _active = threading.Lock()
+
+    def __init__(self, thread_id: int, interval: float, max_seconds: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def start_for_current_thread(cls) -> Optional["StackSampler"]:
+        if not cls._active.acquire(blocking=False):
+            return None
+        sampler = cls(threading.get_ident(), settings.profile_interval_ms / 1000, settings.profile_max_seconds)
+        sampler._thread = threading.Thread(target=sampler._run, name="request-profiler", daemon=True)
+        sampler._thread.start()
+        return sampler
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def stop(self) -> dict:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        StackSampler._active.release()
+        return {
+            "samples": self.samples,
+            "interval_ms": settings.profile_interval_ms,
+            "stacks": [
+                {"stack": stack, "samples": count, "pct": round(100 * count / self.samples, 1)}
+                for stack, count in self.stacks.most_common(FLAME_SUMMARY_SIZE)
+            ],
+        }
+
+
+def should_sample(headers: Headers) -> bool:
+    if "text/event-stream" in headers.get("accept", ""):
+        # Long-lived streams would hold the sampler for their whole lifetime
+        return False
+    token = headers.get("x-profile")
+    if token and settings.profile_token and token == settings.profile_token:
+        return True
+    return settings.profile_sample_rate > 0 and random.random() < settings.profile_sample_rate
+
+
+class RequestProfilingMiddleware:
+    """Assigns request ids, collects per-request queries and logs one summary line per request"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        request_id = new_request_id(headers.get("x-request-id"))
+        profile = RequestProfile(request_id)
+        id_token = request_id_var.set(request_id)
+        profile_token = current_profile.set(profile)
+        sampler = StackSampler.start_for_current_thread() if should_sample(headers) else None
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            flame = sampler.stop() if sampler is not None else None
+            self._log(scope, status, duration_ms, profile, flame)
+            current_profile.reset(profile_token)
+            request_id_var.reset(id_token)
+
+    @staticmethod
+    def _log(scope: Scope, status: int, duration_ms: float, profile: RequestProfile, flame: Optional[dict]) -> None:
+        slow = duration_ms >= settings.slow_request_ms
+        chatty = profile.query_count >= settings.slow_request_queries
+        fields = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status,
+            "duration_ms": round(duration_ms, 1),
+            "queries": profile.query_count,
+            "query_ms": round(profile.query_ms, 1),
+        }
+        if slow or chatty:
+            fields["flags"] = [flag for flag, on in (("slow", slow), ("query_heavy", chatty)) if on]
+            fields["query_log"] = [event.to_dict() for event in profile.queries]
+        if flame is not None:
+            fields["profile"] = flame
+        level = logging.WARNING if (slow or chatty) else logging.INFO
+        logger.log(level, f"{scope['method']} {scope['path']} {status}", extra=fields)
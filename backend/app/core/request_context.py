@@ -0,0 +1,93 @@
+import json
+import logging
+import re
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+from app.core.config import settings
+
+# Id of the request being handled by the current task ("-" outside requests)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Incoming X-Request-ID values are reused only if they look like ids
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """Reuse a well-formed id from the client or proxy, otherwise generate one"""
+    if incoming and _REQUEST_ID_PATTERN.match(incoming):
+        return incoming
+    return uuid.uuid4().hex
+
+
+def client_ip(request) -> Optional[str]:
+    """The viewer's address: the X-Forwarded-For entry added by the outermost trusted proxy
+    (TRUSTED_PROXY_HOPS), then X-Real-IP, then the socket peer
+
+    Entries left of the trusted ones are whatever the client sent and are not used.
+    """
+    hops = settings.trusted_proxy_hops
+    if hops > 0:
+        forwarded_for = [entry.strip() for entry in request.headers.get("x-forwarded-for", "").split(",") if entry.strip()]
+        if forwarded_for:
+            return forwarded_for[max(len(forwarded_for) - hops, 0)]
+        real_ip = request.headers.get("x-real-ip")
+        if real_ip:
+            return real_ip.strip()
+    return request.client.host if request.client else None
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp every record with the current request id"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    """One line per record: JSON objects, or text with `key=value` extras"""
+
+    def __init__(self, json_output: bool = False):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+        self.json_output = json_output
+
+    def format(self, record: logging.LogRecord) -> str:
+        extras = {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+        if not self.json_output:
+            line = super().format(record)
+            if extras:
+                line += " " + " ".join(f"{key}={_compact(value)}" for key, value in extras.items())
+            return line
+
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+            **extras,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def _compact(value) -> str:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str, separators=(",", ":"))
+    return str(value)
+
+
+def configure_logging() -> None:
+    """Send all logs through one handler that carries request ids (LOG_FORMAT=json for JSON lines)"""
+    handler = logging.StreamHandler()
+    handler.addFilter(RequestIdFilter())
+    handler.setFormatter(StructuredFormatter(json_output=settings.log_format == "json"))
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(settings.log_level.upper())
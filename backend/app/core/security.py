@@ -1,17 +1,10 @@
-from supabase import create_client, Client
-from app.core.config import settings
-from fastapi import HTTPException, Depends
+from app.core.clients import get_supabase
+from fastapi import HTTPException, Depends, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
 
 security = HTTPBearer()
 
-# Initialize Supabase client
-supabase: Client = create_client(
-    settings.supabase_url,
-    settings.supabase_service_role_key
-)
-
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
@@ -22,7 +15,7 @@ async def get_current_user(
     try:
         token = credentials.credentials
         # Verify token with Supabase
-        response = supabase.auth.get_user(token)
+        response = get_supabase().auth.get_user(token)
         if not response or not response.user:
             raise HTTPException(status_code=401, detail="Invalid authentication token")
         
@@ -50,7 +43,7 @@ async def get_current_user_optional(
         return None
     try:
         token = credentials.credentials
-        response = supabase.auth.get_user(token)
+        response = get_supabase().auth.get_user(token)
         if response and response.user:
             user = response.user
             return {
@@ -63,3 +56,17 @@ async def get_current_user_optional(
     except Exception:
         return None
 
+
+
+async def get_current_user_stream(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
+    access_token: Optional[str] = Query(None)
+) -> dict:
+    """
+    Authentication for event streams - browsers' EventSource cannot send headers,
+    so the token may also be passed as ?access_token=...
+    """
+    token = credentials.credentials if credentials else access_token
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return await get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
@@ -0,0 +1,46 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Records how long each cold-start phase takes (imports, clients, DB connect, warmup)"""
+
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        self.phases: List[Dict[str, float]] = []
+
+    def start(self, started_at: Optional[float] = None) -> None:
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases.append({"phase": name, "ms": round(seconds * 1000, 1)})
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def ready(self) -> None:
+        self.ready_at = time.perf_counter()
+        logger.info(
+            "Startup completed in %.1f ms (%s)",
+            self.report()["total_ms"],
+            ", ".join(f"{phase['phase']}={phase['ms']}ms" for phase in self.phases),
+        )
+
+    def report(self) -> dict:
+        total = None
+        if self.started_at is not None and self.ready_at is not None:
+            total = round((self.ready_at - self.started_at) * 1000, 1)
+        return {"total_ms": total, "phases": self.phases}
+
+
+startup_timer = StartupTimer()
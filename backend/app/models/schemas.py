@@ -1,6 +1,6 @@
 from pydantic import BaseModel, model_validator
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Dict, Any, Literal
+from datetime import date, datetime
 
 
 # Catalog Schemas
@@ -16,6 +16,10 @@ class CatalogUpdate(BaseModel):
     coverPhoto: Optional[str] = None
 
 
+class CatalogCloneRequest(BaseModel):
+    title: Optional[str] = None  # Defaults to "<original title> (Copy)"
+
+
 class CatalogResponse(BaseModel):
     id: str
     title: str
@@ -23,6 +27,7 @@ class CatalogResponse(BaseModel):
     coverPhoto: Optional[str] = None
     ownerId: str
     createdAt: datetime
+    updatedAt: Optional[datetime] = None
     
     @model_validator(mode='before')
     @classmethod
@@ -64,6 +69,7 @@ class ItemImageResponse(BaseModel):
     order: int
     variantOptions: Optional[Dict[str, str]] = None
     createdAt: datetime
+    updatedAt: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -128,16 +134,74 @@ class ItemResponse(BaseModel):
     specifications: Optional[List[Dict[str, Any]]]
     variants: Optional[List[Dict[str, Any]]]
     createdAt: datetime
+    updatedAt: Optional[datetime] = None
     
     class Config:
         from_attributes = True
 
 
+class VariantSelectionResponse(BaseModel):
+    itemId: str
+    key: str
+    images: List[str]
+    related: List[str]
+    specifications: List[Dict[str, Any]]
+
+
+class VariantIndexResponse(BaseModel):
+    itemId: str
+    variants: List[str]
+    truncated: bool
+    combinations: Dict[str, Dict[str, Any]]
+
+
+# Batch Item Schemas
+class ItemBatchOperation(BaseModel):
+    op: Literal["create", "update", "delete", "reorder"]
+    itemId: Optional[str] = None  # Required for update, delete and reorder
+    create: Optional[ItemCreate] = None  # Payload for create
+    update: Optional[ItemUpdate] = None  # Payload for update
+    images: Optional[List[ImageOrderItem]] = None  # New image order for reorder
+    
+    @model_validator(mode='after')
+    def check_payload(self) -> 'ItemBatchOperation':
+        """Ensure each operation carries the fields it needs"""
+        if self.op == "create":
+            if self.create is None:
+                raise ValueError("create operation requires 'create'")
+        elif not self.itemId:
+            raise ValueError(f"{self.op} operation requires 'itemId'")
+        if self.op == "update" and self.update is None:
+            raise ValueError("update operation requires 'update'")
+        if self.op == "reorder" and self.images is None:
+            raise ValueError("reorder operation requires 'images'")
+        return self
+
+
+class ItemBatchRequest(BaseModel):
+    operations: List[ItemBatchOperation]
+
+
+class ItemBatchResult(BaseModel):
+    index: int
+    op: str
+    itemId: str
+    item: Optional[ItemResponse] = None  # None for deletes
+
+
+class ItemBatchResponse(BaseModel):
+    results: List[ItemBatchResult]
+
+
 # Share Code Schemas
 class ShareCodeCreate(BaseModel):
     expiresAt: Optional[datetime] = None
 
 
+class ShareCodeBulkCreate(BaseModel):
+    catalogIds: List[str]  # One new code per catalog
+
+
 class ShareCodeResponse(BaseModel):
     id: str
     code: str
@@ -145,6 +209,7 @@ class ShareCodeResponse(BaseModel):
     expiresAt: Optional[datetime]
     isActive: bool
     createdAt: datetime
+    updatedAt: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -155,3 +220,77 @@ class CatalogWithItems(CatalogResponse):
     items: List[ItemResponse]
     shareCodes: List[ShareCodeResponse]
 
+
+# Delta Sync Schemas
+class SyncTombstoneResponse(BaseModel):
+    entity: Literal["catalog", "item", "shareCode"]
+    entityId: str
+    catalogId: str
+    deletedAt: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class SyncResponse(BaseModel):
+    cursor: str  # Pass back as ?since= on the next sync
+    reset: bool  # True for a full snapshot: replace the local copy instead of merging
+    catalogs: List[CatalogResponse]
+    items: List[ItemResponse]  # Changed items with all their current images
+    shareCodes: List[ShareCodeResponse]
+    tombstones: List[SyncTombstoneResponse]
+
+
+
+# Share View Analytics Schemas
+class ShareCodeViewStats(BaseModel):
+    code: str
+    views: int
+    uniqueViewers: int  # Approximate (HyperLogLog)
+
+
+class DailyViewStats(BaseModel):
+    day: date
+    views: int
+    uniqueViewers: int
+
+
+class CatalogAnalyticsResponse(BaseModel):
+    catalogId: str
+    days: int
+    totalViews: int
+    uniqueViewers: int
+    codes: List[ShareCodeViewStats]
+    daily: List[DailyViewStats]
+
+
+# Dashboard Stats Schemas
+class CatalogStats(BaseModel):
+    id: str
+    title: str
+    createdAt: datetime
+    itemCount: int
+    imageCount: int
+    shareCodeCount: int
+    activeShareCodeCount: int
+
+
+class PeriodStats(BaseModel):
+    period: datetime  # Start of the day/week/month
+    items: int
+    catalogs: int
+
+
+class StatsTotals(BaseModel):
+    catalogs: int
+    items: int
+    images: int
+    shareCodes: int
+    activeShareCodes: int
+
+
+class DashboardStatsResponse(BaseModel):
+    totals: StatsTotals
+    catalogs: List[CatalogStats]
+    period: str
+    periods: List[PeriodStats]
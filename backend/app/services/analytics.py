@@ -0,0 +1,208 @@
+import asyncio
+import base64
+import hashlib
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.database import prisma, read_client
+from app.utils.hyperloglog import HyperLogLog
+from app.utils.timezone import get_ph_time_utc
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rows per upsert statement (7 parameters each)
+FLUSH_BATCH_SIZE = 100
+
+# Cap on buffered (code, day) keys if the database is unreachable for a long time
+MAX_PENDING_KEYS = 50000
+
+
+class PendingStat:
+    """In-memory view counter for one share code on one day"""
+
+    __slots__ = ("catalog_id", "views", "sketch")
+
+    def __init__(self, catalog_id: str):
+        self.catalog_id = catalog_id
+        self.views = 0
+        self.sketch = HyperLogLog()
+
+    def merge(self, other: "PendingStat") -> None:
+        self.views += other.views
+        self.sketch.merge(other.sketch)
+
+
+class ViewAnalytics:
+    """Aggregates share views in memory and flushes them to ShareViewStat in batches
+
+    Recording a view is a dictionary update plus a sketch register write, so the
+    public view path never waits on the database.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[str, date], PendingStat] = {}
+        self._flush_lock = asyncio.Lock()
+
+    def record_view(self, code: str, catalog_id: str, client_ip: Optional[str]) -> None:
+        key = (code, get_ph_time_utc().date())
+        stat = self._pending.get(key)
+        if stat is None:
+            if len(self._pending) >= MAX_PENDING_KEYS:
+                return
+            stat = self._pending[key] = PendingStat(catalog_id)
+        stat.views += 1
+        if client_ip:
+            # Only a hash of the viewer reaches the sketch
+            stat.sketch.add(hashlib.sha256(client_ip.encode()).hexdigest())
+
+    def pending_for_catalog(self, catalog_id: str) -> Dict[Tuple[str, date], PendingStat]:
+        """Unflushed stats for a catalog (this process only)"""
+        return {key: stat for key, stat in self._pending.items() if stat.catalog_id == catalog_id}
+
+    async def flush(self) -> int:
+        """Write buffered stats to the database; returns the number of rows upserted"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+            rows = list(pending.items())
+            flushed = 0
+            try:
+                for start in range(0, len(rows), FLUSH_BATCH_SIZE):
+                    batch = rows[start:start + FLUSH_BATCH_SIZE]
+                    await self._upsert_batch(batch)
+                    flushed += len(batch)
+            except Exception as e:
+                logger.error(f"Error flushing share view analytics: {str(e)}")
+                # Put unflushed stats back so they are retried on the next flush
+                for key, stat in rows[flushed:]:
+                    existing = self._pending.get(key)
+                    if existing is None:
+                        self._pending[key] = stat
+                    else:
+                        existing.merge(stat)
+            return flushed
+
+    async def _upsert_batch(self, batch: List[Tuple[Tuple[str, date], PendingStat]]) -> None:
+        async with prisma.tx() as tx:
+            # Serialize flushes of the same (code, day) across workers, including the first insert
+            # of a row (row locks only cover rows that already exist). Keys are locked in sorted
+            # order so two flushes with overlapping keys cannot deadlock.
+            lock_keys = sorted(f"{code}:{day.isoformat()}" for (code, day), _ in batch)
+            await tx.execute_raw(
+                "SELECT " + ", ".join(
+                    f"pg_advisory_xact_lock(hashtextextended(${i + 1}, 0))" for i in range(len(lock_keys))
+                ),
+                *lock_keys,
+            )
+            codes = sorted({code for (code, _), _ in batch})
+            placeholders = ", ".join(f"${i + 1}" for i in range(len(codes)))
+            existing_rows = await tx.query_raw(
+                f'SELECT "code", "day"::text AS "day", encode("uniqueSketch", \'base64\') AS "sketch" '
+                f'FROM "ShareViewStat" WHERE "code" IN ({placeholders}) AND "day" >= $%d::date'
+                % (len(codes) + 1),
+                *codes,
+                min(day for (_, day), _ in batch).isoformat(),
+            )
+            existing = {(row["code"], row["day"]): row["sketch"] for row in existing_rows}
+
+            values = []
+            params = []
+            for (code, day), stat in batch:
+                sketch = stat.sketch
+                stored = existing.get((code, day.isoformat()))
+                if stored:
+                    sketch.merge(HyperLogLog.from_bytes(base64.b64decode(stored)))
+                n = len(params)
+                values.append(
+                    f"(gen_random_uuid()::text, ${n + 1}, ${n + 2}, ${n + 3}::date, ${n + 4}::int, "
+                    f"decode(${n + 5}, 'base64'), ${n + 6}::int, now())"
+                )
+                params.extend([
+                    code,
+                    stat.catalog_id,
+                    day.isoformat(),
+                    stat.views,
+                    base64.b64encode(sketch.to_bytes()).decode(),
+                    sketch.count(),
+                ])
+
+            # Views of catalogs purged since they were recorded are dropped rather than failing
+            # the whole batch on the catalog foreign key
+            written = await tx.execute_raw(
+                'INSERT INTO "ShareViewStat" ("id", "code", "catalogId", "day", "views", "uniqueSketch", "uniqueViewers", "updatedAt") '
+                f'SELECT * FROM (VALUES {", ".join(values)}) AS v("id", "code", "catalogId", "day", "views", "uniqueSketch", "uniqueViewers", "updatedAt") '
+                'WHERE EXISTS (SELECT 1 FROM "Catalog" c WHERE c."id" = v."catalogId") '
+                'ON CONFLICT ("code", "day") DO UPDATE SET '
+                '"views" = "ShareViewStat"."views" + EXCLUDED."views", '
+                '"uniqueSketch" = EXCLUDED."uniqueSketch", '
+                '"uniqueViewers" = EXCLUDED."uniqueViewers", '
+                '"updatedAt" = now()',
+                *params,
+            )
+            if written < len(batch):
+                logger.info(f"Dropped view stats for {len(batch) - written} share codes of deleted catalogs")
+
+
+view_analytics = ViewAnalytics()
+
+
+async def get_catalog_analytics(catalog_id: str, days: int) -> dict:
+    """Aggregate stored and unflushed view stats for a catalog over the last `days` days"""
+    since = get_ph_time_utc().date() - timedelta(days=days - 1)
+    stats = await read_client(f"catalog:{catalog_id}").shareviewstat.find_many(
+        where={"catalogId": catalog_id, "day": {"gte": datetime.combine(since, time())}}
+    )
+
+    by_code: Dict[str, dict] = {}
+    by_day: Dict[date, dict] = {}
+    catalog_sketch = HyperLogLog()
+
+    def add(code: str, day: date, views: int, sketch: HyperLogLog):
+        code_entry = by_code.setdefault(code, {"views": 0, "sketch": HyperLogLog()})
+        code_entry["views"] += views
+        code_entry["sketch"].merge(sketch)
+        day_entry = by_day.setdefault(day, {"views": 0, "sketch": HyperLogLog()})
+        day_entry["views"] += views
+        day_entry["sketch"].merge(sketch)
+        catalog_sketch.merge(sketch)
+
+    for stat in stats:
+        day = stat.day.date() if hasattr(stat.day, "date") else stat.day
+        add(stat.code, day, stat.views, HyperLogLog.from_bytes(stat.uniqueSketch.decode()))
+
+    for (code, day), pending in view_analytics.pending_for_catalog(catalog_id).items():
+        if day >= since:
+            add(code, day, pending.views, pending.sketch)
+
+    return {
+        "catalogId": catalog_id,
+        "days": days,
+        "totalViews": sum(entry["views"] for entry in by_code.values()),
+        "uniqueViewers": catalog_sketch.count(),
+        "codes": sorted(
+            (
+                {"code": code, "views": entry["views"], "uniqueViewers": entry["sketch"].count()}
+                for code, entry in by_code.items()
+            ),
+            key=lambda entry: entry["views"],
+            reverse=True,
+        ),
+        "daily": [
+            {"day": day, "views": entry["views"], "uniqueViewers": entry["sketch"].count()}
+            for day, entry in sorted(by_day.items())
+        ],
+    }
+
+
+async def run_periodic_flush():
+    """Flush buffered share view analytics every ANALYTICS_FLUSH_SECONDS"""
+    while True:
+        try:
+            await asyncio.sleep(settings.analytics_flush_seconds)
+            await view_analytics.flush()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in periodic analytics flush: {str(e)}")
@@ -0,0 +1,174 @@
+"""Post-startup warm-up of the share view cache
+
+A fresh worker has an empty view cache and a cold query engine, so the first wave of
+share traffic would run the full nested view query for every code at once. After
+startup this loads the hottest active share codes into the view cache in the
+background: the codes with the most views over the last WARMUP_LOOKBACK_DAYS, topped
+up with the most recently created active codes. Loads go through the same coalesced
+path as requests, so a viewer arriving mid warm-up shares the load.
+
+Warm-up stops at WARMUP_MAX_CODES codes (and never more than the view cache holds),
+WARMUP_MAX_MB of cached views or WARMUP_MAX_SECONDS, whichever comes first, with
+WARMUP_CONCURRENCY loads at a time. The memory budget counts everything the warmed
+entries hold, including the MessagePack and compressed variants requests produce while
+warm-up runs. Warmed entries live for WARMUP_MAX_SECONDS + VIEW_CACHE_TTL_SECONDS, so
+the ones loaded first have not expired by the time warm-up ends. The warmed codes are
+recorded, and every view request afterwards is counted as a hit when it is served by
+the entry warm-up put in the cache. `report()` (GET /health/warmup) gives the key and
+request hit rates.
+"""
+import asyncio
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from app.core.config import settings
+from app.core.database import prisma
+from app.services.view_cache import CachedView, view_cache
+from app.utils.timezone import get_ph_time_utc
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Active codes ranked by recent views
+HOT_CODES_SQL = '''
+SELECT s."code", SUM(v."views")::int AS "views"
+FROM "ShareViewStat" v
+JOIN "ShareCode" s ON s."code" = v."code"
+JOIN "Catalog" c ON c."id" = s."catalogId"
+WHERE v."day" >= $1::date
+  AND s."isActive" AND (s."expiresAt" IS NULL OR s."expiresAt" > $2::timestamp)
+  AND c."deletedAt" IS NULL
+GROUP BY s."code"
+ORDER BY 2 DESC
+LIMIT $3
+'''
+
+
+class CacheWarmer:
+    def __init__(self):
+        # Warmed code -> expiry of the cache entry warm-up created (identifies that entry)
+        self.warmed: Dict[str, float] = {}
+        self.state = "idle"
+        self.stop_reason: Optional[str] = None
+        self.bytes = 0
+        self.failed = 0
+        self.duration_ms: Optional[float] = None
+        self.requests = 0
+        self.hits = 0
+        self._used: Set[str] = set()
+
+    @property
+    def ttl_seconds(self) -> float:
+        """View cache lifetime of warmed entries: the warm-up window plus the usual TTL"""
+        return settings.warmup_max_seconds + view_cache.ttl_seconds
+
+    def warmed_bytes(self) -> int:
+        """Bytes held by the warmed entries still in the view cache"""
+        total = 0
+        for code, expires_at in self.warmed.items():
+            cached = view_cache.peek(code)
+            if cached is not None and cached.expires_at == expires_at:
+                total += cached.size()
+        return total
+
+    async def select_codes(self, limit: int) -> List[str]:
+        """Most-viewed active codes, then the most recently created ones"""
+        now = get_ph_time_utc()
+        since = (now - timedelta(days=settings.warmup_lookback_days)).strftime("%Y-%m-%d")
+        rows = await prisma.query_raw(HOT_CODES_SQL, since, now.strftime("%Y-%m-%d %H:%M:%S"), limit)
+        codes = [row["code"] for row in rows]
+        if len(codes) < limit:
+            recent = await prisma.sharecode.find_many(
+                where={
+                    "isActive": True,
+                    "code": {"not_in": codes},
+                    "OR": [{"expiresAt": None}, {"expiresAt": {"gt": now}}],
+                    "catalog": {"is": {"deletedAt": None}},
+                },
+                order={"createdAt": "desc"},
+                take=limit - len(codes),
+            )
+            codes += [share_code.code for share_code in recent]
+        return codes
+
+    async def warm(self, load: Callable[[str], Awaitable[Optional[CachedView]]]) -> dict:
+        """Load hot share views into the view cache within the configured budget"""
+        limit = min(settings.warmup_max_codes, view_cache.max_entries)
+        if limit <= 0 or view_cache.ttl_seconds <= 0:
+            self.state = "disabled"
+            return self.report()
+
+        self.state = "running"
+        started = time.perf_counter()
+        deadline = started + settings.warmup_max_seconds
+        max_bytes = settings.warmup_max_mb * 1024 * 1024
+        try:
+            queue = list(reversed(await self.select_codes(limit)))
+        except Exception as e:
+            logger.warning(f"Cache warm-up could not select share codes: {str(e)}")
+            self.state = "failed"
+            return self.report()
+
+        async def worker() -> None:
+            while queue:
+                if time.perf_counter() >= deadline:
+                    self.stop_reason = self.stop_reason or "time budget"
+                    return
+                self.bytes = self.warmed_bytes()
+                if self.bytes >= max_bytes:
+                    self.stop_reason = self.stop_reason or "memory budget"
+                    return
+                code = queue.pop()
+                try:
+                    cached = await asyncio.wait_for(load(code), deadline - time.perf_counter())
+                except asyncio.TimeoutError:
+                    self.stop_reason = self.stop_reason or "time budget"
+                    return
+                except Exception:
+                    # Expired or deactivated since it was selected, or a failed query
+                    self.failed += 1
+                    continue
+                if cached is not None and code not in self.warmed:
+                    self.warmed[code] = cached.expires_at
+
+        await asyncio.gather(*(worker() for _ in range(max(1, settings.warmup_concurrency))))
+        self.bytes = self.warmed_bytes()
+        self.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.state = "done"
+        self.stop_reason = self.stop_reason or "all selected codes loaded"
+        logger.info(
+            f"Warmed {len(self.warmed)} share views in {self.duration_ms}ms",
+            extra={"bytes": self.bytes, "failed": self.failed, "stop_reason": self.stop_reason,
+                   "codes": list(self.warmed)[:50]},
+        )
+        return self.report()
+
+    def record_view(self, code: str, cached: Optional[CachedView]) -> None:
+        """Count a share view request against the warmed keys (called for every view)"""
+        if not self.warmed:
+            return
+        self.requests += 1
+        if cached is not None and self.warmed.get(code) == cached.expires_at:
+            self.hits += 1
+            self._used.add(code)
+
+    def report(self) -> dict:
+        warmed = len(self.warmed)
+        return {
+            "state": self.state,
+            "stopReason": self.stop_reason,
+            "warmed": warmed,
+            "bytes": self.bytes,
+            "failed": self.failed,
+            "durationMs": self.duration_ms,
+            # Share of warmed keys that served at least one request
+            "keyHitRate": round(len(self._used) / warmed, 3) if warmed else None,
+            # Share of view requests since warm-up served by a warmed entry
+            "requestHitRate": round(self.hits / self.requests, 3) if self.requests else None,
+            "requests": self.requests,
+            "hits": self.hits,
+            "codes": list(self.warmed),
+        }
+
+
+cache_warmer = CacheWarmer()
@@ -0,0 +1,132 @@
+"""Background purge of soft-deleted catalogs
+
+Deleting a catalog only sets Catalog.deletedAt and deactivates its share codes. This
+purger then removes the catalog's rows in bounded chunks, each its own short
+statement, so no single transaction locks the whole tree or writes it to the WAL at
+once. Image URLs come back from each chunk's DELETE ... RETURNING, so storage objects
+are removed chunk by chunk without ever loading the catalog tree into memory.
+"""
+import asyncio
+from typing import List
+from app.core.config import settings
+from app.core.database import prisma
+from app.utils.storage import delete_unreferenced_images_from_storage
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Soft-deleted catalogs picked up per purger pass
+CATALOGS_PER_PASS = 10
+
+# SKIP LOCKED lets purgers in several workers share a catalog without waiting on each other
+DELETE_IMAGES_SQL = '''
+DELETE FROM "ItemImage" WHERE "id" IN (
+    SELECT img."id" FROM "ItemImage" img JOIN "Item" i ON i."id" = img."itemId"
+    WHERE i."catalogId" = $1
+    LIMIT $2 FOR UPDATE OF img SKIP LOCKED
+)
+RETURNING "url"
+'''
+
+DELETE_ITEMS_SQL = '''
+DELETE FROM "Item" WHERE "id" IN (
+    SELECT "id" FROM "Item" WHERE "catalogId" = $1 LIMIT $2 FOR UPDATE SKIP LOCKED
+)
+'''
+
+DELETE_VIEW_STATS_SQL = '''
+DELETE FROM "ShareViewStat" WHERE "id" IN (
+    SELECT "id" FROM "ShareViewStat" WHERE "catalogId" = $1 LIMIT $2 FOR UPDATE SKIP LOCKED
+)
+'''
+
+
+class CatalogPurger:
+    """Purges soft-deleted catalogs periodically, or as soon as it is woken after a delete"""
+
+    def __init__(self):
+        self._wake = asyncio.Event()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    async def _pause(self) -> None:
+        if settings.purge_chunk_pause_ms > 0:
+            await asyncio.sleep(settings.purge_chunk_pause_ms / 1000)
+
+    async def _delete_storage(self, urls: List[str]) -> None:
+        if not urls:
+            return
+        try:
+            await delete_unreferenced_images_from_storage(urls)
+        except Exception as e:
+            # Leftover objects are picked up by the storage garbage collector
+            logger.warning(f"Failed to delete some images from storage: {str(e)}")
+
+    async def purge_catalog(self, catalog_id: str) -> dict:
+        """Delete a soft-deleted catalog's images, items, stats and finally the catalog row"""
+        chunk = settings.purge_chunk_size
+        stats = {"images": 0, "items": 0}
+
+        while True:
+            rows = await prisma.query_raw(DELETE_IMAGES_SQL, catalog_id, chunk)
+            stats["images"] += len(rows)
+            await self._delete_storage([row["url"] for row in rows])
+            if len(rows) < chunk:
+                break
+            await self._pause()
+
+        while True:
+            deleted = await prisma.execute_raw(DELETE_ITEMS_SQL, catalog_id, chunk)
+            stats["items"] += deleted
+            if deleted < chunk:
+                break
+            await self._pause()
+
+        while await prisma.execute_raw(DELETE_VIEW_STATS_SQL, catalog_id, chunk) >= chunk:
+            await self._pause()
+
+        # Share codes (a handful per catalog) go with the catalog row via the cascade
+        catalog = await prisma.catalog.find_unique(where={"id": catalog_id})
+        if catalog is None or catalog.deletedAt is None:
+            return stats
+        await prisma.catalog.delete_many(where={"id": catalog_id, "deletedAt": {"not": None}})
+        if catalog.coverPhoto:
+            await self._delete_storage([catalog.coverPhoto])
+        return stats
+
+    async def purge_pending(self) -> int:
+        """Purge the oldest soft-deleted catalogs; returns how many were purged"""
+        catalogs = await prisma.catalog.find_many(
+            where={"deletedAt": {"not": None}},
+            order={"deletedAt": "asc"},
+            take=CATALOGS_PER_PASS,
+        )
+        for catalog in catalogs:
+            stats = await self.purge_catalog(catalog.id)
+            logger.info(f"Purged catalog {catalog.id}: {stats['items']} items, {stats['images']} images")
+        return len(catalogs)
+
+    async def run(self) -> None:
+        """Purge every PURGE_INTERVAL_SECONDS, or right away when woken"""
+        while True:
+            try:
+                while await self.purge_pending() == CATALOGS_PER_PASS:
+                    await self._pause()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error purging deleted catalogs: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.purge_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+
+catalog_purger = CatalogPurger()
+
+
+async def run_catalog_purger():
+    """Background task purging soft-deleted catalogs"""
+    await catalog_purger.run()
@@ -0,0 +1,135 @@
+"""Shared cache (CDN) policy for public responses and surrogate-key purging
+
+Public share responses are cacheable by a CDN for CDN_S_MAXAGE seconds and may be
+served stale for CDN_STALE_WHILE_REVALIDATE more, never past the share code's
+expiry. They are tagged with surrogate keys (`Surrogate-Key` for Fastly-style CDNs,
+`Cache-Tag` for Cloudflare-style ones) so writes can purge exactly what they touch:
+
+    catalog-<catalogId>   every view of the catalog, under any of its codes
+    code-<code>           the view and validation responses of one share code
+
+Purges go through a pluggable hook. With CDN_PURGE_URL set, keys are POSTed there as
+{"keys": [...]}; `python -m app.services.cdn_stub` runs a local endpoint that
+records them. Keys are coalesced for CDN_PURGE_DELAY_MS so a burst of writes sends
+one request.
+"""
+import asyncio
+import json
+import urllib.request
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Protocol, Set
+from app.core.config import settings
+from app.utils.timezone import get_ph_time_utc
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Responses that must never be stored by shared caches (errors, invalid or expired codes)
+NO_STORE = {"Cache-Control": "no-store"}
+
+
+def catalog_key(catalog_id: str) -> str:
+    return f"catalog-{catalog_id}"
+
+
+def code_key(code: str) -> str:
+    return f"code-{code}"
+
+
+def public_cache_headers(keys: List[str], expires_at: Optional[datetime] = None) -> Dict[str, str]:
+    """Cache-Control and surrogate key headers for a public response, bounded by `expires_at`"""
+    s_maxage = settings.cdn_s_maxage
+    stale = settings.cdn_stale_while_revalidate
+    max_age = settings.cdn_browser_max_age
+    if expires_at is not None:
+        if expires_at.tzinfo is not None:
+            expires_at = expires_at.replace(tzinfo=None)
+        remaining = int((expires_at - get_ph_time_utc()).total_seconds())
+        if remaining <= 0:
+            return dict(NO_STORE)
+        s_maxage = min(s_maxage, remaining)
+        max_age = min(max_age, remaining)
+        stale = min(stale, remaining - s_maxage)
+    if s_maxage <= 0:
+        return dict(NO_STORE)
+
+    cache_control = f"public, max-age={max_age}, s-maxage={s_maxage}"
+    if stale > 0:
+        cache_control += f", stale-while-revalidate={stale}"
+    return {
+        "Cache-Control": cache_control,
+        "Surrogate-Key": " ".join(keys),
+        "Cache-Tag": ",".join(keys),
+    }
+
+
+class PurgeHook(Protocol):
+    async def purge(self, keys: List[str]) -> None: ...
+
+
+class HttpPurgeHook:
+    """POSTs {"keys": [...]} to a purge endpoint (a CDN API or the local stub)"""
+
+    def __init__(self, url: str, token: Optional[str] = None, timeout: float = 10.0):
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+
+    def _post(self, keys: List[str]) -> None:
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        request = urllib.request.Request(
+            self.url, data=json.dumps({"keys": keys}).encode(), headers=headers, method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    async def purge(self, keys: List[str]) -> None:
+        await asyncio.to_thread(self._post, keys)
+
+
+class CdnPurger:
+    """Collects surrogate keys to purge and hands them to the hook in coalesced batches"""
+
+    def __init__(self, hook: Optional[PurgeHook] = None):
+        self.hook = hook
+        self._pending: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def set_hook(self, hook: Optional[PurgeHook]) -> None:
+        self.hook = hook
+
+    def purge(self, keys: Iterable[str]) -> None:
+        """Queue keys for purging; safe to call from synchronous code on the event loop"""
+        if self.hook is None:
+            return
+        self._pending.update(keys)
+        if self._task is None or self._task.done():
+            try:
+                self._task = asyncio.get_running_loop().create_task(self._flush_later())
+            except RuntimeError:
+                pass  # No loop (scripts); keys are sent with the next flush
+
+    async def _flush_later(self) -> None:
+        # Keys queued while a batch is with the hook see this task still running and don't start
+        # another one, so keep flushing until nothing is left
+        while self._pending and self.hook is not None:
+            await asyncio.sleep(settings.cdn_purge_delay_ms / 1000)
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._pending or self.hook is None:
+            return
+        keys, self._pending = sorted(self._pending), set()
+        try:
+            await self.hook.purge(keys)
+            logger.info(f"Purged {len(keys)} surrogate keys", extra={"keys": keys[:20]})
+        except Exception as e:
+            # The CDN entries still expire on their own after s-maxage + stale-while-revalidate
+            logger.warning(f"Failed to purge surrogate keys: {str(e)}", extra={"keys": keys[:20]})
+
+
+cdn_purger = CdnPurger(
+    HttpPurgeHook(settings.cdn_purge_url, settings.cdn_purge_token) if settings.cdn_purge_url else None
+)
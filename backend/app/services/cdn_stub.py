@@ -0,0 +1,79 @@
+"""Local stand-in for a CDN purge API
+
+Records every purge request so the purge hook can be exercised without a CDN:
+
+    python -m app.services.cdn_stub --port 9999
+    CDN_PURGE_URL=http://localhost:9999/purge uvicorn main:app
+
+POST /purge with {"keys": [...]} records the keys; GET /purges lists what was
+received and DELETE /purges clears the list.
+"""
+import argparse
+import json
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+
+class PurgeStubHandler(BaseHTTPRequestHandler):
+    purges: List[dict] = []
+
+    def _reply(self, status: int, body: object) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self) -> None:
+        if self.path != "/purge":
+            self._reply(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            keys = json.loads(self.rfile.read(length) or b"{}").get("keys", [])
+        except ValueError:
+            self._reply(400, {"error": "invalid JSON"})
+            return
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "keys": keys,
+            "authorization": self.headers.get("Authorization"),
+        }
+        self.purges.append(entry)
+        print(f"purge: {' '.join(keys)}", flush=True)
+        self._reply(200, {"purged": len(keys)})
+
+    def do_GET(self) -> None:
+        if self.path != "/purges":
+            self._reply(404, {"error": "not found"})
+            return
+        self._reply(200, self.purges)
+
+    def do_DELETE(self) -> None:
+        if self.path != "/purges":
+            self._reply(404, {"error": "not found"})
+            return
+        self.purges.clear()
+        self._reply(200, {"cleared": True})
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # Purges are printed above; skip the per-request access log
+
+
+def serve(port: int) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", port), PurgeStubHandler)
+    print(f"CDN purge stub listening on http://127.0.0.1:{port}/purge", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub for the CDN purge endpoint")
+    parser.add_argument("--port", type=int, default=9999)
+    serve(parser.parse_args().port)
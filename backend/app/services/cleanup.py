@@ -2,6 +2,7 @@ import asyncio
 from datetime import timedelta
 from app.core.database import prisma
 from app.utils.timezone import get_ph_time_utc
+from app.services.sync import prune_tombstones, tombstone
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,40 +12,13 @@ GRACE_PERIOD_DAYS = 7
 
 
 async def deactivate_expired_share_codes():
-    """Deactivate share codes that have expired (as a safety measure)"""
+    """Deactivate share codes that have expired (backstop for the expiry scheduler)"""
     try:
-        current_time = get_ph_time_utc()
-        
-        # Find all active share codes that have expired
-        all_codes = await prisma.sharecode.find_many(
-            where={
-                "isActive": True,
-                "expiresAt": {
-                    "not": None
-                }
-            }
+        deactivated_count = await prisma.sharecode.update_many(
+            where={"isActive": True, "expiresAt": {"lt": get_ph_time_utc()}},
+            data={"isActive": False}
         )
         
-        # Filter and deactivate expired codes
-        deactivated_count = 0
-        for code in all_codes:
-            if code.expiresAt:
-                expires_at = code.expiresAt
-                # Ensure naive datetime for comparison
-                if expires_at.tzinfo is not None:
-                    expires_at = expires_at.replace(tzinfo=None)
-                
-                # If expired, deactivate it
-                if expires_at < current_time:
-                    try:
-                        await prisma.sharecode.update(
-                            where={"id": code.id},
-                            data={"isActive": False}
-                        )
-                        deactivated_count += 1
-                    except Exception as e:
-                        logger.warning(f"Failed to deactivate share code {code.id}: {str(e)}")
-        
         if deactivated_count > 0:
             logger.info(f"Deactivated {deactivated_count} expired share codes")
         
@@ -68,7 +42,8 @@ async def cleanup_expired_share_codes():
                 "expiresAt": {
                     "not": None
                 }
-            }
+            },
+            include={"catalog": True}
         )
         
         # Filter codes that expired before cutoff_date
@@ -87,7 +62,11 @@ async def cleanup_expired_share_codes():
             deleted_count = 0
             for code in expired_codes:
                 try:
-                    await prisma.sharecode.delete(where={"id": code.id})
+                    async with prisma.tx() as tx:
+                        await tx.sharecode.delete(where={"id": code.id})
+                        await tx.synctombstone.create(
+                            data=tombstone(code.catalog.ownerId, "shareCode", code.id, code.catalogId)
+                        )
                     deleted_count += 1
                 except Exception as e:
                     logger.warning(f"Failed to delete share code {code.id}: {str(e)}")
@@ -110,6 +89,7 @@ async def run_periodic_cleanup():
             # First deactivate expired codes, then delete old ones
             await deactivate_expired_share_codes()
             await cleanup_expired_share_codes()
+            await prune_tombstones()
         except Exception as e:
             logger.error(f"Error in periodic cleanup task: {str(e)}")
             await asyncio.sleep(60)  # Wait 1 minute before retrying
@@ -0,0 +1,90 @@
+"""Pool of pre-generated share codes
+
+Issuing a code used to loop on a `count` query until a random code was unused. The
+pool instead keeps SHARE_CODE_POOL_SIZE codes that were checked against the
+database in one batched query when generated, so taking one costs nothing and
+issuing it is a single insert. The unique constraint on ShareCode.code still has
+the final say (another worker may draw the same code), and callers retry with a
+new code on conflict. The pool is refilled in the background when it drops below
+half; with SHARE_CODE_POOL_SIZE=0 codes are generated on demand.
+"""
+import asyncio
+from collections import deque
+from typing import Deque, List
+from app.core.config import settings
+from app.core.database import prisma
+from app.utils.share_code import generate_share_code
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ShareCodePool:
+    def __init__(self, size: int):
+        self.size = size
+        self._codes: Deque[str] = deque()
+        self._refill_task = None
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def take(self) -> str:
+        """A code that was unused when pooled, or a fresh random one if the pool is empty"""
+        code = self._codes.popleft() if self._codes else generate_share_code()
+        self._maybe_refill()
+        return code
+
+    def take_many(self, count: int) -> List[str]:
+        codes = set()
+        while self._codes and len(codes) < count:
+            codes.add(self._codes.popleft())
+        while len(codes) < count:
+            codes.add(generate_share_code())
+        self._maybe_refill()
+        return list(codes)
+
+    def start_refill(self) -> None:
+        """Refill in the background unless a refill is already running (one at a time, so the pool never overfills)"""
+        if self.size <= 0:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.get_running_loop().create_task(self.refill())
+
+    async def stop(self) -> None:
+        if self._refill_task is not None and not self._refill_task.done():
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+
+    def _maybe_refill(self) -> None:
+        if len(self._codes) >= self.size // 2:
+            return
+        try:
+            self.start_refill()
+        except RuntimeError:
+            pass  # No loop (scripts); codes are generated on demand
+
+    async def refill(self) -> int:
+        """Top the pool up to its size with codes not present in the database"""
+        needed = self.size - len(self._codes)
+        if needed <= 0:
+            return 0
+        try:
+            pooled = set(self._codes)
+            candidates = set()
+            while len(candidates) < needed:
+                code = generate_share_code()
+                if code not in pooled:
+                    candidates.add(code)
+            taken = await prisma.sharecode.find_many(where={"code": {"in": list(candidates)}})
+            fresh = candidates - {share_code.code for share_code in taken}
+            self._codes.extend(fresh)
+            return len(fresh)
+        except Exception as e:
+            logger.warning(f"Failed to refill share code pool: {str(e)}")
+            return 0
+
+
+share_code_pool = ShareCodePool(settings.share_code_pool_size)
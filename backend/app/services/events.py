@@ -0,0 +1,239 @@
+import asyncio
+import itertools
+import json
+from typing import Callable, Dict, Optional, Set
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+from app.core.config import settings
+from app.core.lifecycle import request_tracker
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis is only needed for the cross-worker backend
+    aioredis = None
+
+# Sent to a subscriber whose queue overflowed; the client should refetch the catalog
+RESYNC_EVENT = "event: resync\ndata: {}\n\n"
+# Control message on a catalog topic (never sent to clients): end the streams opened with this share code
+CLOSE_CODE_PREFIX = "close-code:"
+
+
+class Subscription:
+    """One SSE connection's bounded queue of preformatted events"""
+
+    def __init__(self, broker: "EventBroker", topic: str, max_queue: int, code: Optional[str] = None):
+        self.broker = broker
+        self.topic = topic
+        # Share code a public stream was opened with (None for owner streams)
+        self.code = code
+        self.queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def deliver(self, message: Optional[str]) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Backpressure: a slow client loses its backlog and is told to resync instead of
+            # letting its queue grow without bound
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_EVENT if message is not None else None)
+
+    async def get(self) -> Optional[str]:
+        return await self.queue.get()
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class LocalBackend:
+    """Delivers events to subscribers in this process only"""
+
+    async def start(self, deliver: Callable[[str, str], None]) -> None:
+        self.deliver = deliver
+
+    async def publish(self, topic: str, message: str) -> None:
+        self.deliver(topic, message)
+
+    async def stop(self) -> None:
+        pass
+
+
+class RedisBackend:
+    """Fans events out across workers through Redis pub/sub"""
+
+    CHANNEL_PREFIX = "catalog-events:"
+
+    def __init__(self, url: str):
+        if aioredis is None:
+            raise RuntimeError("EVENTS_BACKEND=redis requires the 'redis' package")
+        self.client = aioredis.from_url(url)
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Callable[[str, str], None]) -> None:
+        self.deliver = deliver
+        pubsub = self.client.pubsub()
+        await pubsub.psubscribe(f"{self.CHANNEL_PREFIX}*")
+        self._listener = asyncio.create_task(self._listen(pubsub))
+
+    async def _listen(self, pubsub) -> None:
+        async for message in pubsub.listen():
+            if message.get("type") != "pmessage":
+                continue
+            channel = message["channel"].decode()
+            self.deliver(channel[len(self.CHANNEL_PREFIX):], message["data"].decode())
+
+    async def publish(self, topic: str, message: str) -> None:
+        await self.client.publish(f"{self.CHANNEL_PREFIX}{topic}", message)
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+        await self.client.aclose()
+
+
+class EventBroker:
+    """In-process pub/sub for catalog change events with a pluggable cross-worker backend"""
+
+    def __init__(self, max_queue: int, max_subscribers: int):
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self.backend = None
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._count = 0
+        self._ids = itertools.count(1)
+
+    async def start(self) -> None:
+        if settings.events_backend == "redis":
+            self.backend = RedisBackend(settings.events_redis_url)
+        else:
+            self.backend = LocalBackend()
+        await self.backend.start(self._dispatch)
+
+    async def stop(self) -> None:
+        self.close_all()
+        if self.backend is not None:
+            await self.backend.stop()
+
+    def close_all(self) -> None:
+        """End every open stream so connections close instead of holding up the shutdown"""
+        for subscribers in list(self._subscribers.values()):
+            for subscription in list(subscribers):
+                subscription.deliver(None)
+
+    def subscribe(self, catalog_id: str, code: Optional[str] = None) -> Optional[Subscription]:
+        """Open a subscription to a catalog's events, or None if this worker is at capacity or draining"""
+        if self._count >= self.max_subscribers or request_tracker.draining:
+            return None
+        subscription = Subscription(self, catalog_id, self.max_queue, code)
+        self._subscribers.setdefault(catalog_id, set()).add(subscription)
+        self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.topic)
+        if subscribers and subscription in subscribers:
+            subscribers.discard(subscription)
+            self._count -= 1
+            if not subscribers:
+                del self._subscribers[subscription.topic]
+
+    def publish(self, catalog_id: str, event_type: str, data: dict) -> None:
+        """Publish a change event; the message is serialized once for all subscribers"""
+        if self.backend is None:
+            return
+        payload = json.dumps({"type": event_type, "catalogId": catalog_id, **data}, default=str, separators=(",", ":"))
+        message = f"id: {next(self._ids)}\nevent: {event_type}\ndata: {payload}\n\n"
+        if isinstance(self.backend, LocalBackend):
+            self._dispatch(catalog_id, message)
+        else:
+            task = asyncio.create_task(self.backend.publish(catalog_id, message))
+            task.add_done_callback(_log_publish_error)
+
+    def close_code(self, catalog_id: str, code: str) -> None:
+        """End the public streams opened with a share code, on every worker"""
+        if self.backend is None:
+            return
+        message = f"{CLOSE_CODE_PREFIX}{code}"
+        if isinstance(self.backend, LocalBackend):
+            self._dispatch(catalog_id, message)
+        else:
+            task = asyncio.create_task(self.backend.publish(catalog_id, message))
+            task.add_done_callback(_log_publish_error)
+
+    def _dispatch(self, topic: str, message: str) -> None:
+        if message.startswith(CLOSE_CODE_PREFIX):
+            code = message[len(CLOSE_CODE_PREFIX):]
+            for subscription in list(self._subscribers.get(topic, ())):
+                if subscription.code == code:
+                    subscription.deliver(None)
+            return
+        for subscription in list(self._subscribers.get(topic, ())):
+            subscription.deliver(message)
+
+
+def _log_publish_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Failed to publish catalog event: {task.exception()}")
+
+
+event_broker = EventBroker(
+    max_queue=settings.sse_queue_size,
+    max_subscribers=settings.sse_max_connections,
+)
+# Streams end as soon as the worker starts draining, not after uvicorn's graceful wait
+request_tracker.on_drain(event_broker.close_all)
+
+
+async def stream_events(request, subscription: Subscription, max_seconds: Optional[float] = None):
+    """Yield SSE frames for a subscription until the client leaves, the stream's lifetime ends
+    or the worker starts draining; heartbeats keep proxies from closing idle streams"""
+    loop = asyncio.get_running_loop()
+    lifetime = settings.sse_max_stream_seconds
+    if max_seconds is not None:
+        lifetime = min(lifetime, max_seconds)
+    deadline = loop.time() + lifetime
+    try:
+        yield f"retry: {settings.sse_retry_ms}\n\n"
+        while not request_tracker.draining:
+            timeout = min(settings.sse_heartbeat_seconds, deadline - loop.time())
+            if timeout <= 0:
+                break
+            try:
+                message = await asyncio.wait_for(subscription.get(), timeout)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            if message is None:
+                break
+            yield message
+    finally:
+        subscription.close()
+
+
+class EventStreamResponse(StreamingResponse):
+    """SSE response for a subscription; the subscription is released however the response ends
+
+    The generator's own cleanup only runs once iteration has started, so a client that
+    disconnects before the first frame would otherwise hold its slot forever.
+    """
+
+    def __init__(self, request, subscription: Subscription, max_seconds: Optional[float] = None):
+        super().__init__(
+            stream_events(request, subscription, max_seconds),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        self.subscription = subscription
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.subscription.close()
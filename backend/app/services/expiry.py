@@ -0,0 +1,203 @@
+"""Deactivates share codes at their exact expiry time
+
+Active codes expiring within the next EXPIRY_HORIZON_SECONDS are loaded into an
+in-memory heap, a page at a time, in (expiresAt, id) order over the
+(isActive, expiresAt) index. The next window is loaded once half of the current
+one has passed. The scheduler sleeps until the earliest expiry, then deactivates
+every code that is due in one update_many and drops the codes' cached views
+(locally and at the CDN). Codes created while running are pushed straight onto
+the heap when they fall inside the loaded window.
+
+Every worker runs a scheduler, since each has its own view cache to invalidate.
+The update only touches rows that are still active, so the extra updates are no-ops.
+At most EXPIRY_MAX_SCHEDULED codes are held; past that, the window is cut short
+and extended as codes expire. Overdue codes (from downtime) are in the first window.
+"""
+import asyncio
+import heapq
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from app.core.config import settings
+from app.core.database import prisma
+from app.services.invalidation import after_share_code_write
+from app.utils.timezone import get_ph_time_utc
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Keyset over the (isActive, expiresAt) index; ownerId comes along for cache invalidation
+EXPIRING_CODES_SQL = '''
+SELECT s."id", s."code", s."catalogId", s."expiresAt", c."ownerId"
+FROM "ShareCode" s JOIN "Catalog" c ON c."id" = s."catalogId"
+WHERE s."isActive" AND s."expiresAt" <= $3::timestamp
+  AND (s."expiresAt" > $1::timestamp OR (s."expiresAt" = $1::timestamp AND s."id" > $2))
+ORDER BY s."expiresAt", s."id"
+LIMIT $4
+'''
+
+# Start of the first window, so codes that expired while the service was down are included
+EARLIEST = datetime(1970, 1, 1)
+# Upper bound on one sleep, so clock adjustments are noticed
+MAX_SLEEP_SECONDS = 60.0
+# Pause after a failed load or update before trying again
+RETRY_SECONDS = 5.0
+
+
+class ScheduledCode(NamedTuple):
+    code: str
+    catalog_id: str
+    owner_id: str
+    expires_at: datetime
+
+
+def _naive_utc(value) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    return value
+
+
+def _timestamp_param(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+class ShareExpiryScheduler:
+    def __init__(self):
+        self._heap: List[Tuple[datetime, str]] = []
+        # Heap entries whose id is missing here, or whose expiry differs, are stale and skipped
+        self._scheduled: Dict[str, ScheduledCode] = {}
+        # Every active code expiring at or before this point is scheduled
+        self._loaded_until: Optional[datetime] = None
+        self._cursor: Tuple[datetime, str] = (EARLIEST, "")
+        self._wake = asyncio.Event()
+        self.deactivated = 0
+
+    def _push(self, code_id: str, entry: ScheduledCode) -> None:
+        self._scheduled[code_id] = entry
+        heapq.heappush(self._heap, (entry.expires_at, code_id))
+
+    def schedule(self, code_id: str, code: str, catalog_id: str, owner_id: str, expires_at: Optional[datetime]) -> None:
+        """Track a newly created code; codes beyond the loaded window are picked up by a later load"""
+        if expires_at is None or self._loaded_until is None:
+            return
+        expires_at = _naive_utc(expires_at)
+        if expires_at > self._loaded_until:
+            return
+        self._push(code_id, ScheduledCode(code, catalog_id, owner_id, expires_at))
+        self._wake.set()
+
+    def unschedule(self, code_id: str) -> None:
+        self._scheduled.pop(code_id, None)
+
+    async def load_window(self) -> int:
+        """Load active codes expiring up to now + EXPIRY_HORIZON_SECONDS, continuing from the last load"""
+        until = get_ph_time_utc() + timedelta(seconds=settings.expiry_horizon_seconds)
+        loaded = 0
+        while True:
+            room = settings.expiry_max_scheduled - len(self._scheduled)
+            if room <= 0:
+                # Full: the window ends at the last code loaded and grows as codes expire
+                self._loaded_until = self._cursor[0]
+                break
+            after, after_id = self._cursor
+            rows = await prisma.query_raw(
+                EXPIRING_CODES_SQL, _timestamp_param(after), after_id, _timestamp_param(until),
+                min(settings.expiry_page_size, room),
+            )
+            for row in rows:
+                expires_at = _naive_utc(row["expiresAt"])
+                self._push(row["id"], ScheduledCode(row["code"], row["catalogId"], row["ownerId"], expires_at))
+                self._cursor = (expires_at, row["id"])
+            loaded += len(rows)
+            if len(rows) < min(settings.expiry_page_size, room):
+                self._loaded_until = until
+                break
+        if loaded:
+            logger.info(f"Scheduled {loaded} share codes for expiry (window until {self._loaded_until})")
+        return loaded
+
+    async def expire_due(self) -> int:
+        """Deactivate every scheduled code whose expiry has passed"""
+        now = get_ph_time_utc()
+        due: Dict[str, ScheduledCode] = {}
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, code_id = heapq.heappop(self._heap)
+            entry = self._scheduled.get(code_id)
+            if entry is None or entry.expires_at != expires_at:
+                continue
+            due[code_id] = entry
+            del self._scheduled[code_id]
+
+        ids = list(due)
+        for start in range(0, len(ids), settings.expiry_batch_size):
+            batch = ids[start:start + settings.expiry_batch_size]
+            try:
+                await prisma.sharecode.update_many(
+                    where={"id": {"in": batch}, "isActive": True},
+                    data={"isActive": False},
+                )
+            except Exception:
+                # Put the rest back so the next pass retries them
+                for code_id in ids[start:]:
+                    self._push(code_id, due[code_id])
+                raise
+            for code_id in batch:
+                entry = due[code_id]
+                after_share_code_write(entry.code, entry.catalog_id, entry.owner_id)
+            self.deactivated += len(batch)
+        if ids:
+            logger.info(f"Deactivated {len(ids)} expired share codes")
+        return len(ids)
+
+    def _next_wake(self) -> float:
+        now = get_ph_time_utc()
+        timeout = MAX_SLEEP_SECONDS
+        if self._heap:
+            timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+        if self._loaded_until is not None and len(self._scheduled) < settings.expiry_max_scheduled:
+            refill_at = self._loaded_until - timedelta(seconds=settings.expiry_horizon_seconds / 2)
+            timeout = min(timeout, (refill_at - now).total_seconds())
+        return max(timeout, 0.0)
+
+    def _needs_load(self) -> bool:
+        if self._loaded_until is None:
+            return True
+        if len(self._scheduled) >= settings.expiry_max_scheduled:
+            return False
+        remaining = (self._loaded_until - get_ph_time_utc()).total_seconds()
+        return remaining <= settings.expiry_horizon_seconds / 2
+
+    async def run(self) -> None:
+        while True:
+            try:
+                if self._needs_load():
+                    await self.load_window()
+                await self.expire_due()
+                timeout = self._next_wake()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in share code expiry scheduler: {str(e)}")
+                timeout = RETRY_SECONDS
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def report(self) -> dict:
+        return {
+            "scheduled": len(self._scheduled),
+            "loadedUntil": self._loaded_until.isoformat() if self._loaded_until else None,
+            "nextExpiry": self._heap[0][0].isoformat() if self._heap else None,
+            "deactivated": self.deactivated,
+        }
+
+
+expiry_scheduler = ShareExpiryScheduler()
+
+
+async def run_expiry_scheduler():
+    """Background task deactivating share codes as they expire"""
+    await expiry_scheduler.run()
@@ -0,0 +1,244 @@
+"""Streaming ZIP export of a catalog: every image plus a CSV/JSON manifest
+
+The archive is written with the standard zipfile module into a non-seekable sink
+(entries use data descriptors), and whatever the sink has buffered is yielded after
+each entry, so the response starts immediately and memory stays bounded:
+
+- items are read in keyset pages of EXPORT_PAGE_SIZE,
+- at most EXPORT_DOWNLOAD_CONCURRENCY images are downloaded or waiting to be written
+  at any time, and entries are written in the order downloads finish,
+- images are stored uncompressed (they already are compressed); the manifests are
+  deflated,
+- manifest rows are spooled to temporary files (on disk once they grow) and copied
+  into the archive in chunks at the end.
+"""
+import asyncio
+import csv
+import io
+import json
+import re
+import tempfile
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+from app.core.config import settings
+from app.core.database import prisma
+from app.utils.storage import BUCKET_NAME, extract_storage_path, get_supabase_client
+import logging
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_CSV_COLUMNS = ("itemId", "name", "description", "specifications", "variants", "images", "createdAt")
+# Manifests up to this size stay in memory before spilling to disk
+SPOOL_MAX_SIZE = 1024 * 1024
+# Manifest bytes copied into the archive between yields
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+class StreamSink(io.RawIOBase):
+    """Write-only, non-seekable file object that buffers bytes until drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # zipfile records entry offsets with tell(); seek() is never available
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def slugify(value: str, fallback: str = "item") -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", value or "").strip("-").lower()
+    return slug[:60] or fallback
+
+
+def _file_name(url: str) -> str:
+    name = url.split("?", 1)[0].rsplit("/", 1)[-1]
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name) or "image"
+
+
+def _zip_time(moment: Optional[datetime]) -> Tuple[int, int, int, int, int, int]:
+    moment = moment or datetime.utcnow()
+    # ZIP timestamps cannot represent years before 1980
+    return max(moment.timetuple()[:6], (1980, 1, 1, 0, 0, 0))
+
+
+async def _download(url: str) -> bytes:
+    path = extract_storage_path(url)
+    if not path:
+        raise ValueError("not a catalog-images URL")
+    bucket = get_supabase_client().storage.from_(BUCKET_NAME)
+    return await asyncio.to_thread(bucket.download, path)
+
+
+async def iter_items(catalog_id: str) -> AsyncIterator:
+    """Yield the catalog's items (with images) one keyset page at a time"""
+    cursor = None
+    while True:
+        page = await prisma.item.find_many(
+            where={"catalogId": catalog_id},
+            include={"images": {"order_by": {"order": "asc"}}},
+            order={"id": "asc"},
+            take=settings.export_page_size,
+            **({"cursor": {"id": cursor}, "skip": 1} if cursor else {}),
+        )
+        for item in page:
+            yield item
+        if len(page) < settings.export_page_size:
+            return
+        cursor = page[-1].id
+
+
+async def stream_catalog_zip(catalog, manifest_format: str = "both") -> AsyncIterator[bytes]:
+    """Yield a ZIP archive of the catalog's images and manifest as it is produced"""
+    sink = StreamSink()
+    archive = zipfile.ZipFile(sink, mode="w", allowZip64=True)
+    slots = asyncio.Semaphore(settings.export_download_concurrency)
+    # Downloads finished and waiting to be written: (entry name, timestamp, bytes or error)
+    done: asyncio.Queue = asyncio.Queue()
+    errors: List[str] = []
+    fetches = set()
+    written = 0
+
+    csv_file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, mode="w+", newline="", encoding="utf-8")
+    json_file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, mode="w+", encoding="utf-8")
+    csv_writer = csv.writer(csv_file)
+    csv_writer.writerow(MANIFEST_CSV_COLUMNS)
+    json_file.write("[")
+    first_json = True
+
+    async def fetch(url: str, entry_name: str, timestamp) -> None:
+        try:
+            data = await _download(url)
+            await done.put((entry_name, timestamp, data))
+        except Exception as e:
+            await done.put((entry_name, timestamp, e))
+
+    def write_entry(entry_name: str, timestamp, data: bytes) -> None:
+        info = zipfile.ZipInfo(entry_name, date_time=_zip_time(timestamp))
+        info.compress_type = zipfile.ZIP_STORED
+        archive.writestr(info, data)
+
+    async def producer() -> None:
+        try:
+            await schedule_all()
+            # Wait for the last downloads to be written by taking every slot back
+            for _ in range(settings.export_download_concurrency):
+                await slots.acquire()
+            await done.put(None)
+        except Exception as e:
+            # Hand the failure to the consumer so the response ends instead of hanging
+            await done.put(e)
+
+    async def schedule_all() -> None:
+        nonlocal first_json
+        seen_names = set()
+
+        async def schedule(url: str, entry_name: str, timestamp) -> None:
+            await slots.acquire()
+            task = asyncio.create_task(fetch(url, entry_name, timestamp))
+            fetches.add(task)
+            task.add_done_callback(fetches.discard)
+
+        if catalog.coverPhoto:
+            name = f"cover-{_file_name(catalog.coverPhoto)}"
+            seen_names.add(name)
+            await schedule(catalog.coverPhoto, name, catalog.createdAt)
+
+        async for item in iter_items(catalog.id):
+            folder = f"images/{slugify(item.name)}-{item.id[:8]}"
+            image_names = []
+            for index, image in enumerate(item.images or []):
+                name = f"{folder}/{index + 1:03d}-{_file_name(image.url)}"
+                if name in seen_names:
+                    name = f"{folder}/{index + 1:03d}-{image.id[:8]}-{_file_name(image.url)}"
+                seen_names.add(name)
+                image_names.append({"file": name, "url": image.url, "variantOptions": image.variantOptions})
+                await schedule(image.url, name, image.createdAt)
+
+            record = {
+                "itemId": item.id,
+                "name": item.name,
+                "description": item.description,
+                "specifications": item.specifications or [],
+                "variants": item.variants or [],
+                "images": image_names,
+                "createdAt": item.createdAt.isoformat() if item.createdAt else None,
+            }
+            csv_writer.writerow([
+                record["itemId"],
+                record["name"],
+                record["description"] or "",
+                "; ".join(f"{s.get('label')}: {s.get('value')}" for s in record["specifications"]),
+                json.dumps(record["variants"], ensure_ascii=False),
+                " ".join(entry["file"] for entry in image_names),
+                record["createdAt"] or "",
+            ])
+            json_file.write(("" if first_json else ",") + "\n" + json.dumps(record, ensure_ascii=False, default=str))
+            first_json = False
+
+    producer_task = asyncio.create_task(producer())
+    try:
+        while True:
+            entry = await done.get()
+            if entry is None:
+                break
+            if isinstance(entry, Exception):
+                raise entry
+            entry_name, timestamp, data = entry
+            if isinstance(data, Exception):
+                errors.append(f"{entry_name}: {data}")
+            else:
+                write_entry(entry_name, timestamp, data)
+                written += 1
+            slots.release()
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+        await producer_task
+
+        json_file.write("\n]\n")
+        manifests = []
+        if manifest_format in ("csv", "both"):
+            manifests.append(("manifest.csv", csv_file))
+        if manifest_format in ("json", "both"):
+            manifests.append(("manifest.json", json_file))
+        for name, source in manifests:
+            source.seek(0)
+            info = zipfile.ZipInfo(name, date_time=_zip_time(None))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with archive.open(info, mode="w", force_zip64=True) as target:
+                while True:
+                    text = source.read(COPY_CHUNK_SIZE)
+                    if not text:
+                        break
+                    target.write(text.encode("utf-8"))
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+        if errors:
+            archive.writestr("errors.txt", "Images that could not be exported:\n" + "\n".join(errors) + "\n")
+        archive.close()
+        yield sink.drain()
+        logger.info(f"Exported catalog {catalog.id}: {written} images, {len(errors)} errors")
+    finally:
+        if not producer_task.done():
+            producer_task.cancel()
+        for task in list(fetches):
+            task.cancel()
+        csv_file.close()
+        json_file.close()
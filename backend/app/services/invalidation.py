@@ -0,0 +1,61 @@
+import itertools
+from typing import Dict
+from app.core.database import mark_write
+from app.services.cdn import catalog_key, cdn_purger, code_key
+from app.services.events import event_broker
+from app.services.owner_cache import owner_catalog_cache
+from app.services.stats import stats_cache
+from app.services.view_cache import view_cache
+
+
+# Bumped on every write; coalesced reads (see app.utils.singleflight) include the generation in
+# their key so a load that started before a write is never shared with requests that arrive after it
+_generations: Dict[str, int] = {}
+_generation_counter = itertools.count(1)
+
+
+def write_generation(key: str) -> int:
+    """Current write generation for "owner:<id>", "catalog:<id>", "code:<code>" or "views"
+
+    "views" is bumped with every catalog and share code write, so it is the latest generation
+    of any of them: a catalog or code generation above it was written after it was read.
+    """
+    return _generations.get(key, 0)
+
+
+def _bump(*keys: str) -> None:
+    generation = next(_generation_counter)
+    for key in keys:
+        _generations[key] = generation
+
+
+def after_owner_write(owner_id: str) -> None:
+    """Keep the owner's follow-up reads on the primary and drop their cached catalogs and dashboard stats"""
+    _bump(f"owner:{owner_id}")
+    mark_write(f"owner:{owner_id}")
+    owner_catalog_cache.invalidate_owner(owner_id)
+    stats_cache.invalidate_owner(owner_id)
+
+
+def after_catalog_write(catalog_id: str, owner_id: str) -> None:
+    """Keep follow-up reads on the primary and drop cached (and CDN-cached) views, owner catalogs
+    and stats for a modified catalog"""
+    _bump(f"owner:{owner_id}", f"catalog:{catalog_id}", "views")
+    mark_write(f"owner:{owner_id}", f"catalog:{catalog_id}")
+    view_cache.invalidate_catalog(catalog_id)
+    cdn_purger.purge([catalog_key(catalog_id)])
+    owner_catalog_cache.invalidate_owner(owner_id)
+    stats_cache.invalidate_owner(owner_id)
+
+
+def after_share_code_write(code: str, catalog_id: str, owner_id: str) -> None:
+    """Keep follow-up reads on the primary, drop cached (and CDN-cached) views, owner catalogs and
+    stats and end the code's public event streams for a created/deleted/deactivated code"""
+    _bump(f"owner:{owner_id}", f"code:{code}", "views")
+    mark_write(f"owner:{owner_id}", f"catalog:{catalog_id}", f"code:{code}")
+    view_cache.invalidate_code(code)
+    cdn_purger.purge([code_key(code)])
+    owner_catalog_cache.invalidate_owner(owner_id)
+    stats_cache.invalidate_owner(owner_id)
+    # Viewers reconnect and are checked against the code again
+    event_broker.close_code(catalog_id, code)
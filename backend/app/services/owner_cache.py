@@ -0,0 +1,70 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from app.core.config import settings
+from app.utils.catalog_tree import CatalogTree
+
+
+class CachedCatalogs:
+    __slots__ = ("generation", "loaded_at", "expires_at", "trees")
+
+    def __init__(self, generation: int, loaded_at: float, expires_at: float, trees: Tuple[CatalogTree, ...]):
+        self.generation = generation
+        # Epoch seconds of the load, compared with the client's last write on another worker
+        self.loaded_at = loaded_at
+        self.expires_at = expires_at
+        self.trees = trees
+
+
+class OwnerCatalogCache:
+    """Per-owner cache of the `GET /catalog/my` catalogs, dropped whenever the owner writes
+
+    Catalogs are held as compact `CatalogTree`s rather than serialized bodies: the same tree
+    is encoded straight to JSON or MessagePack, so one entry serves both formats in less
+    memory than the two bodies would take. An entry is only served for the owner write
+    generation it was loaded at, and not to a client whose last write (X-Last-Write, made on
+    any worker) is newer than the load. Bounded like the view cache: entries expire after
+    `ttl_seconds` and the least recently used owners are evicted beyond `max_owners`.
+    """
+
+    def __init__(self, ttl_seconds: int, max_owners: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_owners = max_owners
+        self._entries: "OrderedDict[str, CachedCatalogs]" = OrderedDict()
+
+    def get(self, owner_id: str, generation: int, client_write: Optional[float] = None) -> Optional[Tuple[CatalogTree, ...]]:
+        entry = self._entries.get(owner_id)
+        if entry is None:
+            return None
+        if entry.generation != generation or entry.expires_at <= time.monotonic():
+            del self._entries[owner_id]
+            return None
+        if client_write is not None and client_write >= entry.loaded_at:
+            return None
+        self._entries.move_to_end(owner_id)
+        return entry.trees
+
+    def put(self, owner_id: str, generation: int, trees: Tuple[CatalogTree, ...], loaded_at: float) -> None:
+        """Cache an owner's trees, loaded at `loaded_at` (epoch seconds, taken before the query)"""
+        if self.ttl_seconds <= 0 or self.max_owners <= 0:
+            return
+        current = self._entries.get(owner_id)
+        # A slow load from before a write must not replace a newer one (generations only grow)
+        if current is not None and current.generation > generation:
+            return
+        self._entries[owner_id] = CachedCatalogs(generation, loaded_at, time.monotonic() + self.ttl_seconds, trees)
+        self._entries.move_to_end(owner_id)
+        while len(self._entries) > self.max_owners:
+            self._entries.popitem(last=False)
+
+    def invalidate_owner(self, owner_id: str) -> None:
+        self._entries.pop(owner_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+owner_catalog_cache = OwnerCatalogCache(
+    ttl_seconds=settings.owner_cache_ttl_seconds,
+    max_owners=settings.owner_cache_max_owners,
+)
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Tuple
+from app.core.config import settings
+from app.core.database import read_client
+from app.utils.timezone import get_ph_time_utc
+
+# date_trunc units accepted for the per-period breakdown, with the step used to build the window
+PERIOD_STEPS = {
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+    "month": timedelta(days=31),
+}
+
+# Per-catalog counts computed with GROUP BY over the catalogId indexes
+CATALOG_STATS_SQL = '''
+WITH item_counts AS (
+    SELECT i."catalogId", COUNT(*)::int AS n
+    FROM "Item" i JOIN "Catalog" c ON c."id" = i."catalogId"
+    WHERE c."ownerId" = $1 AND c."deletedAt" IS NULL
+    GROUP BY i."catalogId"
+), image_counts AS (
+    SELECT i."catalogId", COUNT(*)::int AS n
+    FROM "ItemImage" img
+    JOIN "Item" i ON i."id" = img."itemId"
+    JOIN "Catalog" c ON c."id" = i."catalogId"
+    WHERE c."ownerId" = $1 AND c."deletedAt" IS NULL
+    GROUP BY i."catalogId"
+), code_counts AS (
+    SELECT s."catalogId",
+           COUNT(*)::int AS n,
+           (COUNT(*) FILTER (
+               WHERE s."isActive" AND (s."expiresAt" IS NULL OR s."expiresAt" > (now() AT TIME ZONE 'UTC'))
+           ))::int AS active
+    FROM "ShareCode" s JOIN "Catalog" c ON c."id" = s."catalogId"
+    WHERE c."ownerId" = $1 AND c."deletedAt" IS NULL
+    GROUP BY s."catalogId"
+)
+SELECT c."id", c."title", c."createdAt",
+       COALESCE(ic.n, 0) AS "itemCount",
+       COALESCE(imc.n, 0) AS "imageCount",
+       COALESCE(cc.n, 0) AS "shareCodeCount",
+       COALESCE(cc.active, 0) AS "activeShareCodeCount"
+FROM "Catalog" c
+LEFT JOIN item_counts ic ON ic."catalogId" = c."id"
+LEFT JOIN image_counts imc ON imc."catalogId" = c."id"
+LEFT JOIN code_counts cc ON cc."catalogId" = c."id"
+WHERE c."ownerId" = $1 AND c."deletedAt" IS NULL
+ORDER BY c."createdAt" DESC
+'''
+
+# Items and catalogs created per period (the unit comes from PERIOD_STEPS, never from user input)
+ITEM_PERIODS_SQL = '''
+SELECT date_trunc('{unit}', i."createdAt") AS "period", COUNT(*)::int AS n
+FROM "Item" i JOIN "Catalog" c ON c."id" = i."catalogId"
+WHERE c."ownerId" = $1 AND c."deletedAt" IS NULL AND i."createdAt" >= $2::timestamp
+GROUP BY 1
+'''
+
+CATALOG_PERIODS_SQL = '''
+SELECT date_trunc('{unit}', c."createdAt") AS "period", COUNT(*)::int AS n
+FROM "Catalog" c
+WHERE c."ownerId" = $1 AND c."deletedAt" IS NULL AND c."createdAt" >= $2::timestamp
+GROUP BY 1
+'''
+
+
+class StatsCache:
+    """Per-owner cache of dashboard aggregates, dropped whenever the owner writes
+
+    Bounded like the view cache: entries expire after `ttl_seconds` and the least recently
+    used owners are evicted beyond `max_owners`.
+    """
+
+    def __init__(self, ttl_seconds: int, max_owners: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_owners = max_owners
+        self._entries: "OrderedDict[str, Dict[Tuple[str, int], Tuple[float, dict]]]" = OrderedDict()
+
+    def get(self, owner_id: str, key: Tuple[str, int]):
+        entries = self._entries.get(owner_id)
+        cached = entries.get(key) if entries is not None else None
+        if cached is None:
+            return None
+        if cached[0] <= time.monotonic():
+            del entries[key]
+            if not entries:
+                del self._entries[owner_id]
+            return None
+        self._entries.move_to_end(owner_id)
+        return cached[1]
+
+    def put(self, owner_id: str, key: Tuple[str, int], stats: dict) -> None:
+        if self.ttl_seconds <= 0 or self.max_owners <= 0:
+            return
+        now = time.monotonic()
+        entries = self._entries.setdefault(owner_id, {})
+        # Drop this owner's expired periods so one owner can't accumulate them either
+        for stale in [stale for stale, (expires, _) in entries.items() if expires <= now]:
+            del entries[stale]
+        entries[key] = (now + self.ttl_seconds, stats)
+        self._entries.move_to_end(owner_id)
+        while len(self._entries) > self.max_owners:
+            self._entries.popitem(last=False)
+
+    def invalidate_owner(self, owner_id: str) -> None:
+        self._entries.pop(owner_id, None)
+
+
+stats_cache = StatsCache(
+    ttl_seconds=settings.stats_cache_ttl_seconds,
+    max_owners=settings.stats_cache_max_owners,
+)
+
+
+async def get_owner_stats(owner_id: str, period: str, periods: int) -> dict:
+    """Dashboard aggregates for an owner: totals, per-catalog counts and per-period creations"""
+    key = (period, periods)
+    cached = stats_cache.get(owner_id, key)
+    if cached is not None:
+        return cached
+
+    unit = period if period in PERIOD_STEPS else "month"
+    since = get_ph_time_utc() - PERIOD_STEPS[unit] * periods
+    since_param = since.strftime("%Y-%m-%d %H:%M:%S")
+
+    db = read_client(f"owner:{owner_id}")
+    catalog_rows, item_period_rows, catalog_period_rows = await asyncio.gather(
+        db.query_raw(CATALOG_STATS_SQL, owner_id),
+        db.query_raw(ITEM_PERIODS_SQL.format(unit=unit), owner_id, since_param),
+        db.query_raw(CATALOG_PERIODS_SQL.format(unit=unit), owner_id, since_param),
+    )
+
+    by_period: Dict[str, dict] = {}
+    for rows, field in ((item_period_rows, "items"), (catalog_period_rows, "catalogs")):
+        for row in rows:
+            entry = by_period.setdefault(str(row["period"]), {"period": row["period"], "items": 0, "catalogs": 0})
+            entry[field] = row["n"]
+
+    stats = {
+        "totals": {
+            "catalogs": len(catalog_rows),
+            "items": sum(row["itemCount"] for row in catalog_rows),
+            "images": sum(row["imageCount"] for row in catalog_rows),
+            "shareCodes": sum(row["shareCodeCount"] for row in catalog_rows),
+            "activeShareCodes": sum(row["activeShareCodeCount"] for row in catalog_rows),
+        },
+        "catalogs": catalog_rows,
+        "period": unit,
+        "periods": [by_period[key] for key in sorted(by_period)],
+    }
+    stats_cache.put(owner_id, key, stats)
+    return stats
@@ -0,0 +1,182 @@
+"""Garbage collector for orphaned objects in the catalog-images bucket
+
+Referenced URLs (ItemImage.url and Catalog.coverPhoto) are streamed from the database
+in keyset pages into a Bloom filter, then the bucket listing is paged and every object
+the filter has never seen is an orphan candidate. Memory stays bounded by the filter
+size, the page size and the number of candidates, regardless of how many objects or
+rows exist. The listing pages by offset (the storage API has no cursor), so nothing is
+deleted until it is complete: deleting during the pass would shift later objects back
+past the offset and skip them. Candidates are then re-checked exactly against the
+database and deleted in batches.
+
+Usage: python -m app.services.storage_gc [--dry-run] [--grace-hours 24]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, List, Optional, Tuple
+from app.core.database import prisma, connect_db, disconnect_db
+from app.utils.bloom import BloomFilter
+from app.utils.storage import BUCKET_NAME, extract_storage_path, get_supabase_client
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per referenced-URL query and objects per bucket listing page
+PAGE_SIZE = 1000
+# Orphans re-checked and deleted per storage call
+DELETE_BATCH_SIZE = 100
+# Objects younger than this are kept: they may have been uploaded for an item that is not saved yet
+DEFAULT_GRACE_HOURS = 24
+# Log progress every this many listed objects
+PROGRESS_EVERY = 5000
+
+
+async def count_references() -> int:
+    images = await prisma.itemimage.count()
+    covers = await prisma.catalog.count(where={"coverPhoto": {"not": None}})
+    return images + covers
+
+
+async def stream_referenced_urls() -> AsyncIterator[str]:
+    """Yield every referenced image URL using keyset pagination (one page in memory at a time)"""
+    for table, column in (("ItemImage", "url"), ("Catalog", "coverPhoto")):
+        last_id = ""
+        while True:
+            rows = await prisma.query_raw(
+                f'SELECT "id", "{column}" AS "url" FROM "{table}" '
+                f'WHERE "id" > $1 AND "{column}" IS NOT NULL ORDER BY "id" LIMIT $2',
+                last_id, PAGE_SIZE
+            )
+            for row in rows:
+                yield row["url"]
+            if len(rows) < PAGE_SIZE:
+                break
+            last_id = rows[-1]["id"]
+
+
+async def stream_bucket_objects(prefix: str = "") -> AsyncIterator[Tuple[str, Optional[datetime]]]:
+    """Yield (path, created_at) for every object in the bucket, paging each folder's listing"""
+    bucket = get_supabase_client().storage.from_(BUCKET_NAME)
+    offset = 0
+    while True:
+        entries = await asyncio.to_thread(
+            bucket.list,
+            prefix,
+            {"limit": PAGE_SIZE, "offset": offset, "sortBy": {"column": "name", "order": "asc"}}
+        )
+        for entry in entries:
+            path = f"{prefix}/{entry['name']}" if prefix else entry["name"]
+            if entry.get("id") is None:
+                # Folders have no id; descend into them
+                async for item in stream_bucket_objects(path):
+                    yield item
+            else:
+                yield path, _parse_timestamp(entry.get("created_at"))
+        if len(entries) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+async def filter_still_referenced(paths: List[str]) -> List[str]:
+    """Exact database check: drop candidates that are referenced after all"""
+    suffixes = [f"/{BUCKET_NAME}/{path}" for path in paths]
+    images = await prisma.itemimage.find_many(where={"OR": [{"url": {"endsWith": s}} for s in suffixes]})
+    covers = await prisma.catalog.find_many(where={"OR": [{"coverPhoto": {"endsWith": s}} for s in suffixes]})
+    referenced = {extract_storage_path(img.url) for img in images}
+    referenced |= {extract_storage_path(catalog.coverPhoto) for catalog in covers}
+    return [path for path in paths if path not in referenced]
+
+
+async def run_storage_gc(dry_run: bool = True, grace_hours: float = DEFAULT_GRACE_HOURS) -> dict:
+    """Find and (unless dry_run) delete unreferenced objects older than the grace period"""
+    started = time.monotonic()
+    stats = {
+        "dry_run": dry_run,
+        "referenced": 0,
+        "scanned": 0,
+        "kept_recent": 0,
+        "candidates": 0,
+        "orphans": 0,
+        "deleted": 0,
+        "errors": 0,
+        "orphan_paths_sample": [],
+    }
+
+    reference_count = await count_references()
+    referenced = BloomFilter(int(reference_count * 1.2) + 1000)
+    async for url in stream_referenced_urls():
+        path = extract_storage_path(url)
+        if path:
+            referenced.add(path)
+            stats["referenced"] += 1
+    logger.info(f"Storage GC: loaded {stats['referenced']} referenced paths ({len(referenced.bits)} byte filter)")
+
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=grace_hours)
+    candidates: List[str] = []
+
+    async def process(batch: List[str]) -> None:
+        orphans = await filter_still_referenced(batch)
+        stats["orphans"] += len(orphans)
+        if len(stats["orphan_paths_sample"]) < 20:
+            stats["orphan_paths_sample"].extend(orphans[:20 - len(stats["orphan_paths_sample"])])
+        if dry_run or not orphans:
+            return
+        try:
+            bucket = get_supabase_client().storage.from_(BUCKET_NAME)
+            await asyncio.to_thread(bucket.remove, orphans)
+            stats["deleted"] += len(orphans)
+        except Exception as e:
+            stats["errors"] += 1
+            logger.warning(f"Storage GC: failed to delete {len(orphans)} objects: {str(e)}")
+
+    async for path, created_at in stream_bucket_objects():
+        stats["scanned"] += 1
+        if stats["scanned"] % PROGRESS_EVERY == 0:
+            logger.info(
+                f"Storage GC: scanned {stats['scanned']} objects, "
+                f"{stats['candidates']} candidates, {stats['deleted']} deleted"
+            )
+        if path in referenced:
+            continue
+        if created_at is None or created_at > cutoff:
+            stats["kept_recent"] += 1
+            continue
+        stats["candidates"] += 1
+        candidates.append(path)
+
+    for start in range(0, len(candidates), DELETE_BATCH_SIZE):
+        await process(candidates[start:start + DELETE_BATCH_SIZE])
+
+    stats["duration_seconds"] = round(time.monotonic() - started, 1)
+    logger.info(f"Storage GC finished: {stats}")
+    return stats
+
+
+async def _main(dry_run: bool, grace_hours: float) -> None:
+    await connect_db()
+    try:
+        await run_storage_gc(dry_run=dry_run, grace_hours=grace_hours)
+    finally:
+        await disconnect_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete orphaned objects from the catalog-images bucket")
+    parser.add_argument("--dry-run", action="store_true", help="Report orphans without deleting them")
+    parser.add_argument("--grace-hours", type=float, default=DEFAULT_GRACE_HOURS,
+                        help="Keep objects younger than this many hours")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(args.dry_run, args.grace_hours))
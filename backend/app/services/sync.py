@@ -0,0 +1,95 @@
+"""Delta sync of an owner's catalogs
+
+Catalog, Item, ItemImage and ShareCode rows carry an `updatedAt` version. A sync
+returns every catalog, item (with all its images) and share code changed since the
+client's cursor, plus SyncTombstone rows for deletes. Image changes bump their
+item's updatedAt, so images never need tombstones of their own.
+
+Cursors are opaque to clients. Each one is the server time when the sync started,
+and the next sync reads from `SYNC_LOOKBACK_SECONDS` before it so writes that were
+still committing are not missed. Clients apply changes by id, so the overlap is
+harmless. Cursors older than the tombstone retention get a full snapshot instead
+(`reset`).
+"""
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+import asyncio
+from app.core.config import settings
+from app.core.database import prisma, read_client
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def tombstone(owner_id: str, entity: str, entity_id: str, catalog_id: str) -> dict:
+    """Create data for a SyncTombstone row ("catalog", "item" or "shareCode")"""
+    return {"ownerId": owner_id, "entity": entity, "entityId": entity_id, "catalogId": catalog_id}
+
+
+def encode_cursor(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def decode_cursor(cursor: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(cursor, "%Y-%m-%dT%H:%M:%S.%fZ")
+    except ValueError:
+        return None
+
+
+async def get_changes(owner_id: str, cursor: Optional[str]) -> dict:
+    """Rows changed and deleted since `cursor`, or a full snapshot when there is no usable cursor"""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    since = decode_cursor(cursor) if cursor else None
+    if since is not None and since < now - timedelta(days=settings.sync_tombstone_days):
+        # Tombstones this old have been pruned; the client must start over
+        since = None
+
+    catalog_filter = {"ownerId": owner_id, "deletedAt": None}
+    changed = {}
+    if since is not None:
+        changed = {"updatedAt": {"gte": since - timedelta(seconds=settings.sync_lookback_seconds)}}
+
+    db = read_client(f"owner:{owner_id}")
+    catalogs, items, share_codes, tombstones = await asyncio.gather(
+        db.catalog.find_many(where={**catalog_filter, **changed}, order={"createdAt": "desc"}),
+        db.item.find_many(
+            where={"catalog": {"is": catalog_filter}, **changed},
+            include={"images": {"order_by": {"order": "asc"}}},
+        ),
+        db.sharecode.find_many(where={"catalog": {"is": catalog_filter}, **changed}),
+        _tombstones_since(db, owner_id, since),
+    )
+    return {
+        "cursor": encode_cursor(now),
+        "reset": since is None,
+        "catalogs": catalogs,
+        "items": items,
+        "shareCodes": share_codes,
+        "tombstones": tombstones,
+    }
+
+
+async def _tombstones_since(db, owner_id: str, since: Optional[datetime]) -> List:
+    if since is None:
+        return []
+    return await db.synctombstone.find_many(
+        where={
+            "ownerId": owner_id,
+            "deletedAt": {"gte": since - timedelta(seconds=settings.sync_lookback_seconds)},
+        },
+        order={"deletedAt": "asc"},
+    )
+
+
+async def prune_tombstones() -> int:
+    """Delete tombstones older than SYNC_TOMBSTONE_DAYS"""
+    try:
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=settings.sync_tombstone_days)
+        deleted = await prisma.synctombstone.delete_many(where={"deletedAt": {"lt": cutoff}})
+        if deleted:
+            logger.info(f"Pruned {deleted} sync tombstones older than {cutoff}")
+        return deleted
+    except Exception as e:
+        logger.error(f"Error pruning sync tombstones: {str(e)}")
+        return 0
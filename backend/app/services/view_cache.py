@@ -0,0 +1,130 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+from app.core.compression import compress_async
+from app.core.negotiation import JSON_MEDIA_TYPE, pack_json
+from app.core.config import settings
+from app.utils.timezone import get_ph_time_utc
+
+
+class CachedView:
+    """A serialized share view plus its other formats and compressed variants
+
+    Each format/encoding pair is produced at most once per entry and then reused for
+    every request until the entry expires or is invalidated.
+    """
+
+    __slots__ = ("code", "catalog_id", "share_expires_at", "body", "formats", "encoded", "expires_at")
+
+    def __init__(self, code: str, catalog_id: str, body: bytes, expires_at: float, share_expires_at: Optional[datetime] = None):
+        self.code = code
+        self.catalog_id = catalog_id
+        self.share_expires_at = share_expires_at
+        self.body = body
+        self.formats: Dict[str, bytes] = {JSON_MEDIA_TYPE: body}
+        self.encoded: Dict[Tuple[str, str], bytes] = {}
+        self.expires_at = expires_at
+
+    def size(self) -> int:
+        """Bytes held by the entry: every format and compressed variant produced so far"""
+        return sum(len(body) for body in self.formats.values()) + sum(len(body) for body in self.encoded.values())
+
+    async def get_body(self, encoding: Optional[str], media_type: str = JSON_MEDIA_TYPE) -> bytes:
+        """Return the body for the requested format and encoding, producing it on first use"""
+        body = self.formats.get(media_type)
+        if body is None:
+            # Only MessagePack is derived; it is built from the JSON body once, off the loop when large
+            if len(self.body) >= settings.compression_offload_size:
+                body = await asyncio.to_thread(pack_json, self.body)
+            else:
+                body = pack_json(self.body)
+            self.formats[media_type] = body
+        if encoding is None:
+            return body
+        compressed = self.encoded.get((media_type, encoding))
+        if compressed is None:
+            compressed = await compress_async(body, encoding, cached=True)
+            self.encoded[(media_type, encoding)] = compressed
+        return compressed
+
+
+class ViewCache:
+    """Bounded LRU cache of share view responses keyed by share code
+
+    Views are kept serialized: a JSON body takes about 15% of the memory of the Prisma/Pydantic
+    objects it was built from (200 items with 5 images each), less than even a compact slotted
+    record tree of the same data, and is sent without encoding it again.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, CachedView]" = OrderedDict()
+        self._codes_by_catalog: Dict[str, Set[str]] = {}
+
+    def get(self, code: str) -> Optional[CachedView]:
+        entry = self._entries.get(code)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self.invalidate_code(code)
+            return None
+        self._entries.move_to_end(code)
+        return entry
+
+    def peek(self, code: str) -> Optional[CachedView]:
+        """The entry for a code, if any, without counting it as a use (LRU order) or dropping it when expired"""
+        return self._entries.get(code)
+
+    def put(
+        self, code: str, catalog_id: str, body: bytes, share_expires_at: Optional[datetime] = None,
+        ttl_seconds: Optional[float] = None,
+    ) -> Optional[CachedView]:
+        """Cache a serialized view for `ttl_seconds` (default VIEW_CACHE_TTL_SECONDS), never keeping
+        it past the share code's own expiry"""
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return None
+
+        ttl = float(self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        if share_expires_at is not None:
+            if share_expires_at.tzinfo is not None:
+                share_expires_at = share_expires_at.replace(tzinfo=None)
+            ttl = min(ttl, (share_expires_at - get_ph_time_utc()).total_seconds())
+            if ttl <= 0:
+                return None
+
+        self.invalidate_code(code)
+        entry = CachedView(code, catalog_id, body, time.monotonic() + ttl, share_expires_at)
+        self._entries[code] = entry
+        self._codes_by_catalog.setdefault(catalog_id, set()).add(code)
+
+        while len(self._entries) > self.max_entries:
+            oldest_code = next(iter(self._entries))
+            self.invalidate_code(oldest_code)
+        return entry
+
+    def invalidate_code(self, code: str) -> None:
+        entry = self._entries.pop(code, None)
+        if entry is None:
+            return
+        codes = self._codes_by_catalog.get(entry.catalog_id)
+        if codes is not None:
+            codes.discard(code)
+            if not codes:
+                del self._codes_by_catalog[entry.catalog_id]
+
+    def invalidate_catalog(self, catalog_id: str) -> None:
+        for code in list(self._codes_by_catalog.get(catalog_id, ())):
+            self.invalidate_code(code)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._codes_by_catalog.clear()
+
+
+view_cache = ViewCache(
+    max_entries=settings.view_cache_max_entries,
+    ttl_seconds=settings.view_cache_ttl_seconds,
+)
@@ -0,0 +1,290 @@
+"""Compact in-memory form of a catalog tree (catalog, items, images, share codes) for caches
+
+Prisma models and the Pydantic response models carry a `__dict__`, field metadata
+and a datetime object per timestamp on every catalog, item and image, and every
+image repeats its `itemId`. A `CatalogTree` holds the same data in `__slots__`
+records instead:
+
+- an item's images are columns (tuples of ids and URLs, `array`s of orders and
+  timestamps) rather than one object per image, and `catalogId`/`itemId` are implied
+  by nesting,
+- timestamps are integer microseconds since the epoch (UTC),
+- JSON fields (specifications, variants, variant options) are kept as compact
+  pre-encoded JSON text; short fragments are interned, so a variant option such as
+  {"Color":"Black"} or a specification list repeated across items is stored once per
+  process.
+
+`encode_json` writes the same document as `List[CatalogWithItems]` serialized by
+Pydantic and `encode_msgpack` the same as `negotiation.pack` over that document, both
+straight from the trees. `python -m benchmarks.catalog_tree_memory` compares memory
+use and encode time with the model objects and serialized bodies.
+"""
+import json
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+from json.encoder import encode_basestring
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+from pydantic_core import to_json
+from app.core.negotiation import IMAGE_FIELDS, ITEM_FIELDS, msgpack
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_UTC = EPOCH.replace(tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+# Timestamp column value for a missing datetime
+NO_TIME = -(2 ** 63)
+# JSON fragments up to this length are interned: variant options, common specifications
+INTERN_MAX_LENGTH = 256
+
+
+def fragment(value: Any) -> Optional[str]:
+    """Pre-encode a JSON field value as Pydantic would write it; short fragments are interned"""
+    if value is None:
+        return None
+    text = to_json(getattr(value, "data", value)).decode()
+    return sys.intern(text) if len(text) <= INTERN_MAX_LENGTH else text
+
+
+def unfragment(text: Optional[str]) -> Any:
+    return None if text is None else json.loads(text)
+
+
+def to_micros(moment: Optional[datetime]) -> int:
+    if moment is None:
+        return NO_TIME
+    return (moment - (EPOCH if moment.tzinfo is None else EPOCH_UTC)) // MICROSECOND
+
+
+def iso_time(micros: int) -> Optional[str]:
+    """ISO 8601 UTC string, as Pydantic writes the aware datetimes Prisma returns"""
+    if micros == NO_TIME:
+        return None
+    return (EPOCH + timedelta(microseconds=micros)).isoformat() + "Z"
+
+
+class ImageColumns:
+    """An item's images as parallel columns, in display order"""
+
+    __slots__ = ("ids", "urls", "orders", "variant_options", "created_at", "updated_at")
+
+    def __init__(self, images):
+        images = list(images or [])
+        self.ids: Tuple[str, ...] = tuple(sys.intern(image.id) for image in images)
+        self.urls: Tuple[str, ...] = tuple(image.url for image in images)
+        self.orders = array("i", (image.order for image in images))
+        options = tuple(fragment(image.variantOptions) for image in images)
+        # Most catalogs have no variant images; skip the column entirely then
+        self.variant_options: Optional[Tuple[Optional[str], ...]] = (
+            options if any(option is not None for option in options) else None
+        )
+        self.created_at = array("q", (to_micros(image.createdAt) for image in images))
+        self.updated_at = array("q", (to_micros(getattr(image, "updatedAt", None)) for image in images))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def options(self, index: int) -> Optional[str]:
+        return self.variant_options[index] if self.variant_options is not None else None
+
+
+class ItemRecord:
+    __slots__ = ("id", "name", "description", "specifications", "variants", "created_at", "updated_at", "images")
+
+    def __init__(self, item):
+        self.id: str = sys.intern(item.id)
+        self.name: str = item.name
+        self.description: Optional[str] = item.description
+        self.specifications: Optional[str] = fragment(item.specifications)
+        self.variants: Optional[str] = fragment(item.variants)
+        self.created_at = to_micros(item.createdAt)
+        self.updated_at = to_micros(getattr(item, "updatedAt", None))
+        self.images = ImageColumns(item.images)
+
+
+class ShareCodeRecord:
+    __slots__ = ("id", "code", "expires_at", "is_active", "created_at", "updated_at")
+
+    def __init__(self, share_code):
+        self.id: str = sys.intern(share_code.id)
+        self.code: str = sys.intern(share_code.code)
+        self.expires_at = to_micros(share_code.expiresAt)
+        self.is_active: bool = share_code.isActive
+        self.created_at = to_micros(share_code.createdAt)
+        self.updated_at = to_micros(getattr(share_code, "updatedAt", None))
+
+
+class CatalogTree:
+    __slots__ = (
+        "id", "title", "description", "cover_photo", "owner_id", "created_at", "updated_at",
+        "items", "share_codes",
+    )
+
+    def __init__(self, catalog):
+        self.id: str = sys.intern(catalog.id)
+        self.title: str = catalog.title
+        self.description: Optional[str] = catalog.description
+        self.cover_photo: Optional[str] = getattr(catalog, "coverPhoto", None)
+        self.owner_id: str = sys.intern(catalog.ownerId)
+        self.created_at = to_micros(catalog.createdAt)
+        self.updated_at = to_micros(getattr(catalog, "updatedAt", None))
+        self.items: Tuple[ItemRecord, ...] = tuple(ItemRecord(item) for item in catalog.items or [])
+        self.share_codes: Tuple[ShareCodeRecord, ...] = tuple(
+            ShareCodeRecord(share_code) for share_code in getattr(catalog, "shareCodes", None) or []
+        )
+
+
+def build_catalog_trees(catalogs) -> Tuple[CatalogTree, ...]:
+    """Build compact trees from catalogs with items, images and share codes (Prisma or response models)"""
+    return tuple(CatalogTree(catalog) for catalog in catalogs)
+
+
+# Encoding. Per-call memos: an item's timestamps usually repeat (createdAt == updatedAt) and its
+# interned JSON fragments repeat across items, so each is formatted or parsed once per response.
+
+class _Memo(dict):
+    __slots__ = ("convert",)
+
+    def __init__(self, convert: Callable[[Any], Any]):
+        super().__init__()
+        self.convert = convert
+
+    def __missing__(self, key):
+        value = self[key] = self.convert(key)
+        return value
+
+
+def _string(value: Optional[str]) -> str:
+    return "null" if value is None else encode_basestring(value)
+
+
+def _json_time(micros: int) -> str:
+    return "null" if micros == NO_TIME else '"' + iso_time(micros) + '"'
+
+
+def _write_images(parts: List[str], images: ImageColumns, item_id: str, times: _Memo) -> None:
+    parts.append("[")
+    item_ref = ',"itemId":' + encode_basestring(item_id) + ',"url":'
+    for index in range(len(images)):
+        if index:
+            parts.append(",")
+        parts += [
+            '{"id":', encode_basestring(images.ids[index]),
+            item_ref, encode_basestring(images.urls[index]),
+            ',"order":', str(images.orders[index]),
+            ',"variantOptions":', images.options(index) or "null",
+            ',"createdAt":', times[images.created_at[index]],
+            ',"updatedAt":', times[images.updated_at[index]], "}",
+        ]
+    parts.append("]")
+
+
+def _write_catalog(parts: List[str], tree: CatalogTree, times: _Memo) -> None:
+    catalog_id = encode_basestring(tree.id)
+    parts += [
+        '{"id":', catalog_id,
+        ',"title":', _string(tree.title),
+        ',"description":', _string(tree.description),
+        ',"coverPhoto":', _string(tree.cover_photo),
+        ',"ownerId":', _string(tree.owner_id),
+        ',"createdAt":', times[tree.created_at],
+        ',"updatedAt":', times[tree.updated_at],
+        ',"items":[',
+    ]
+    for position, item in enumerate(tree.items):
+        if position:
+            parts.append(",")
+        parts += ['{"id":', encode_basestring(item.id), ',"catalogId":', catalog_id,
+                  ',"name":', _string(item.name), ',"description":', _string(item.description),
+                  ',"images":']
+        _write_images(parts, item.images, item.id, times)
+        parts += [',"specifications":', item.specifications or "null",
+                  ',"variants":', item.variants or "null",
+                  ',"createdAt":', times[item.created_at], ',"updatedAt":', times[item.updated_at], "}"]
+    parts.append('],"shareCodes":[')
+    for position, share_code in enumerate(tree.share_codes):
+        if position:
+            parts.append(",")
+        parts += ['{"id":', encode_basestring(share_code.id), ',"code":', encode_basestring(share_code.code),
+                  ',"catalogId":', catalog_id, ',"expiresAt":', times[share_code.expires_at],
+                  ',"isActive":', "true" if share_code.is_active else "false",
+                  ',"createdAt":', times[share_code.created_at], ',"updatedAt":', times[share_code.updated_at], "}"]
+    parts.append("]}")
+
+
+def encode_json(trees: Sequence[CatalogTree]) -> bytes:
+    """Serialize trees as a List[CatalogWithItems] JSON document"""
+    times = _Memo(_json_time)
+    parts = ["["]
+    for position, tree in enumerate(trees):
+        if position:
+            parts.append(",")
+        _write_catalog(parts, tree, times)
+    parts.append("]")
+    return "".join(parts).encode()
+
+
+# Columnar MessagePack encoding (same layout as negotiation.pack)
+
+def _image_table(images: ImageColumns, times: _Memo, values: _Memo) -> dict:
+    """Rows are built by zipping the columns, in IMAGE_FIELDS order"""
+    columns = {
+        "id": images.ids,
+        "url": images.urls,
+        "order": images.orders.tolist(),
+        "variantOptions": (
+            [values[option] for option in images.variant_options]
+            if images.variant_options is not None else [None] * len(images)
+        ),
+        "createdAt": [times[micros] for micros in images.created_at],
+        "updatedAt": [times[micros] for micros in images.updated_at],
+    }
+    return {"fields": list(IMAGE_FIELDS), "rows": [list(row) for row in zip(*(columns[field] for field in IMAGE_FIELDS))]}
+
+
+def _item_row(item: ItemRecord, times: _Memo, values: _Memo) -> list:
+    row = {
+        "id": item.id,
+        "name": item.name,
+        "description": item.description,
+        "images": _image_table(item.images, times, values),
+        "specifications": values[item.specifications],
+        "variants": values[item.variants],
+        "createdAt": times[item.created_at],
+        "updatedAt": times[item.updated_at],
+    }
+    return [row[field] for field in ITEM_FIELDS]
+
+
+def _catalog_document(tree: CatalogTree, times: _Memo, values: _Memo) -> dict:
+    return {
+        "id": tree.id,
+        "title": tree.title,
+        "description": tree.description,
+        "coverPhoto": tree.cover_photo,
+        "ownerId": tree.owner_id,
+        "createdAt": times[tree.created_at],
+        "updatedAt": times[tree.updated_at],
+        "items": {
+            "fields": list(ITEM_FIELDS),
+            "rows": [_item_row(item, times, values) for item in tree.items],
+        },
+        "shareCodes": [
+            {
+                "id": share_code.id,
+                "code": share_code.code,
+                "catalogId": tree.id,
+                "expiresAt": times[share_code.expires_at],
+                "isActive": share_code.is_active,
+                "createdAt": times[share_code.created_at],
+                "updatedAt": times[share_code.updated_at],
+            }
+            for share_code in tree.share_codes
+        ],
+    }
+
+
+def encode_msgpack(trees: Sequence[CatalogTree]) -> bytes:
+    """Serialize trees as columnar MessagePack"""
+    # Parsed fragments are shared between rows; msgpack only reads them
+    times, values = _Memo(iso_time), _Memo(unfragment)
+    return msgpack.packb([_catalog_document(tree, times, values) for tree in trees], use_bin_type=True)
@@ -0,0 +1,64 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Set, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one in-flight load
+
+    The first caller for a key starts the load in its own task; callers arriving while
+    it runs wait for the same result, and an exception is raised to every one of them.
+    The load keeps running if the caller that started it goes away, so the others
+    still get their result. Each waiter gives up after `timeout` seconds
+    (asyncio.TimeoutError), and the load itself is cancelled after `timeout` so a stuck
+    query cannot pin the key.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.loads = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        future = self._calls.get(key)
+        if future is None:
+            self.loads += 1
+            future = asyncio.get_running_loop().create_future()
+            future.add_done_callback(_consume_exception)
+            self._calls[key] = future
+            task = asyncio.create_task(self._run(key, load, future))
+            # Keep a reference so the load is not garbage collected while waiters rely on it
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            self.coalesced += 1
+        return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+
+    async def _run(self, key: Hashable, load: Callable[[], Awaitable[Any]], future: asyncio.Future) -> None:
+        try:
+            result = await asyncio.wait_for(load(), self.timeout)
+        except asyncio.CancelledError:
+            if not future.done():
+                future.set_exception(RuntimeError("Coalesced load was cancelled"))
+            raise
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    # Mark the exception as retrieved even when every waiter has already timed out
+    if not future.cancelled():
+        future.exception()
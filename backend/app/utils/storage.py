@@ -1,5 +1,5 @@
-from supabase import create_client
-from app.core.config import settings
+from app.core.clients import get_supabase
+from app.core.database import prisma
 from typing import List, Optional
 import re
 
@@ -8,7 +8,7 @@ BUCKET_NAME = "catalog-images"
 
 def get_supabase_client():
     """Get Supabase client with service role key for admin operations"""
-    return create_client(settings.supabase_url, settings.supabase_service_role_key)
+    return get_supabase()
 
 
 def extract_storage_path(image_url: str) -> Optional[str]:
@@ -68,3 +68,20 @@ async def delete_images_from_storage(image_urls: List[str]) -> dict:
     
     return {"deleted": deleted, "errors": errors}
 
+
+
+async def delete_unreferenced_images_from_storage(image_urls: List[str]) -> dict:
+    """Delete images from Supabase storage unless another row still references them
+    
+    Cloned catalogs share storage objects with their source, so an image is only
+    removed once no ItemImage or Catalog cover photo points at its URL any more.
+    """
+    image_urls = list(dict.fromkeys(image_urls))
+    if not image_urls:
+        return {"deleted": 0, "errors": []}
+    
+    referenced_images = await prisma.itemimage.find_many(where={"url": {"in": image_urls}})
+    referenced_covers = await prisma.catalog.find_many(where={"coverPhoto": {"in": image_urls}})
+    still_referenced = {img.url for img in referenced_images} | {catalog.coverPhoto for catalog in referenced_covers}
+    
+    return await delete_images_from_storage([url for url in image_urls if url not in still_referenced])
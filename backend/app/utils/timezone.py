@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import pytz
 
 # Philippines timezone (UTC+8)
@@ -12,10 +12,12 @@ def get_ph_time() -> datetime:
 
 
 def get_ph_time_utc() -> datetime:
-    """Get current time in Philippines timezone, converted to UTC for database storage"""
-    ph_time = get_ph_time()
-    # Convert to UTC (database stores in UTC)
-    return ph_time.astimezone(UTC_TIMEZONE).replace(tzinfo=None)
+    """Get current time in Philippines timezone, converted to UTC for database storage
+    
+    The same instant in any timezone is the same UTC time, so this skips the pytz
+    round trip; it runs on every share code check.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 
 def ph_time_to_utc(dt: datetime) -> datetime:
@@ -0,0 +1,141 @@
+import json
+from itertools import product
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+INDEX_VERSION = 1
+
+# Above this many selections (partial ones included) only single-option selections are indexed
+MAX_INDEXED_SELECTIONS = 256
+# Serialized size budget for an index; single-option selections are added first, and
+# whatever does not fit is resolved on demand by the variants endpoint
+MAX_INDEX_BYTES = 32 * 1024
+
+
+def _option_value(option: Any) -> str:
+    # Options are stored as {"value": ..., "specifications": [...]}, older rows as plain strings
+    return option if isinstance(option, str) else option.get("value", "")
+
+
+def _option_specs(option: Any) -> List[dict]:
+    if isinstance(option, str):
+        return []
+    return option.get("specifications") or []
+
+
+def _field(obj: Any, name: str) -> Any:
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+
+def normalize_images(images: Optional[List[Any]]) -> List[dict]:
+    """Reduce Prisma image models or create payloads to id/order/variantOptions, in display order"""
+    normalized = []
+    for position, image in enumerate(images or []):
+        options = _field(image, "variantOptions")
+        # Json() wrappers from create payloads keep the raw value in .data
+        options = getattr(options, "data", options)
+        normalized.append({
+            "id": _field(image, "id"),
+            "order": _field(image, "order") or 0,
+            "position": position,
+            "variantOptions": options if isinstance(options, dict) else {},
+        })
+    normalized.sort(key=lambda image: (image["order"], image["position"]))
+    return normalized
+
+
+def selection_key(variants: List[dict], selection: Dict[str, str]) -> str:
+    """Canonical key for a selection: variant order from the item, URL-encoded name=value pairs"""
+    return "&".join(
+        f"{quote(variant['name'], safe='')}={quote(selection[variant['name']], safe='')}"
+        for variant in variants
+        if variant["name"] in selection
+    )
+
+
+def resolve_selection(variants: List[dict], images: List[dict], selection: Dict[str, str]) -> dict:
+    """Images and merged option specifications for a (possibly partial) variant selection
+
+    `images` are images whose variant options all agree with the selection (best matches);
+    `related` are images sharing at least one selected option. Both keep display order.
+    """
+    exact, related = [], []
+    for image in images:
+        options = image["variantOptions"]
+        if not options:
+            continue
+        if all(selection.get(name) == value for name, value in options.items()):
+            exact.append(image["id"])
+        elif any(selection.get(name) == value for name, value in options.items()):
+            related.append(image["id"])
+
+    # Merge the selected options' specifications, later variants overriding earlier labels
+    merged: Dict[str, str] = {}
+    for variant in variants:
+        selected = selection.get(variant["name"])
+        if selected is None:
+            continue
+        for option in variant.get("options") or []:
+            if _option_value(option) == selected:
+                for spec in _option_specs(option):
+                    merged[spec.get("label", "")] = spec.get("value", "")
+
+    return {
+        "images": exact,
+        "related": related,
+        "specifications": [{"label": label, "value": value} for label, value in merged.items()],
+    }
+
+
+def build_variant_index(variants: Any, images: Optional[List[Any]]) -> Optional[dict]:
+    """Precompute selection -> images/specifications for the item's variant selections
+
+    Single-option selections come first, then (for small option sets) every other full and
+    partial combination, until the index reaches MAX_INDEX_BYTES; `truncated` is set when
+    anything was left out.
+    """
+    variants = getattr(variants, "data", variants)
+    if not variants:
+        return None
+    images = normalize_images(images)
+
+    # Each variant is either unselected (None) or one of its options
+    choices = [[None] + [_option_value(option) for option in variant.get("options") or []] for variant in variants]
+    total = 1
+    for options in choices:
+        total *= len(options)
+    truncated = total > MAX_INDEXED_SELECTIONS
+
+    selections = [
+        {variant["name"]: value}
+        for variant, options in zip(variants, choices)
+        for value in options[1:]
+    ]
+    if not truncated:
+        selections += [
+            selection
+            for selection in (
+                {variant["name"]: value for variant, value in zip(variants, values) if value is not None}
+                for values in product(*choices)
+            )
+            if len(selection) > 1
+        ]
+
+    combinations = {}
+    size = 0
+    for selection in selections:
+        key = selection_key(variants, selection)
+        entry = resolve_selection(variants, images, selection)
+        # Approximate serialized size of the `"key":{...},` member
+        size += len(key) + len(json.dumps(entry, separators=(",", ":"))) + 4
+        if size > MAX_INDEX_BYTES:
+            truncated = True
+            break
+        combinations[key] = entry
+
+    return {
+        "version": INDEX_VERSION,
+        "variants": [variant["name"] for variant in variants],
+        "truncated": truncated,
+        "combinations": combinations,
+    }
@@ -0,0 +1,171 @@
+"""Memory and encode-time comparison for the owner catalog cache: model objects, serialized bodies, catalog trees
+
+Builds synthetic owners' catalog lists (what `GET /catalog/my` returns) and measures,
+per owner held in memory:
+
+- models:  CatalogWithItems / ItemResponse / ItemImageResponse instances (Prisma
+           models are Pydantic models with the same per-object overhead)
+- bodies:  the JSON and MessagePack bodies, which a body cache would need for the
+           endpoint's two formats
+- tree:    app.utils.catalog_tree.CatalogTree, what the owner catalog cache holds
+
+and the time to encode each as JSON and MessagePack. Run from backend/:
+
+    python -m benchmarks.catalog_tree_memory
+    python -m benchmarks.catalog_tree_memory --owners 20 --catalogs 3 --items 500 --images 6
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List
+from pydantic import TypeAdapter
+from app.models.schemas import CatalogWithItems
+from app.utils.catalog_tree import build_catalog_trees, encode_json, encode_msgpack
+from app.core.negotiation import msgpack, pack, pack_json
+
+COLORS = ["Black", "White", "Red", "Navy", "Olive", "Sand"]
+SIZES = ["XS", "S", "M", "L", "XL"]
+
+catalog_list_adapter = TypeAdapter(List[CatalogWithItems])
+
+
+def synthetic_catalog(seed: int, owner_id: str, items: int, images: int) -> dict:
+    rng = random.Random(seed)
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(days=seed % 365)
+    catalog_id = f"{rng.getrandbits(128):032x}"
+    catalog_items = []
+    for item_number in range(items):
+        item_id = f"{rng.getrandbits(128):032x}"
+        variants = [
+            {"name": "Color", "options": [{"value": color, "specifications": []} for color in rng.sample(COLORS, 3)]},
+            {"name": "Size", "options": [{"value": size, "specifications": []} for size in SIZES]},
+        ]
+        item_images = []
+        for image_number in range(images):
+            created = base + timedelta(minutes=item_number, seconds=image_number, microseconds=rng.randrange(10 ** 6))
+            color = variants[0]["options"][image_number % 3]["value"]
+            item_images.append({
+                "id": f"{rng.getrandbits(128):032x}",
+                "itemId": item_id,
+                "url": f"https://project.supabase.co/storage/v1/object/public/catalog-images/{catalog_id}/{rng.getrandbits(64):016x}.webp",
+                "order": image_number,
+                "variantOptions": {"Color": color} if image_number < 3 else None,
+                "createdAt": created,
+                "updatedAt": created,
+            })
+        created = base + timedelta(minutes=item_number)
+        catalog_items.append({
+            "id": item_id,
+            "catalogId": catalog_id,
+            "name": f"Item {item_number}",
+            "description": "A sample product description that is a sentence or two long." if item_number % 2 else None,
+            "images": item_images,
+            "specifications": [{"label": "Material", "value": "Cotton"}, {"label": "Fit", "value": "Regular"}],
+            "variants": variants,
+            "createdAt": created,
+            "updatedAt": created,
+        })
+    share_codes = [
+        {
+            "id": f"{rng.getrandbits(128):032x}",
+            "code": f"{rng.getrandbits(32):08X}",
+            "catalogId": catalog_id,
+            "expiresAt": base + timedelta(days=30) if number else None,
+            "isActive": True,
+            "createdAt": base,
+            "updatedAt": base,
+        }
+        for number in range(2)
+    ]
+    return {
+        "id": catalog_id,
+        "title": f"Catalog {seed}",
+        "description": "Synthetic catalog",
+        "coverPhoto": None,
+        "ownerId": owner_id,
+        "createdAt": base,
+        "updatedAt": base,
+        "items": catalog_items,
+        "shareCodes": share_codes,
+    }
+
+
+def retained(build: Callable[[], object]) -> int:
+    """Bytes still allocated after build() while its result is alive"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def timed(run: Callable[[], object], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--owners", type=int, default=10)
+    parser.add_argument("--catalogs", type=int, default=2, help="catalogs per owner")
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--images", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bodies: List[bytes] = [
+        catalog_list_adapter.dump_json(catalog_list_adapter.validate_python([
+            synthetic_catalog(owner * args.catalogs + number, f"owner-{owner}", args.items, args.images)
+            for number in range(args.catalogs)
+        ]))
+        for owner in range(args.owners)
+    ]
+
+    # Each representation is built from its own parse so no strings are shared with the others
+    models_size = retained(lambda: [catalog_list_adapter.validate_json(body) for body in bodies])
+    json_size = retained(lambda: [bytes(bytearray(body)) for body in bodies])
+    tree_size = retained(lambda: [build_catalog_trees(catalog_list_adapter.validate_json(body)) for body in bodies])
+    sizes = [("models", models_size), ("json body", json_size)]
+    if msgpack is not None:
+        msgpack_size = retained(lambda: [pack_json(body) for body in bodies])
+        sizes += [("msgpack body", msgpack_size), ("both bodies", json_size + msgpack_size)]
+    sizes.append(("tree", tree_size))
+
+    models = [catalog_list_adapter.validate_json(body) for body in bodies]
+    trees = [build_catalog_trees(owner_models) for owner_models in models]
+    for body, owner_models, owner_trees in zip(bodies, models, trees):
+        assert encode_json(owner_trees) == body, "tree JSON differs from the model JSON"
+        if msgpack is not None:
+            expected = pack(catalog_list_adapter.dump_python(owner_models, mode="json"))
+            assert encode_msgpack(owner_trees) == expected, "tree MessagePack differs from negotiation.pack"
+
+    print(f"{args.owners} owners x {args.catalogs} catalogs x {args.items} items x {args.images} images")
+    print(f"{'representation':<16}{'KiB/owner':>14}{'vs models':>12}")
+    for name, size in sizes:
+        print(f"{name:<16}{size / args.owners / 1024:>14.1f}{size / models_size:>11.0%}")
+
+    print()
+    print(f"{'encode (ms/owner)':<28}{'models':>10}{'tree':>10}")
+    json_models = timed(lambda: [catalog_list_adapter.dump_json(owner_models) for owner_models in models], args.repeat) / args.owners
+    json_tree = timed(lambda: [encode_json(owner_trees) for owner_trees in trees], args.repeat) / args.owners
+    print(f"{'JSON':<28}{json_models:>10.2f}{json_tree:>10.2f}")
+    if msgpack is not None:
+        pack_models = timed(
+            lambda: [pack(catalog_list_adapter.dump_python(owner_models, mode="json")) for owner_models in models],
+            args.repeat,
+        ) / args.owners
+        pack_tree = timed(lambda: [encode_msgpack(owner_trees) for owner_trees in trees], args.repeat) / args.owners
+        print(f"{'MessagePack':<28}{pack_models:>10.2f}{pack_tree:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
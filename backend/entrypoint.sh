@@ -6,7 +6,7 @@ if [ "$RUN_MIGRATIONS" = "true" ]; then
   prisma migrate deploy
 fi
 
-# Start the application
+# Start the application (multi-worker, graceful drain; see serve.py)
 echo "Starting application on port ${PORT:-8000}..."
-exec uvicorn main:app --host 0.0.0.0 --port ${PORT:-8000}
+exec python serve.py
 
@@ -1,39 +1,102 @@
-from fastapi import FastAPI
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import asyncio
 import logging
-from app.core.database import connect_db, disconnect_db
+from app.core.database import LAST_WRITE_HEADER, ReadYourWritesMiddleware, connect_db, disconnect_db, warm_up_db
+from app.core.clients import init_clients, close_clients
+from app.core.startup import startup_timer
 from app.core.config import settings
+from app.core.compression import CompressionMiddleware
+from app.core.concurrency import ConcurrencyLimitMiddleware, concurrency_limiter
+from app.core.lifecycle import RequestTrackingMiddleware, request_tracker
+from app.core.profiling import RequestProfilingMiddleware
+from app.core.request_context import configure_logging
 from app.api import auth, catalog, share
-from app.services.cleanup import cleanup_expired_share_codes, deactivate_expired_share_codes, run_periodic_cleanup
+from app.services.cleanup import cleanup_expired_share_codes, run_periodic_cleanup
+from app.services.analytics import view_analytics, run_periodic_flush
+from app.services.events import event_broker
+from app.services.catalog_purge import run_catalog_purger
+from app.services.cdn import cdn_purger
+from app.services.expiry import expiry_scheduler, run_expiry_scheduler
+from app.services.code_pool import share_code_pool
+from app.services.cache_warmer import cache_warmer
+
+startup_timer.start(_import_started)
+startup_timer.record("imports", time.perf_counter() - _import_started)
 
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Startup: Connect to database
-    await connect_db()
+
+async def _timed(name: str, coro):
+    with startup_timer.phase(name):
+        return await coro
+
+
+async def run_initial_cleanup():
+    """Clean up expired share codes once at startup without delaying readiness
     
-    # Run initial cleanup on startup
+    Codes that expired while the service was down are deactivated by the expiry scheduler.
+    """
     logger.info("Running initial cleanup of expired share codes...")
-    await deactivate_expired_share_codes()
     await cleanup_expired_share_codes()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: Build Supabase clients (in a thread) while connecting to the database
+    await asyncio.gather(
+        _timed("db_connect", connect_db()),
+        _timed("supabase_clients", asyncio.to_thread(init_clients)),
+    )
+    with startup_timer.phase("engine_warmup"):
+        await warm_up_db()
+    await event_broker.start()
+    startup_timer.ready()
+    
+    # Run initial cleanup in the background so it does not add to cold start
+    initial_cleanup_task = asyncio.create_task(run_initial_cleanup())
     
     # Start background task for periodic cleanup
     cleanup_task = asyncio.create_task(run_periodic_cleanup())
     logger.info("Started periodic cleanup task (runs every 1 hour)")
     
+    # Start background task for flushing share view analytics
+    analytics_task = asyncio.create_task(run_periodic_flush())
+    
+    # Start background task purging soft-deleted catalogs in chunks
+    purge_task = asyncio.create_task(run_catalog_purger())
+    
+    # Start background task deactivating share codes at their expiry time
+    expiry_task = asyncio.create_task(run_expiry_scheduler())
+    
+    # Fill the share code pool in the background
+    share_code_pool.start_refill()
+    
+    # Preload the hottest share views so the first wave of traffic hits a warm cache
+    warmup_task = asyncio.create_task(cache_warmer.warm(catalog.warm_share_view))
+    
     yield
     
-    # Shutdown: Cancel cleanup task and disconnect from database
-    cleanup_task.cancel()
-    try:
-        await cleanup_task
-    except asyncio.CancelledError:
-        pass
+    # Shutdown: Close event streams, drain in-flight requests, cancel background tasks,
+    # flush remaining analytics and disconnect
+    await event_broker.stop()
+    await request_tracker.wait_idle(settings.graceful_shutdown_timeout)
+    for task in (initial_cleanup_task, cleanup_task, analytics_task, purge_task, expiry_task, warmup_task):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await share_code_pool.stop()
+    await view_analytics.flush()
+    await cdn_purger.flush()
     await disconnect_db()
+    close_clients()
 
 app = FastAPI(
     title="Catalog API",
@@ -41,6 +104,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Per-route-class adaptive concurrency limits; innermost so CORS headers reach shed (503) responses
+app.add_middleware(ConcurrencyLimitMiddleware)
+
 # Configure CORS
 # Allow multiple origins from environment variable (comma-separated)
 cors_origins = [origin.strip() for origin in settings.cors_origins.split(",")]
@@ -50,8 +116,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[LAST_WRITE_HEADER],
 )
 
+# Compress JSON responses (brotli/gzip); precompressed cached views pass straight through
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_size)
+
+# Read-your-writes across workers: the client echoes the time of its last write
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Request ids, per-request query log, slow request flags and opt-in sampling profiler
+app.add_middleware(RequestProfilingMiddleware)
+
+# Track in-flight requests (outermost) for graceful drain
+app.add_middleware(RequestTrackingMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(catalog.router)
@@ -62,9 +141,33 @@ async def root():
     return {"message": "Welcome to Catalog API"}
 
 @app.get("/health")
-async def health():
+async def health(response: Response):
+    if request_tracker.draining:
+        # Set on SIGTERM (see serve.py); tells the load balancer to stop routing here while requests are still served
+        response.status_code = 503
+        return {"status": "draining"}
     return {"status": "healthy"}
 
+@app.get("/health/limits")
+async def health_limits():
+    """Current concurrency limit, queue depth and shed count per route class"""
+    return concurrency_limiter.report()
+
+@app.get("/health/expiry")
+async def health_expiry():
+    """Share code expiry scheduler state"""
+    return expiry_scheduler.report()
+
+@app.get("/health/warmup")
+async def health_warmup():
+    """Share view cache warm-up: warmed keys and how many requests they served"""
+    return cache_warmer.report()
+
+@app.get("/health/startup")
+async def health_startup():
+    """Cold-start timing broken down by phase"""
+    return startup_timer.report()
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,5 @@
+-- Add soft-delete column to Catalog table
+-- Deleted catalogs are hidden immediately; the background purger removes their rows in chunks
+ALTER TABLE "Catalog" ADD COLUMN IF NOT EXISTS "deletedAt" TIMESTAMP(3);
+
+CREATE INDEX IF NOT EXISTS "Catalog_deletedAt_idx" ON "Catalog"("deletedAt");
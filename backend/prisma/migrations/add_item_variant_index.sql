@@ -0,0 +1,3 @@
+-- Add precomputed variant index column to Item table
+-- Existing rows keep NULL and are indexed on their next write (the variants endpoint resolves selections on demand until then)
+ALTER TABLE "Item" ADD COLUMN IF NOT EXISTS "variantIndex" JSONB;
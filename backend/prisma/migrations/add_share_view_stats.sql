@@ -0,0 +1,19 @@
+-- Create ShareViewStat table for batched share view analytics
+CREATE TABLE IF NOT EXISTS "ShareViewStat" (
+    "id" TEXT NOT NULL,
+    "code" TEXT NOT NULL,
+    "catalogId" TEXT NOT NULL,
+    "day" DATE NOT NULL,
+    "views" INTEGER NOT NULL DEFAULT 0,
+    "uniqueSketch" BYTEA NOT NULL,
+    "uniqueViewers" INTEGER NOT NULL DEFAULT 0,
+    "updatedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT "ShareViewStat_pkey" PRIMARY KEY ("id"),
+    CONSTRAINT "ShareViewStat_catalogId_fkey" FOREIGN KEY ("catalogId") REFERENCES "Catalog"("id") ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS "ShareViewStat_code_day_key" ON "ShareViewStat"("code", "day");
+CREATE INDEX IF NOT EXISTS "ShareViewStat_catalogId_day_idx" ON "ShareViewStat"("catalogId", "day");
+
+-- Only the backend (service role) reads and writes analytics
+ALTER TABLE "ShareViewStat" ENABLE ROW LEVEL SECURITY;
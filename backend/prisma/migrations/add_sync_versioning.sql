@@ -0,0 +1,26 @@
+-- Row versioning for delta sync
+ALTER TABLE "Catalog" ADD COLUMN IF NOT EXISTS "updatedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE "Item" ADD COLUMN IF NOT EXISTS "updatedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE "ItemImage" ADD COLUMN IF NOT EXISTS "updatedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE "ShareCode" ADD COLUMN IF NOT EXISTS "updatedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS "Catalog_ownerId_updatedAt_idx" ON "Catalog"("ownerId", "updatedAt");
+CREATE INDEX IF NOT EXISTS "Item_catalogId_updatedAt_idx" ON "Item"("catalogId", "updatedAt");
+CREATE INDEX IF NOT EXISTS "ShareCode_catalogId_updatedAt_idx" ON "ShareCode"("catalogId", "updatedAt");
+
+-- Deletes since a sync cursor
+CREATE TABLE IF NOT EXISTS "SyncTombstone" (
+    "id" TEXT NOT NULL,
+    "ownerId" TEXT NOT NULL,
+    "entity" TEXT NOT NULL,
+    "entityId" TEXT NOT NULL,
+    "catalogId" TEXT NOT NULL,
+    "deletedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT "SyncTombstone_pkey" PRIMARY KEY ("id")
+);
+
+CREATE INDEX IF NOT EXISTS "SyncTombstone_ownerId_deletedAt_idx" ON "SyncTombstone"("ownerId", "deletedAt");
+CREATE INDEX IF NOT EXISTS "SyncTombstone_deletedAt_idx" ON "SyncTombstone"("deletedAt");
+
+-- Only the backend (service role) reads and writes tombstones
+ALTER TABLE "SyncTombstone" ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,56 @@
+"""Production entry point: multi-worker uvicorn with graceful drain and worker recycling
+
+Usage: python serve.py (configured through environment variables, see SETUP.md)
+"""
+import os
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+from app.core.config import settings
+from app.core.lifecycle import DrainingServer
+
+
+def available_cpus() -> int:
+    """CPUs this process may use, honouring affinity and cgroup (container) CPU quotas"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) // int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def main():
+    workers = settings.web_concurrency or available_cpus()
+    
+    # Each worker runs its own lifespan and Prisma engine, so split the connection budget between them
+    if settings.db_total_connections and settings.db_connection_limit is None:
+        os.environ["DB_CONNECTION_LIMIT"] = str(max(1, settings.db_total_connections // workers))
+    
+    # Recycling relies on the multi-worker supervisor to start a replacement process
+    max_requests = settings.worker_max_requests if workers > 1 else 0
+    
+    config = uvicorn.Config(
+        "main:app",
+        host="0.0.0.0",
+        port=settings.port,
+        workers=workers,
+        # A worker exits after this many requests and the supervisor starts a fresh one
+        limit_max_requests=max_requests or None,
+        # After draining, uvicorn stops accepting connections and waits this long for in-flight requests
+        timeout_graceful_shutdown=settings.graceful_shutdown_timeout,
+    )
+    server = DrainingServer(config)
+    if workers > 1:
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
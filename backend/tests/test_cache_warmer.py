@@ -0,0 +1,50 @@
+import asyncio
+import time
+import pytest
+from app.core.config import settings
+from app.services import cache_warmer as warmer_module
+from app.services.cache_warmer import CacheWarmer
+from app.services.view_cache import ViewCache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ViewCache(max_entries=100, ttl_seconds=30)
+    monkeypatch.setattr(warmer_module, "view_cache", cache)
+    monkeypatch.setattr(settings, "warmup_max_codes", 10)
+    monkeypatch.setattr(settings, "warmup_max_seconds", 60)
+    monkeypatch.setattr(settings, "warmup_concurrency", 1)
+    return cache
+
+
+def warm(warmer, cache, codes, body_size):
+    async def select_codes(limit):
+        return codes
+
+    async def load(code):
+        cached = cache.put(code, "catalog-1", b"x" * body_size, ttl_seconds=warmer.ttl_seconds)
+        # A compressed variant produced for a request counts against the budget too
+        cached.encoded[("application/json", "gzip")] = b"x" * body_size
+        return cached
+
+    warmer.select_codes = select_codes
+    return asyncio.run(warmer.warm(load))
+
+
+def test_warmed_entries_outlive_the_warm_up_window(cache):
+    warmer = CacheWarmer()
+    warm(warmer, cache, ["ABC123"], 10)
+
+    remaining = cache.peek("ABC123").expires_at - time.monotonic()
+    assert remaining > settings.warmup_max_seconds
+
+
+def test_memory_budget_counts_every_variant(cache, monkeypatch):
+    monkeypatch.setattr(settings, "warmup_max_mb", 1)
+    warmer = CacheWarmer()
+    report = warm(warmer, cache, ["A", "B", "C", "D"], 300 * 1024)
+
+    # Each entry holds 600 KB (JSON body and its gzip variant): the budget is hit after two
+    assert report["warmed"] == 2
+    assert report["bytes"] == 2 * 600 * 1024
+    assert report["stopReason"] == "memory budget"
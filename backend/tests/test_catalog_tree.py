@@ -0,0 +1,96 @@
+import time
+from datetime import datetime, timezone
+from typing import List
+import pytest
+from pydantic import TypeAdapter
+from app.core.negotiation import msgpack, pack
+from app.models.schemas import CatalogWithItems
+from app.services.owner_cache import OwnerCatalogCache
+from app.utils.catalog_tree import build_catalog_trees, encode_json, encode_msgpack
+
+catalogs_adapter = TypeAdapter(List[CatalogWithItems])
+
+
+def owner_catalogs():
+    created = datetime(2025, 3, 4, 5, 6, 7, 120000, tzinfo=timezone.utc)
+    updated = datetime(2025, 3, 5, tzinfo=timezone.utc)
+    variants = [{"name": "Color", "options": [{"value": "Rød", "specifications": [{"label": "Dye", "value": "\"natural\""}]}]}]
+    return catalogs_adapter.validate_python([
+        {
+            "id": "catalog-1", "title": "Spring ✨", "description": None, "ownerId": "owner-1",
+            "createdAt": created, "updatedAt": updated,
+            "items": [
+                {
+                    "id": "item-1", "catalogId": "catalog-1", "name": "Shirt", "description": "Line\nbreak",
+                    "images": [
+                        {"id": "image-1", "itemId": "item-1", "url": "https://cdn/1.webp", "order": 0,
+                         "variantOptions": {"Color": "Rød"}, "createdAt": created, "updatedAt": created},
+                        {"id": "image-2", "itemId": "item-1", "url": "https://cdn/2.webp", "order": 1,
+                         "variantOptions": None, "createdAt": created, "updatedAt": None},
+                    ],
+                    "specifications": [{"label": "Fit", "value": "Slim"}],
+                    "variants": variants, "createdAt": created, "updatedAt": updated,
+                },
+                {
+                    "id": "item-2", "catalogId": "catalog-1", "name": "Plain", "description": None,
+                    "images": [], "specifications": None, "variants": None, "createdAt": created,
+                },
+            ],
+            "shareCodes": [
+                {"id": "code-1", "code": "ABC123", "catalogId": "catalog-1", "expiresAt": None,
+                 "isActive": True, "createdAt": created, "updatedAt": updated},
+                {"id": "code-2", "code": "XYZ789", "catalogId": "catalog-1", "expiresAt": updated,
+                 "isActive": False, "createdAt": created},
+            ],
+        },
+        {
+            "id": "catalog-2", "title": "Empty", "coverPhoto": "https://cdn/cover.webp", "ownerId": "owner-1",
+            "createdAt": created, "items": [], "shareCodes": [],
+        },
+    ])
+
+
+def test_tree_encodes_the_same_bytes_as_the_models():
+    models = owner_catalogs()
+    trees = build_catalog_trees(models)
+
+    assert encode_json(trees) == catalogs_adapter.dump_json(models)
+    assert encode_json(()) == b"[]"
+    if msgpack is None:
+        pytest.skip("msgpack is not installed")
+    assert encode_msgpack(trees) == pack(catalogs_adapter.dump_python(models, mode="json"))
+
+
+def test_owner_cache_serves_only_the_generation_it_was_loaded_at():
+    cache = OwnerCatalogCache(ttl_seconds=60, max_owners=10)
+    trees = build_catalog_trees(owner_catalogs())
+    loaded_at = time.time()
+    cache.put("owner-1", 5, trees, loaded_at)
+
+    assert cache.get("owner-1", 5) is trees
+    # A client that wrote (on any worker) after the load must not see it
+    assert cache.get("owner-1", 5, client_write=loaded_at + 1) is None
+    assert cache.get("owner-1", 5, client_write=loaded_at - 1) is trees
+
+    # A slow load from before a write does not replace the newer entry
+    cache.put("owner-1", 7, trees, loaded_at)
+    cache.put("owner-1", 6, (), loaded_at)
+    assert cache.get("owner-1", 7) is trees
+
+    assert cache.get("owner-1", 8) is None
+    assert cache._entries == {}
+
+
+def test_owner_cache_evicts_expired_and_least_recently_used_owners(monkeypatch):
+    cache = OwnerCatalogCache(ttl_seconds=60, max_owners=2)
+    cache.put("owner-1", 1, (), time.time())
+    cache.put("owner-2", 1, (), time.time())
+    assert cache.get("owner-1", 1) == ()
+
+    cache.put("owner-3", 1, (), time.time())
+    assert cache.get("owner-2", 1) is None
+    assert list(cache._entries) == ["owner-1", "owner-3"]
+
+    later = time.monotonic() + 61
+    monkeypatch.setattr(time, "monotonic", lambda: later)
+    assert cache.get("owner-1", 1) is None
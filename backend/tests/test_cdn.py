@@ -0,0 +1,29 @@
+import asyncio
+from app.core.config import settings
+from app.services.cdn import CdnPurger
+
+
+class SlowHook:
+    def __init__(self):
+        self.batches = []
+        self.sending = asyncio.Event()
+
+    async def purge(self, keys):
+        self.sending.set()
+        await asyncio.sleep(0.05)
+        self.batches.append(keys)
+
+
+def test_keys_queued_during_a_purge_are_flushed(monkeypatch):
+    monkeypatch.setattr(settings, "cdn_purge_delay_ms", 10)
+
+    async def run():
+        hook = SlowHook()
+        purger = CdnPurger(hook)
+        purger.purge(["catalog-1"])
+        await hook.sending.wait()
+        purger.purge(["catalog-2"])
+        await asyncio.sleep(0.2)
+        return hook.batches
+
+    assert asyncio.run(run()) == [["catalog-1"], ["catalog-2"]]
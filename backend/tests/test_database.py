@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+
+try:
+    from prisma import Prisma  # noqa: F401
+except (ImportError, RuntimeError):
+    pytest.skip("Prisma client not generated (run `prisma generate`)", allow_module_level=True)
+
+from app.core import database
+from app.core.database import ProfiledPrisma, create_client
+
+
+class FakeEngine:
+    """Stands in for the query engine process: hands out a transaction id and records calls"""
+
+    def __init__(self):
+        self.queries = []
+        self.committed = []
+        self.rolled_back = []
+
+    async def start_transaction(self, *, content):
+        return "tx-1"
+
+    async def commit_transaction(self, tx_id):
+        self.committed.append(tx_id)
+
+    async def rollback_transaction(self, tx_id):
+        self.rolled_back.append(tx_id)
+
+    async def query(self, content, *, tx_id):
+        self.queries.append(tx_id)
+        return {"data": {"result": 1}}
+
+    def stop(self, timeout=None):
+        pass
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    queries = []
+    monkeypatch.setattr(database, "record_query", lambda query, *args, **kwargs: queries.append(query))
+    return queries
+
+
+@pytest.fixture
+def client():
+    client = create_client(None)
+    client._engine = FakeEngine()
+    return client
+
+
+def test_transaction_runs_on_profiled_copy(client, recorded):
+    async def run():
+        async with client.tx() as tx:
+            assert isinstance(tx, ProfiledPrisma)
+            assert await tx.execute_raw('UPDATE "Item" SET "name" = $1', "x") == 1
+
+    asyncio.run(run())
+    assert client._engine.queries == ["tx-1"]
+    assert client._engine.committed == ["tx-1"]
+    assert recorded == ['UPDATE "Item" SET "name" = $1']
+
+
+def test_transaction_rolls_back_on_error(client):
+    async def run():
+        async with client.tx() as tx:
+            await tx.execute_raw("SELECT 1")
+            raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+    assert client._engine.committed == []
+    assert client._engine.rolled_back == ["tx-1"]
+
+
+def test_write_marker_keeps_the_clients_reads_on_the_primary(monkeypatch):
+    monkeypatch.setattr(database, "prisma_replica", object())
+    seen = []
+
+    async def app(scope, receive, send):
+        if scope["path"] == "/write":
+            database.mark_write("owner:someone-else")
+        seen.append(database.read_client("owner:1") is database.prisma)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = database.ReadYourWritesMiddleware(app)
+
+    async def request(path, headers=()):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "path": path, "headers": [(k.lower().encode(), v.encode()) for k, v in headers]}
+        await middleware(scope, None, send)
+        return dict((k.decode(), v.decode()) for k, v in messages[0]["headers"])
+
+    async def run():
+        written = await request("/write")
+        # Another worker has no in-process record of the write; the echoed header is enough
+        database._recent_writes.clear()
+        await request("/read", [("X-Last-Write", written["x-last-write"])])
+        await request("/read")
+        await request("/read", [("X-Last-Write", "not-a-time")])
+
+    asyncio.run(run())
+    assert seen == [False, True, False, False]
@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from app.core.lifecycle import RequestTracker
+from app.services import events
+from app.services.events import EventBroker, EventStreamResponse, LocalBackend
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    tracker = RequestTracker()
+    monkeypatch.setattr(events, "request_tracker", tracker)
+    return tracker
+
+
+@pytest.fixture
+def broker(tracker):
+    broker = EventBroker(max_queue=8, max_subscribers=10)
+    broker.backend = LocalBackend()
+    tracker.on_drain(broker.close_all)
+    return broker
+
+
+def test_close_code_ends_only_that_codes_streams(broker):
+    owner = broker.subscribe("cat-1")
+    viewer = broker.subscribe("cat-1", "ABC123")
+    other = broker.subscribe("cat-1", "XYZ789")
+
+    broker.close_code("cat-1", "ABC123")
+
+    assert asyncio.run(viewer.get()) is None
+    assert owner.queue.empty()
+    assert other.queue.empty()
+
+
+def test_draining_ends_streams_and_refuses_new_ones(broker, tracker):
+    subscription = broker.subscribe("cat-1", "ABC123")
+
+    tracker.start_draining()
+
+    assert asyncio.run(subscription.get()) is None
+    assert broker.subscribe("cat-1") is None
+
+
+def test_stream_released_when_client_leaves_before_the_first_frame(broker):
+    subscription = broker.subscribe("cat-1", "ABC123")
+    response = EventStreamResponse(None, subscription)
+
+    async def receive():
+        await asyncio.sleep(1)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        # The connection is gone before the response starts, so the body is never iterated
+        raise OSError("connection reset")
+
+    with pytest.raises(Exception):
+        asyncio.run(response({"type": "http"}, receive, send))
+    assert broker._count == 0
@@ -0,0 +1,14 @@
+from app.services.invalidation import after_catalog_write, after_share_code_write, write_generation
+
+
+def test_writes_only_advance_their_own_catalog_and_code():
+    generation = write_generation("views")
+
+    after_catalog_write("catalog-1", "owner-1")
+    after_share_code_write("ABC123", "catalog-2", "owner-1")
+
+    assert write_generation("catalog:catalog-1") > generation
+    assert write_generation("code:ABC123") > generation
+    assert write_generation("catalog:catalog-2") <= generation
+    assert write_generation("catalog:catalog-3") <= generation
+    assert write_generation("views") >= write_generation("code:ABC123")
@@ -0,0 +1,34 @@
+from datetime import datetime, timezone
+import pytest
+from app.core.negotiation import msgpack, pack
+from app.models.schemas import CatalogWithItems
+
+if msgpack is None:
+    pytest.skip("msgpack not installed", allow_module_level=True)
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def catalog_document() -> dict:
+    image = {"id": "img-1", "itemId": "item-1", "url": "https://example.com/1.webp", "order": 0,
+             "variantOptions": {"Color": "Red"}, "createdAt": NOW, "updatedAt": NOW}
+    item = {"id": "item-1", "catalogId": "cat-1", "name": "Shirt", "description": None, "images": [image],
+            "specifications": None, "variants": None, "createdAt": NOW, "updatedAt": NOW}
+    catalog = {"id": "cat-1", "title": "Catalog", "ownerId": "owner-1", "createdAt": NOW, "updatedAt": NOW,
+               "items": [item], "shareCodes": []}
+    return CatalogWithItems.model_validate(catalog).model_dump(mode="json")
+
+
+def test_msgpack_tables_carry_every_json_field():
+    document = catalog_document()
+    packed = msgpack.unpackb(pack(document), raw=False)
+
+    items = packed["items"]
+    item = dict(zip(items["fields"], items["rows"][0]))
+    images = item.pop("images")
+    image = dict(zip(images["fields"], images["rows"][0]))
+
+    json_item = {key: value for key, value in document["items"][0].items() if key not in ("catalogId", "images")}
+    json_image = {key: value for key, value in document["items"][0]["images"][0].items() if key != "itemId"}
+    assert item == json_item
+    assert image == json_image
@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+import pytest
+from app.core.config import settings
+from app.core.request_context import client_ip
+
+
+def make_request(headers, peer="10.0.0.1"):
+    return SimpleNamespace(headers=headers, client=SimpleNamespace(host=peer))
+
+
+@pytest.fixture
+def proxy_hops(monkeypatch):
+    def set_hops(hops):
+        monkeypatch.setattr(settings, "trusted_proxy_hops", hops)
+    return set_hops
+
+
+def test_uses_entry_added_by_trusted_proxy(proxy_hops):
+    proxy_hops(1)
+    # The leftmost entry is client-supplied and could be anything
+    assert client_ip(make_request({"x-forwarded-for": "6.6.6.6, 203.0.113.7"})) == "203.0.113.7"
+    proxy_hops(2)
+    assert client_ip(make_request({"x-forwarded-for": "6.6.6.6, 203.0.113.7, 10.1.1.1"})) == "203.0.113.7"
+
+
+def test_falls_back_to_real_ip_then_peer(proxy_hops):
+    proxy_hops(1)
+    assert client_ip(make_request({"x-real-ip": "203.0.113.8"})) == "203.0.113.8"
+    assert client_ip(make_request({})) == "10.0.0.1"
+
+
+def test_headers_ignored_without_trusted_proxies(proxy_hops):
+    proxy_hops(0)
+    assert client_ip(make_request({"x-forwarded-for": "203.0.113.7"})) == "10.0.0.1"
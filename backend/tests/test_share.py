@@ -0,0 +1,125 @@
+import asyncio
+import json
+import re
+import pytest
+
+try:
+    from prisma import Prisma  # noqa: F401
+except (ImportError, RuntimeError):
+    pytest.skip("Prisma client not generated (run `prisma generate`)", allow_module_level=True)
+
+from prisma.errors import UniqueViolationError
+from app.api import share
+from app.core.database import create_client
+from app.models.schemas import ShareCodeBulkCreate
+from app.services.code_pool import ShareCodePool
+
+ROW = re.compile(r'id: "([^"]+)"\s+code: "([^"]+)"\s+catalogId: "([^"]+)"')
+NOW = "2026-01-01T00:00:00+00:00"
+
+
+class FakeEngine:
+    """Answers the queries the bulk endpoint sends; share codes in `taken` violate the unique constraint"""
+
+    def __init__(self, catalogs, taken=()):
+        self.catalogs = catalogs
+        self.taken = set(taken)
+        self.share_codes = {}
+        self.pending = {}
+        self.committed = []
+        self.rolled_back = []
+
+    async def start_transaction(self, *, content):
+        self.pending = {}
+        return f"tx-{len(self.committed) + len(self.rolled_back) + 1}"
+
+    async def commit_transaction(self, tx_id):
+        self.share_codes.update(self.pending)
+        self.committed.append(tx_id)
+
+    async def rollback_transaction(self, tx_id):
+        self.rolled_back.append(tx_id)
+
+    async def query(self, content, *, tx_id):
+        query = json.loads(content)["query"]
+        if "findManyCatalog" in query:
+            result = [
+                {"id": catalog_id, "title": "Catalog", "description": None, "coverPhoto": None, "ownerId": "owner-1",
+                 "createdAt": NOW, "updatedAt": NOW, "deletedAt": None}
+                for catalog_id in self.catalogs
+            ]
+        elif "createManyShareCode" in query:
+            rows = ROW.findall(query)
+            if self.taken & {code for _, code, _ in rows}:
+                raise UniqueViolationError({"user_facing_error": {"error_code": "P2002"}})
+            self.pending.update({row_id: (code, catalog_id) for row_id, code, catalog_id in rows})
+            result = {"count": len(rows)}
+        elif "findManyShareCode" in query:
+            result = [
+                {"id": row_id, "code": code, "catalogId": catalog_id, "expiresAt": NOW, "isActive": True,
+                 "createdAt": NOW, "updatedAt": NOW}
+                for row_id, (code, catalog_id) in self.pending.items()
+            ]
+        else:
+            raise AssertionError(f"Unexpected query: {query}")
+        return {"data": {"result": result}}
+
+    def stop(self, timeout=None):
+        pass
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = FakeEngine(["cat-1", "cat-2"])
+    client = create_client(None)
+    client._engine = engine
+    monkeypatch.setattr(share, "prisma", client)
+    monkeypatch.setattr(share, "share_code_pool", ShareCodePool(0))
+    return engine
+
+
+def issue(catalog_ids):
+    return asyncio.run(share.create_share_codes_bulk(ShareCodeBulkCreate(catalogIds=catalog_ids), {"id": "owner-1"}))
+
+
+def test_bulk_issue_inserts_in_one_transaction(engine):
+    share_codes = issue(["cat-2", "cat-1"])
+
+    assert [share_code.catalogId for share_code in share_codes] == ["cat-2", "cat-1"]
+    assert engine.committed == ["tx-1"]
+    assert sorted(code for code, _ in engine.share_codes.values()) == sorted(share_code.code for share_code in share_codes)
+
+
+def test_bulk_issue_retries_the_batch_after_a_collision(engine, monkeypatch):
+    codes = iter(["FRESH1", "FRESH2"])
+    monkeypatch.setattr(share, "generate_share_code", lambda: next(codes))
+    monkeypatch.setattr(share.share_code_pool, "take_many", lambda count: ["TAKEN1", "FRESH9"][:count])
+    engine.taken.add("TAKEN1")
+
+    share_codes = issue(["cat-1", "cat-2"])
+
+    assert engine.rolled_back == ["tx-1"]
+    assert engine.committed == ["tx-2"]
+    assert {share_code.code for share_code in share_codes} == {"FRESH1", "FRESH2"}
+
+
+def test_pool_runs_one_refill_at_a_time(monkeypatch):
+    pool = ShareCodePool(4)
+    calls = []
+
+    async def refill():
+        calls.append(len(pool))
+        await asyncio.sleep(0.01)
+        pool._codes.extend(["A", "B", "C", "D"][len(pool):])
+
+    monkeypatch.setattr(pool, "refill", refill)
+
+    async def run():
+        pool.start_refill()
+        pool.take()
+        pool.start_refill()
+        await pool._refill_task
+
+    asyncio.run(run())
+    assert calls == [0]
+    assert len(pool) == 4
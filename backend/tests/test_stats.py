@@ -0,0 +1,25 @@
+import time
+from app.services.stats import StatsCache
+
+
+def test_least_recently_used_owners_are_evicted():
+    cache = StatsCache(ttl_seconds=60, max_owners=2)
+    cache.put("owner-1", ("month", 6), {"n": 1})
+    cache.put("owner-2", ("month", 6), {"n": 2})
+    assert cache.get("owner-1", ("month", 6)) == {"n": 1}
+
+    cache.put("owner-3", ("month", 6), {"n": 3})
+
+    assert cache.get("owner-2", ("month", 6)) is None
+    assert cache.get("owner-1", ("month", 6)) == {"n": 1}
+    assert len(cache._entries) == 2
+
+
+def test_expired_entries_are_dropped(monkeypatch):
+    cache = StatsCache(ttl_seconds=60, max_owners=10)
+    cache.put("owner-1", ("month", 6), {"n": 1})
+    later = time.monotonic() + 61
+    monkeypatch.setattr(time, "monotonic", lambda: later)
+
+    assert cache.get("owner-1", ("month", 6)) is None
+    assert cache._entries == {}
@@ -0,0 +1,59 @@
+import asyncio
+from types import SimpleNamespace
+from app.services import storage_gc
+
+OLD = "2020-01-01T00:00:00Z"
+URL = "https://project.supabase.co/storage/v1/object/public/catalog-images/"
+
+
+class FakeBucket:
+    """Offset-paged listing over a mutable set of objects, like the storage API"""
+
+    def __init__(self, names):
+        self.names = sorted(names)
+
+    def list(self, prefix, options):
+        offset, limit = options["offset"], options["limit"]
+        return [{"name": name, "id": name, "created_at": OLD} for name in self.names[offset:offset + limit]]
+
+    def remove(self, paths):
+        self.names = [name for name in self.names if name not in paths]
+
+
+class FakeModel:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def count(self, where=None):
+        return len(self.rows)
+
+    async def find_many(self, where=None):
+        suffixes = [next(iter(condition.values()))["endsWith"] for condition in where["OR"]]
+        return [row for row in self.rows if any((row.url or "").endswith(suffix) for suffix in suffixes)]
+
+
+class FakePrisma:
+    def __init__(self, referenced):
+        self.itemimage = FakeModel([SimpleNamespace(id=str(n), url=URL + name) for n, name in enumerate(referenced)])
+        self.catalog = FakeModel([])
+
+    async def query_raw(self, query, last_id, limit):
+        if '"ItemImage"' not in query or last_id:
+            return []
+        return [{"id": row.id, "url": row.url} for row in self.itemimage.rows]
+
+
+def test_every_orphan_is_deleted_in_one_pass(monkeypatch):
+    names = [f"obj-{n:03d}" for n in range(30)]
+    referenced = names[::3]
+    bucket = FakeBucket(names)
+    monkeypatch.setattr(storage_gc, "PAGE_SIZE", 5)
+    monkeypatch.setattr(storage_gc, "DELETE_BATCH_SIZE", 4)
+    monkeypatch.setattr(storage_gc, "prisma", FakePrisma(referenced))
+    monkeypatch.setattr(storage_gc, "get_supabase_client", lambda: SimpleNamespace(storage=SimpleNamespace(from_=lambda name: bucket)))
+
+    stats = asyncio.run(storage_gc.run_storage_gc(dry_run=False))
+
+    assert bucket.names == referenced
+    assert stats["scanned"] == 30
+    assert stats["deleted"] == 20
@@ -10,17 +10,19 @@ import { Skeleton } from '@/components/ui/skeleton'
 import { catalogApi } from '@/lib/api'
 
 export function DashboardContent({ userEmail }: { userEmail?: string | null }) {
-  const { data: catalogs, isLoading } = useQuery({
-    queryKey: ['catalogs'],
+  // Aggregates only - avoids downloading every catalog's items just to count them
+  // (keyed under 'catalogs' so catalog mutations elsewhere invalidate it too)
+  const { data: stats, isLoading } = useQuery({
+    queryKey: ['catalogs', 'stats'],
     queryFn: async () => {
-      const { data, error } = await catalogApi.getMy()
+      const { data, error } = await catalogApi.getStats()
       if (error) throw error
       return data
     },
     staleTime: 1000 * 60 * 5, // Consider data fresh for 5 minutes
   })
 
-  const catalogsList = catalogs && Array.isArray(catalogs) ? catalogs : []
+  const catalogsList = stats && Array.isArray(stats.catalogs) ? stats.catalogs : []
 
   return (
     <>
@@ -13,6 +13,16 @@ import { toast } from 'sonner'
 import Link from 'next/link'
 import Image from 'next/image'
 
+// Same key format as the backend's variant index: item variant order, strictly URL-encoded name=value pairs
+function variantIndexKey(variants: { name: string }[], selections: Record<string, string>) {
+  const encode = (value: string) =>
+    encodeURIComponent(value).replace(/[!'()*]/g, (c) => '%' + c.charCodeAt(0).toString(16).toUpperCase())
+  return variants
+    .filter((v) => selections[v.name] !== undefined)
+    .map((v) => `${encode(v.name)}=${encode(selections[v.name])}`)
+    .join('&')
+}
+
 export default function ViewItemDetailPage() {
   const params = useParams()
   const router = useRouter()
@@ -29,9 +39,12 @@ export default function ViewItemDetailPage() {
   const [selectedVariants, setSelectedVariants] = useState<Record<string, string>>({})
   const [lightboxVisible, setLightboxVisible] = useState(false)
   const [lightboxIndex, setLightboxIndex] = useState(0)
+  const [variantIndex, setVariantIndex] = useState<any>(null)
   
   // Ref to track programmatic navigation (to avoid resetting image index)
   const isNavigatingRef = useRef(false)
+  // Selection key of the pending server lookup; cleared by any newer selection or navigation so late replies are dropped
+  const variantLookupRef = useRef<string | null>(null)
 
   // Update URL when variant selection changes
   const updateVariantUrl = useCallback((newSelections: Record<string, string>) => {
@@ -46,43 +59,6 @@ export default function ViewItemDetailPage() {
     router.replace(newUrl, { scroll: false })
   }, [code, itemId, router])
 
-  // Handle variant selection (user interaction)
-  const handleVariantSelect = useCallback((variantName: string, optionValue: string, images?: any[]) => {
-    const newSelections = { ...selectedVariants, [variantName]: optionValue }
-    setSelectedVariants(newSelections)
-    updateVariantUrl(newSelections)
-    
-    // Find an image that matches ALL selected variants (best match)
-    if (images && images.length > 0) {
-      // First, try to find an image that matches ALL selected variants
-      let bestMatchIndex = images.findIndex((img: any) => {
-        if (!img.variantOptions || Object.keys(img.variantOptions).length === 0) return false
-        // Check if ALL of the image's variant options match the selected variants
-        return Object.entries(img.variantOptions).every(([key, value]) => {
-          return newSelections[key] === value
-        })
-      })
-      
-      // If no exact match, find an image that at least matches the newly selected variant
-      if (bestMatchIndex === -1) {
-        bestMatchIndex = images.findIndex((img: any) => {
-          if (!img.variantOptions) return false
-          return img.variantOptions[variantName] === optionValue
-        })
-      }
-      
-      if (bestMatchIndex !== -1) {
-        // Navigate to the matching image
-        setSelectedImageIndex(bestMatchIndex)
-        setPage([0, 0])
-        return
-      }
-    }
-    
-    // If no matching image found, keep current image (don't reset)
-    // This is better UX when there's no image for the selected combination
-  }, [selectedVariants, updateVariantUrl])
-
   useEffect(() => {
     if (code) {
       loadCatalog(code)
@@ -109,6 +85,60 @@ export default function ViewItemDetailPage() {
 
   const item = catalog?.items?.find((i: any) => i.id === itemId)
 
+  // Selection -> images index, fetched once per item so switching variants needs no round-trip
+  useEffect(() => {
+    if (!code || !itemId) return
+    let cancelled = false
+    catalogApi.getItemVariantIndex(code, itemId).then(({ data }) => {
+      if (!cancelled) setVariantIndex(data)
+    })
+    return () => {
+      cancelled = true
+    }
+  }, [code, itemId])
+
+  const imagePositions = useMemo(
+    () => new Map<string, number>((item?.images || []).map((img: any, index: number) => [img.id, index])),
+    [item?.images]
+  )
+
+  // Jump to the first image of a resolved selection (exact matches, then related ones)
+  const showVariantImage = useCallback((resolved: { images: string[]; related: string[] }) => {
+    const targetId = resolved.images[0] ?? resolved.related[0]
+    const targetIndex = targetId ? imagePositions.get(targetId) : undefined
+    if (targetIndex !== undefined) {
+      setSelectedImageIndex(targetIndex)
+      setPage([0, 0])
+    }
+    // If no matching image found, keep current image (don't reset)
+    // This is better UX when there's no image for the selected combination
+  }, [imagePositions])
+
+  // Handle variant selection (user interaction)
+  const handleVariantSelect = useCallback((variantName: string, optionValue: string) => {
+    const newSelections = { ...selectedVariants, [variantName]: optionValue }
+    setSelectedVariants(newSelections)
+    updateVariantUrl(newSelections)
+    variantLookupRef.current = null
+    if (!item?.variants) return
+
+    const key = variantIndexKey(item.variants, newSelections)
+    const indexed = variantIndex?.combinations?.[key]
+    if (indexed) {
+      showVariantImage(indexed)
+      return
+    }
+    // A complete index holds every selection; only truncated (or not yet loaded) indexes need the server
+    if (variantIndex && !variantIndex.truncated) return
+
+    variantLookupRef.current = key
+    catalogApi.getItemVariant(code, itemId, newSelections).then(({ data }: { data: any }) => {
+      if (!data || variantLookupRef.current !== key) return
+      variantLookupRef.current = null
+      showVariantImage(data)
+    })
+  }, [code, itemId, item?.variants, selectedVariants, updateVariantUrl, variantIndex, showVariantImage])
+
   // Auto-select variant options on load (from URL params or default to first)
   useEffect(() => {
     if (item?.variants && item.variants.length > 0 && Object.keys(selectedVariants).length === 0) {
@@ -173,6 +203,7 @@ export default function ViewItemDetailPage() {
         const currentStr = JSON.stringify(selectedVariants)
         const urlStr = JSON.stringify(urlSelections)
         if (currentStr !== urlStr) {
+          variantLookupRef.current = null
           setSelectedVariants(urlSelections)
           // Reset image index when variants change from URL (browser back/forward)
           setSelectedImageIndex(0)
@@ -229,6 +260,7 @@ export default function ViewItemDetailPage() {
       }, 100)
     }
     
+    variantLookupRef.current = null
     setPage([page + newDirection, newDirection])
     setSelectedImageIndex(newIndex)
   }, [selectedImageIndex, selectedVariants, updateVariantUrl, page])
@@ -673,7 +705,7 @@ export default function ViewItemDetailPage() {
                               return (
                                 <button
                                   key={optIndex}
-                                  onClick={() => handleVariantSelect(variant.name, optionValue, allImages)}
+                                  onClick={() => handleVariantSelect(variant.name, optionValue)}
                                   className={`px-3 py-1.5 text-sm rounded-full border transition-all ${
                                     selectedVariants[variant.name] === optionValue
                                       ? 'bg-primary text-primary-foreground border-primary'
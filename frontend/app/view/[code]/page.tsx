@@ -8,6 +8,7 @@ import { Button } from '@/components/ui/button'
 import { Skeleton } from '@/components/ui/skeleton'
 import { Sheet, SheetContent, SheetHeader, SheetTitle, SheetFooter } from '@/components/ui/sheet'
 import { catalogApi } from '@/lib/api'
+import { useCatalogEvents, type CatalogEvent } from '@/lib/use-catalog-events'
 import { toast } from 'sonner'
 import Image from 'next/image'
 import Link from 'next/link'
@@ -49,6 +50,41 @@ export default function ViewCatalogPage() {
     }
   }
 
+  // Apply live changes pushed by the backend instead of refetching the whole catalog
+  useCatalogEvents(catalog && params.code ? `/catalog/view/${params.code}/events` : null, (event: CatalogEvent) => {
+    if (event.type === 'resync' || event.type === 'catalog.deleted') {
+      loadCatalog(params.code as string)
+      return
+    }
+    setCatalog((current: any) => {
+      if (!current) return current
+      switch (event.type) {
+        case 'catalog.updated':
+          return { ...current, ...event.catalog }
+        case 'item.created':
+          return { ...current, items: [...current.items, event.item] }
+        case 'item.updated':
+          return { ...current, items: current.items.map((item: any) => item.id === event.item.id ? event.item : item) }
+        case 'item.deleted':
+          return { ...current, items: current.items.filter((item: any) => item.id !== event.itemId) }
+        case 'images.reordered': {
+          const orders = new Map((event.images || []).map((img) => [img.id, img.order]))
+          return {
+            ...current,
+            items: current.items.map((item: any) => item.id !== event.itemId ? item : {
+              ...item,
+              images: item.images
+                .map((img: any) => orders.has(img.id) ? { ...img, order: orders.get(img.id) } : img)
+                .sort((a: any, b: any) => a.order - b.order),
+            }),
+          }
+        }
+        default:
+          return current
+      }
+    })
+  })
+
   const handleSubmit = (e: React.FormEvent) => {
     e.preventDefault()
     if (code) {
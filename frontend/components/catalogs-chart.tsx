@@ -21,7 +21,7 @@ type CatalogsChartProps = {
   catalogs: Array<{
     id: string
     title: string
-    items: Array<{ id: string }>
+    itemCount: number
   }>
 }
 
@@ -45,7 +45,7 @@ export function CatalogsChart({ catalogs }: CatalogsChartProps) {
       catalog: catalog.title.length > 20 
         ? `${catalog.title.substring(0, 20)}...` 
         : catalog.title,
-      items: catalog.items?.length || 0,
+      items: catalog.itemCount || 0,
     }))
   }, [catalogs])
 
@@ -24,7 +24,7 @@ type CatalogsPieChartProps = {
   catalogs: Array<{
     id: string
     title: string
-    items: Array<{ id: string }>
+    itemCount: number
   }>
 }
 
@@ -70,10 +70,10 @@ export function CatalogsPieChart({ catalogs }: CatalogsPieChartProps) {
     if (!catalogs || catalogs.length === 0) return []
 
     // Filter catalogs with items first, then map
-    const catalogsWithItems = catalogs.filter(catalog => (catalog.items?.length || 0) > 0)
+    const catalogsWithItems = catalogs.filter(catalog => (catalog.itemCount || 0) > 0)
     
     return catalogsWithItems.map((catalog, index) => {
-      const itemCount = catalog.items?.length || 0
+      const itemCount = catalog.itemCount || 0
       const catalogKey = `catalog${index}`
       
       return {
@@ -90,7 +90,7 @@ export function CatalogsPieChart({ catalogs }: CatalogsPieChartProps) {
 
   const chartConfig = React.useMemo(() => {
     // Generate config only for catalogs with items
-    const catalogsWithItems = catalogs?.filter(catalog => (catalog.items?.length || 0) > 0) || []
+    const catalogsWithItems = catalogs?.filter(catalog => (catalog.itemCount || 0) > 0) || []
     return generateChartConfig(catalogsWithItems)
   }, [catalogs])
 
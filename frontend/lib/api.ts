@@ -6,6 +6,21 @@ export interface ApiError {
   detail: string
 }
 
+// Time of this browser's last write (X-Last-Write); sent back so reads that follow it are
+// served from the primary database on whichever backend worker handles them
+const LAST_WRITE_KEY = 'lastWrite'
+
+function getLastWrite(): string | null {
+  return typeof window !== 'undefined' ? window.sessionStorage.getItem(LAST_WRITE_KEY) : null
+}
+
+function rememberLastWrite(response: Response) {
+  const lastWrite = response.headers.get('X-Last-Write')
+  if (lastWrite && typeof window !== 'undefined') {
+    window.sessionStorage.setItem(LAST_WRITE_KEY, lastWrite)
+  }
+}
+
 export async function apiRequest<T>(
   endpoint: string,
   options: RequestInit = {}
@@ -15,14 +30,18 @@ export async function apiRequest<T>(
     const { data: { session } } = await supabase.auth.getSession()
     const token = session?.access_token
 
+    const lastWrite = getLastWrite()
+
     const response = await fetch(`${API_URL}${endpoint}`, {
       ...options,
       headers: {
         'Content-Type': 'application/json',
         ...(token && { Authorization: `Bearer ${token}` }),
+        ...(lastWrite && { 'X-Last-Write': lastWrite }),
         ...options.headers,
       },
     })
+    rememberLastWrite(response)
 
     if (!response.ok) {
       const error = await response.json().catch(() => ({ detail: response.statusText }))
@@ -81,6 +100,24 @@ export const catalogApi = {
   getMy: async () => {
     return apiRequest('/catalog/my')
   },
+  sync: async (since?: string) => {
+    return apiRequest(`/catalog/sync${since ? `?since=${encodeURIComponent(since)}` : ''}`)
+  },
+  // Direct download link for a streamed ZIP export (the token travels in the query string)
+  exportUrl: async (catalogId: string, manifest: 'csv' | 'json' | 'both' = 'both') => {
+    const { data: { session } } = await supabase.auth.getSession()
+    const params = new URLSearchParams({ manifest })
+    if (session?.access_token) params.set('access_token', session.access_token)
+    return `${API_URL}/catalog/${catalogId}/export?${params}`
+  },
+  getStats: async (period: 'day' | 'week' | 'month' = 'month', periods: number = 12) => {
+    return apiRequest<{
+      totals: { catalogs: number; items: number; images: number; shareCodes: number; activeShareCodes: number }
+      catalogs: Array<{ id: string; title: string; createdAt: string; itemCount: number; imageCount: number; shareCodeCount: number; activeShareCodeCount: number }>
+      period: string
+      periods: Array<{ period: string; items: number; catalogs: number }>
+    }>(`/catalog/stats?period=${period}&periods=${periods}`)
+  },
   update: async (id: string, data: { title?: string; description?: string; coverPhoto?: string }) => {
     return apiRequest(`/catalog/${id}`, {
       method: 'PUT',
@@ -92,6 +129,12 @@ export const catalogApi = {
       method: 'DELETE',
     })
   },
+  clone: async (id: string, title?: string) => {
+    return apiRequest(`/catalog/${id}/clone`, {
+      method: 'POST',
+      body: JSON.stringify({ title }),
+    })
+  },
   addItem: async (catalogId: string, item: { name: string; description?: string; images?: string[] | Array<{ url: string; order?: number; variantOptions?: Record<string, string> }>; specifications?: { label: string; value: string }[]; variants?: { name: string; options: { value: string; specifications?: { label: string; value: string }[] }[] }[] }) => {
     return apiRequest(`/catalog/${catalogId}/items`, {
       method: 'POST',
@@ -115,9 +158,25 @@ export const catalogApi = {
       body: JSON.stringify({ images }),
     })
   },
+  batchItems: async (catalogId: string, operations: Array<{ op: 'create' | 'update' | 'delete' | 'reorder'; itemId?: string; create?: { name: string; description?: string; images?: string[] | Array<{ url: string; order?: number; variantOptions?: Record<string, string> }>; specifications?: { label: string; value: string }[]; variants?: { name: string; options: { value: string; specifications?: { label: string; value: string }[] }[] }[] }; update?: { name?: string; description?: string; images?: string[] | Array<{ url: string; order?: number; variantOptions?: Record<string, string> }>; specifications?: { label: string; value: string }[]; variants?: { name: string; options: { value: string; specifications?: { label: string; value: string }[] }[] }[] }; images?: { id: string; order: number }[] }>) => {
+    return apiRequest(`/catalog/${catalogId}/items/batch`, {
+      method: 'POST',
+      body: JSON.stringify({ operations }),
+    })
+  },
   viewByCode: async (code: string) => {
     return apiRequest(`/catalog/view/${code}`)
   },
+  getItemVariantIndex: async (code: string, itemId: string) => {
+    return apiRequest(`/catalog/view/${code}/items/${itemId}/variant-index`)
+  },
+  getItemVariant: async (code: string, itemId: string, selections: Record<string, string>) => {
+    const params = new URLSearchParams(selections).toString()
+    return apiRequest(`/catalog/view/${code}/items/${itemId}/variants${params ? `?${params}` : ''}`)
+  },
+  getAnalytics: async (catalogId: string, days: number = 30) => {
+    return apiRequest(`/catalog/${catalogId}/analytics?days=${days}`)
+  },
 }
 
 // Share API
@@ -128,6 +187,12 @@ export const shareApi = {
       body: JSON.stringify({ expiresAt }),
     })
   },
+  createBulk: async (catalogIds: string[]) => {
+    return apiRequest('/share/bulk', {
+      method: 'POST',
+      body: JSON.stringify({ catalogIds }),
+    })
+  },
   delete: async (codeId: string) => {
     return apiRequest(`/share/${codeId}`, {
       method: 'DELETE',
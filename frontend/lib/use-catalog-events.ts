@@ -0,0 +1,51 @@
+import { useEffect, useRef } from 'react'
+
+const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
+
+export type CatalogEvent = {
+  type: 'catalog.updated' | 'catalog.deleted' | 'item.created' | 'item.updated' | 'item.deleted' | 'images.reordered' | 'resync'
+  catalogId?: string
+  itemId?: string
+  item?: any
+  catalog?: any
+  images?: { id: string; order: number }[]
+}
+
+const EVENT_TYPES: CatalogEvent['type'][] = [
+  'catalog.updated',
+  'catalog.deleted',
+  'item.created',
+  'item.updated',
+  'item.deleted',
+  'images.reordered',
+  'resync',
+]
+
+/**
+ * Subscribe to a catalog's Server-Sent Events change feed.
+ * `path` is e.g. `/catalog/view/${code}/events`; pass null to stay disconnected.
+ */
+export function useCatalogEvents(path: string | null, onEvent: (event: CatalogEvent) => void) {
+  const handlerRef = useRef(onEvent)
+  handlerRef.current = onEvent
+
+  useEffect(() => {
+    if (!path) return
+
+    const source = new EventSource(`${API_URL}${path}`)
+    const listener = (message: MessageEvent) => {
+      try {
+        const data = JSON.parse(message.data || '{}')
+        handlerRef.current({ ...data, type: message.type as CatalogEvent['type'] })
+      } catch {
+        // Ignore malformed events
+      }
+    }
+    EVENT_TYPES.forEach((type) => source.addEventListener(type, listener))
+
+    return () => {
+      EVENT_TYPES.forEach((type) => source.removeEventListener(type, listener))
+      source.close()
+    }
+  }, [path])
+}